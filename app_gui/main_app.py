@@ -1,5 +1,10 @@
 import tkinter as tk
 import queue  # no topo do arquivo ou aqui mesmo
+import os
+import json
+import time
+import threading
+import requests
 from tkinter import ttk, messagebox
 
 # === Importações locais (mantêm o código modular) ===
@@ -14,9 +19,21 @@ from workers.auto_promo_worker import AutoPromoWorker
 from app_gui.tabs.tab_tiny_products import TabTinyProducts
 from services.abc_importer import ABCImporter
 from services.abc_service import ABCService
+from services.tiny_sync import TinyCatalogSync, TinySyncReport
+from services.stock_snapshot import StockSnapshotService
+from services.tiny_id_resolver import TinyIdResolver
+from services.pricing_engine import PricingEngine
+from services.ml_tokens import MLTokenProvider
+from services.queue_retention import QueueRetentionService
 from services.task_enqueue import TaskEnqueueService, EnqueueItem
 from core.scraping import scrape_ml_product_basic_info
-from core.text_utils import html_to_text
+from core.text_utils import html_to_text, normalize_sku
+from core.rate_limiter import get_rate_limiter
+from core.http_session import get_session, configure_pools, close_all_sessions
+from core.ttl_cache import TTLCache
+from core.config import CACHE_DIR
+from integrations.mercadolivre_api import APP_USER_AGENT
+from integrations.tiny_api import TINY_V3_API_BASE_URL
 
 
 
@@ -35,7 +52,46 @@ class App:
         self.bulk_edit_action_queue = queue.Queue()
         self.is_bulk_processing_active = False
         self.fixed_prices = {}                 # usado pelo BulkWorker (preço fixo por SKU)
+        self.bulk_price_recalc_logs = []       # calculation_details do recálculo de preço (relatório no fim do lote)
         self.update_qty_sync_tiny_var = False  # se ainda não existir como BooleanVar na UI
+        # Detalhes do produto no Tiny (precos) por SKU: limitado e com validade, para não usar custo velho
+        self.tiny_product_details_cache = TTLCache(
+            maxsize=int(self.db_manager.get_app_config_value('tiny_details_cache_size', 5000) or 5000),
+            ttl=float(self.db_manager.get_app_config_value('tiny_details_cache_ttl_seconds', 1800) or 1800),
+            name="tiny_product_details",
+            persist_path=os.path.join(CACHE_DIR, "tiny_product_details.json"),
+        )
+        # SKU -> id do Tiny a partir de tiny_products (API só em falta), atualizado pelos upserts/importações
+        self.tiny_id_resolver = TinyIdResolver(
+            self.db_manager, self._tiny_api_v3_request,
+            negative_ttl=float(self.db_manager.get_app_config_value('tiny_id_negative_ttl_seconds', 600) or 600),
+        )
+        self.tiny_id_resolver.load()
+        self.db_manager.add_tiny_products_listener(self.tiny_id_resolver.on_tiny_products_changed)
+        # Estoque do Tiny por SKU servido da memória (BULK_EDIT com from_tiny_qty)
+        self.stock_snapshot = StockSnapshotService(
+            self.db_manager, self._tiny_api_v3_request,
+            deposito_id_fn=lambda: self.db_manager.get_app_config_value('tiny_v3_default_deposito_id'),
+            legacy_stock_fn=lambda tiny_id, sum_reserves: self._get_tiny_available_stock_v3(tiny_id, sum_reserves_if_true=sum_reserves),
+            max_age_seconds=float(self.db_manager.get_app_config_value('stock_snapshot_max_age_seconds', 300) or 300),
+            id_resolver=self.tiny_id_resolver,
+        )
+        self.db_manager.add_tiny_products_listener(self.stock_snapshot.on_tiny_products_changed)
+        # Contas do ML e seus tokens (renovados pelo refresh_token quando perto de vencer)
+        self.ml_accounts = self.db_manager.load_all_ml_accounts()
+        self.ml_tokens = MLTokenProvider(self.db_manager, accounts=self.ml_accounts)
+        # Recálculo de preço em lote (pricing_rules + fixed_prices + preços do Tiny), usado pelo BulkWorker
+        self.pricing_engine = PricingEngine(
+            self.db_manager, details_fn=self._get_tiny_product_details_by_sku,
+            details_cache=self.tiny_product_details_cache,
+            max_workers=int(self.db_manager.get_app_config_value('pricing_fetch_workers', 8) or 8),
+        )
+        # Tarefas concluídas saem da fila para task_history (prazos por tipo no app_config)
+        self.queue_retention = QueueRetentionService(
+            self.db_manager,
+            interval_seconds=float(self.db_manager.get_app_config_value('queue_retention_interval_seconds', 900) or 900),
+        )
+        self.queue_retention.start()
         # === Configuração da Interface ===
         self._setup_ui()
 
@@ -50,6 +106,18 @@ class App:
         self.promo_worker_event = threading.Event()
         self.stock_divergence_worker_event = threading.Event()
         self.auto_promo_worker_event = threading.Event()
+        self.bulk_edit_worker_event = self.bulk_worker_event  # nome usado pelo BulkWorker e por _trigger_bulk_edit_processing
+
+        # A fila acorda o worker do tipo certo assim que algo é enfileirado (de qualquer caminho:
+        # TaskEnqueueService, add_item_to_price_check_queue, reset na Fila...). O timeout do wait()
+        # nos workers fica só como rede de segurança.
+        notifier = self.db_manager.queue_notifier
+        notifier.subscribe("BULK_EDIT", self.bulk_edit_worker_event)
+        notifier.subscribe("PRICE_CHECK", self.price_check_worker_event)
+        notifier.subscribe("STOCK_DIVERGENCE", self.stock_divergence_worker_event)
+        notifier.subscribe("AUTO_PROMO", self.auto_promo_worker_event)  # PromoWorker e AutoPromoWorker
+        if self.db_manager.get_app_config_value("queue_cross_process_wakeup", False):
+            self.db_manager.start_queue_watcher()
 
         # Instâncias dos workers (placeholder)
         self.bulk_worker = BulkWorker(self)
@@ -58,6 +126,11 @@ class App:
         self.stock_divergence_worker = StockDivergenceWorker(self)
         self.auto_promo_worker = AutoPromoWorker(self)
 
+        # Pool de conexões HTTP por host do tamanho da concorrência total dos workers
+        configure_pools(sum(w.pool.max_workers for w in (
+            self.bulk_worker, self.price_check_worker, self.promo_worker,
+            self.stock_divergence_worker, self.auto_promo_worker)) + 2)
+
     # -------------------------------------------------
     # Interface Principal
     # -------------------------------------------------
@@ -174,6 +247,18 @@ class App:
         self._ensure_thread_started("auto_promo_worker")
         self.auto_promo_worker_event.set()
 
+    def _trigger_tiny_catalog_sync(self, full=False, on_done=None):
+        """Sincroniza o catálogo Tiny (só o que mudou desde a última vez) numa thread; on_done(report) roda na UI."""
+        def _run():
+            try:
+                report = TinyCatalogSync(self.db_manager, self._tiny_api_v3_request).run(full=full)
+            except Exception as e:  # a UI precisa do retorno mesmo se a sincronização quebrar
+                print(f"[TinyCatalogSync] Erro inesperado: {e}")
+                report = TinySyncReport(False, f"Falha na sincronização do catálogo Tiny: {e}")
+            if on_done:
+                self.root.after(0, lambda: on_done(report))
+        threading.Thread(target=_run, name="tiny_catalog_sync", daemon=True).start()
+
     def _trigger_promo_activation_processing(self):
         """Se você separar PROMO_ACTIVATION do AUTO_PROMO, sinalize aqui um event específico."""
         self._ensure_thread_started("promo_worker")
@@ -197,22 +282,24 @@ class App:
         
         url = f"{TINY_V3_API_BASE_URL}{endpoint}"
         
+        # Todas as chamadas v3 dividem o mesmo bucket (uma conta Tiny por instalação)
+        limiter = get_rate_limiter()
         max_retries = 3 
         for attempt in range(max_retries):
             try:
-                response = requests.request(
+                limiter.acquire(url, "tiny_v3")
+                response = get_session(url).request(
                     method=method.upper(), url=url, headers=headers,
                     params=params, json=json_data, timeout=25
                 )
+                limiter.report(url, "tiny_v3", response.status_code, response.headers.get('Retry-After'))
 
-                if response.status_code == 429: # Rate Limit
+                if response.status_code == 429: # Rate Limit: o bucket já pausou pelo Retry-After (ou backoff)
                     if attempt < max_retries - 1:
-                        retry_after_header = response.headers.get('Retry-After')
-                        wait_time = int(retry_after_header) if retry_after_header and retry_after_header.isdigit() else 2 ** (attempt + 1)
-                        print(f"Tiny API Rate Limit (429). Tentativa {attempt + 1}/{max_retries}. Aguardando {wait_time}s...")
+                        wait_time = limiter.bucket(url, "tiny_v3").snapshot()["paused_for_s"]
+                        print(f"Tiny API Rate Limit (429). Tentativa {attempt + 1}/{max_retries}. Aguardando {wait_time:.0f}s...")
                         if hasattr(self, 'tiny_products_status_label'):
-                            self.root.after(0, lambda w=wait_time: self.tiny_products_status_label.config(text=f"Rate Limit API Tiny. Aguardando {w}s..."))
-                        time.sleep(wait_time)
+                            self.root.after(0, lambda w=wait_time: self.tiny_products_status_label.config(text=f"Rate Limit API Tiny. Aguardando {w:.0f}s..."))
                         continue
                     else:
                         print(f"Tiny API Rate Limit (429) persistente após {max_retries} tentativas. Abortando.")
@@ -260,6 +347,28 @@ class App:
         
         return None
 
+    def _get_current_ml_access_token_for_account(self, account_nickname):
+        """Access token válido da conta do ML (renovado se estiver para vencer), ou None."""
+        return self.ml_tokens.get_token(account_nickname)
+
+    def _get_tiny_product_id_by_sku(self, sku):
+        """Id do produto no Tiny para o SKU (índice local de tiny_products; API só em falta)."""
+        return self.tiny_id_resolver.resolve(sku)
+
+    def _get_tiny_product_details_by_sku(self, sku):
+        """Detalhes v3 do produto (com "precos") para o SKU, ou None se o SKU não existir no Tiny."""
+        tiny_id = self._get_tiny_product_id_by_sku(sku)
+        return self._get_tiny_product_details_v3(tiny_id) if tiny_id else None
+
+    def _recalculate_price_unified(self, account_nickname, sku, listing_type_id=None, item_id=None) -> dict:
+        """
+        Recálculo unitário: só as regras de pricing_rules (e fixed_prices) valem, o mesmo cálculo do
+        PricingEngine em lote. O preço e o custo do Tiny (tiny_price/tiny_cost) são buscados pelo
+        próprio motor, então regras sobre tiny_cost usam o precoCusto de verdade.
+        Retorna {final_price, error, calculation_details}.
+        """
+        return self.pricing_engine.price_one(account_nickname, sku, listing_type_id=listing_type_id, item_id=item_id)
+
     def _get_tiny_available_stock_v3(self, tiny_product_id_v3: str, sum_reserves_if_true: bool = False) -> float | None:
         """
         [VERSÃO CORRIGIDA E FINAL V2] Busca o saldo de um produto na Tiny API v3.
@@ -346,6 +455,32 @@ class App:
         print(f"  -> {log_prefix}ERRO: Campo de saldo ('saldo' ou 'disponivel') não encontrado ou inválido no depósito '{deposito_alvo.get('nome')}'.")
         return None
 
+    def _resolve_tiny_qty_action(self, actions, sku_for_stock, item_id):
+        """
+        Troca a ação de quantidade 'from_tiny_qty' pelo estoque do Tiny já resolvido ('manual'),
+        lido da foto de estoque (services.stock_snapshot). Sem estoque, a ação é removida.
+        Usado pelo BulkWorker e por _dispatch_ml_updates.
+        """
+        print(f"    Buscando estoque do Tiny para {item_id} antes da execução...")
+        if not sku_for_stock:
+            print(f"    ERRO: SKU não encontrado no anúncio {item_id}. Ação de quantidade removida.")
+            del actions["available_quantity"]
+            return
+        # pode ser tk.BooleanVar ou bool
+        var = getattr(self, 'update_qty_sync_tiny_var', False)
+        sum_reserves_flag = var.get() if hasattr(var, 'get') else bool(var)
+        stock_from_tiny = self.stock_snapshot.get_available_stock(sku_for_stock, sum_reserves=sum_reserves_flag)
+        if stock_from_tiny is None:
+            print(f"    ERRO ao buscar estoque do Tiny para SKU '{sku_for_stock}'. Ação de quantidade removida.")
+            del actions["available_quantity"]
+            return
+        stock_to_send = int(stock_from_tiny)
+        if stock_to_send < 0:
+            print(f"    AVISO: Estoque do Tiny para SKU '{sku_for_stock}' é negativo ({stock_to_send}). Ajustando para 0.")
+            stock_to_send = 0
+        actions["available_quantity"] = {"source": "manual", "value": stock_to_send}
+        print(f"    Estoque Tiny do SKU '{sku_for_stock}' encontrado e ajustado: {stock_to_send}. Ação de quantidade atualizada para 'manual'.")
+
     def _dispatch_ml_updates(self, item_id, actions, account_nickname, original_item_data) -> tuple[bool, list]:
         """
         [ORQUESTRADOR CORRIGIDO FINAL]
@@ -372,30 +507,16 @@ class App:
         overall_success = True
 
         sku_for_price = self._get_sku_from_item_data(original_item_data)
-        fixed_price_for_sku = self.fixed_prices.get(sku_for_price.upper()) if sku_for_price else None
+        fixed_price_for_sku = self.fixed_prices.get(normalize_sku(sku_for_price)) if sku_for_price else None
 
         if fixed_price_for_sku is not None:
             print(f"    -> PREÇO FIXO ENCONTRADO para SKU '{sku_for_price}': R$ {fixed_price_for_sku:.2f}. Sobrescrevendo qualquer ação de preço.")
             actions["price"] = {"source": "manual", "value": float(fixed_price_for_sku)}
         elif "price" in actions and actions["price"].get("source") == "recalculate_new":
             print(f"    Recalculando preço para {item_id} para execução...")
-            price_rules = actions["price"].get("value", {})
-            cost_price_for_recalc = 0.0
-
             if sku_for_price:
-                tiny_details = self.tiny_product_details_cache.get(sku_for_price)
-                if not tiny_details:
-                    tiny_id = self._get_tiny_product_id_by_sku(sku_for_price)
-                    if tiny_id: tiny_details = self._get_tiny_product_details_v3(tiny_id)
-                if tiny_details:
-                    self.tiny_product_details_cache[sku_for_price] = tiny_details
-                    precos_tiny = tiny_details.get("precos", {})
-                    cost_price_for_recalc = float(precos_tiny.get("precoPromocional", 0.0) or 0.0) or float(precos_tiny.get("preco", 0.0) or 0.0)
-
-            if cost_price_for_recalc > 0:
                 calc_result = self._recalculate_price_unified(
-                    account_data=self.ml_accounts.get(account_nickname), cost_price=cost_price_for_recalc, rules=price_rules,
-                    category_id=original_item_data.get("category_id"),
+                    account_nickname, sku_for_price,
                     listing_type_id=original_item_data.get("listing_type_id"), item_id=item_id
                 )
                 self.bulk_price_recalc_logs.append({
@@ -410,7 +531,7 @@ class App:
                     print(f"    ERRO ao recalcular preço para {item_id}. Ação de preço removida da tarefa.")
             else:
                 del actions["price"]
-                print(f"    Custo do produto não encontrado para {item_id}. Ação de preço removida.")
+                print(f"    SKU não encontrado para {item_id}. Ação de preço removida.")
 
         token = self._get_current_ml_access_token_for_account(account_nickname)
         if not token:
@@ -459,33 +580,7 @@ class App:
                 main_put_payload["price"] = round(float(new_price), 2)
 
         if "available_quantity" in actions and actions["available_quantity"].get("source") == "from_tiny_qty":
-            print(f"    Buscando estoque do Tiny para {item_id} antes da execução...")
-            sku_for_stock = self._get_sku_from_item_data(original_item_data)
-            if sku_for_stock:
-                tiny_id_for_stock = None
-                params_find_id = {'codigo': sku_for_stock.strip(), 'limit': 1}
-                response_find_id = self._tiny_api_v3_request('GET', '/produtos', params=params_find_id)
-                if response_find_id and response_find_id.get("itens"):
-                    tiny_id_for_stock = str(response_find_id["itens"][0].get("id"))
-                if tiny_id_for_stock:
-                    sum_reserves_flag = self.update_qty_sync_tiny_var.get() if hasattr(self, 'update_qty_sync_tiny_var') else False
-                    stock_from_tiny = self._get_tiny_available_stock_v3(tiny_id_for_stock, sum_reserves_if_true=sum_reserves_flag)
-                    if stock_from_tiny is not None:
-                        stock_to_send = int(stock_from_tiny)
-                        if stock_to_send < 0:
-                            print(f"    AVISO: Estoque do Tiny para SKU '{sku_for_stock}' (ID: {tiny_id_for_stock}) é negativo ({stock_to_send}). Ajustando para 0.")
-                            stock_to_send = 0
-                        actions["available_quantity"] = {"source": "manual", "value": stock_to_send}
-                        print(f"    Estoque Tiny (ID: {tiny_id_for_stock}) encontrado e ajustado: {stock_to_send}. Ação de quantidade atualizada para 'manual'.")
-                    else:
-                        print(f"    ERRO ao buscar estoque do Tiny para SKU '{sku_for_stock}' (ID: {tiny_id_for_stock}). Ação de quantidade removida.")
-                        del actions["available_quantity"]
-                else:
-                    print(f"    ERRO: SKU '{sku_for_stock}' não encontrado no Tiny. Ação de quantidade removida.")
-                    del actions["available_quantity"]
-            else:
-                print(f"    ERRO: SKU não encontrado no anúncio {item_id}. Ação de quantidade removida.")
-                del actions["available_quantity"]
+            self._resolve_tiny_qty_action(actions, self._get_sku_from_item_data(original_item_data), item_id)
         # <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<< INÍCIO DA CORREÇÃO PONTUAL >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
         # Lógica para adicionar 'available_quantity' ao payload, APÓS ter sido resolvida do Tiny
         if "available_quantity" in actions and actions["available_quantity"].get("value") is not None:
@@ -793,3 +888,6 @@ class App:
     # -------------------------------------------------
     def run(self):
         self.root.mainloop()
+        self.queue_retention.stop()
+        self.tiny_product_details_cache.save()
+        close_all_sessions()
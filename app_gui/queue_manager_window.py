@@ -2,6 +2,8 @@ import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, filedialog
 from datetime import datetime
 
+from core.rate_limiter import get_rate_limiter
+
 class UnifiedQueueManagerWindow(tk.Toplevel):
     def __init__(self, master, app_instance):
         super().__init__(master)
@@ -36,6 +38,8 @@ class UnifiedQueueManagerWindow(tk.Toplevel):
             "Todos": None, # Usará None para não filtrar por status no DB
             "Pendentes": "PENDING",
             "Com Erro": "ERROR",
+            "Esgotados": "DEAD",
+            "Substituídas": "SUPERSEDED",
             "Concluídos": "DONE",
             "Processando": "PROCESSING"
         }
@@ -88,9 +92,11 @@ class UnifiedQueueManagerWindow(tk.Toplevel):
         self.tree.heading("error", text="Último Erro/Resultado"); self.tree.column("error", width=300)
         
         self.tree.tag_configure('ERROR', background='#FFCDD2')
+        self.tree.tag_configure('DEAD', background='#B0BEC5')
         self.tree.tag_configure('PENDING', background='#FFF9C4')
         self.tree.tag_configure('PROCESSING', background='#C5E1A5')
         self.tree.tag_configure('DONE', background='#E8F5E9')
+        self.tree.tag_configure('SUPERSEDED', background='#ECEFF1')
 
         ysb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
         xsb = ttk.Scrollbar(tree_frame, orient="horizontal", command=self.tree.xview)
@@ -109,15 +115,19 @@ class UnifiedQueueManagerWindow(tk.Toplevel):
         ttk.Button(action_frame, text="Limpar TODA a Fila", command=self._clear_all).pack(side=tk.LEFT, padx=15)
         ttk.Frame(action_frame).pack(side=tk.LEFT, fill=tk.X, expand=True) 
         ttk.Button(action_frame, text="Atualizar", command=self._populate_queue_tree).pack(side=tk.RIGHT)
+        # Vazão ao vivo dos WorkerPools (tarefas/s no último minuto)
+        self.throughput_label = ttk.Label(action_frame, text="")
+        self.throughput_label.pack(side=tk.RIGHT, padx=10)
 
     # --- INÍCIO DOS NOVOS MÉTODOS PARA O RELATÓRIO ---
     def _generate_error_report(self):
-        """Busca todas as tarefas com erro e exibe em uma nova janela de relatório."""
+        """Busca todas as tarefas com erro (ERROR e DEAD) e exibe em uma nova janela de relatório."""
         self.update_idletasks()
         self.config(cursor="watch")
         
         # Busca todas as tarefas com erro, sem limite de quantidade
-        error_tasks = self.db.get_tasks_from_queue(status='ERROR', limit=None)
+        error_tasks = (self.db.get_tasks_from_queue(status='ERROR', limit=None)
+                       + self.db.get_tasks_from_queue(status='DEAD', limit=None))
         
         self.config(cursor="")
 
@@ -131,6 +141,7 @@ class UnifiedQueueManagerWindow(tk.Toplevel):
             task_type_display = self.TASK_TYPE_DISPLAY_MAP.get(task['task_type'], task['task_type'])
             report_lines.append(f"ID Tarefa: {task['task_id']}")
             report_lines.append(f"Tipo: {task_type_display}")
+            report_lines.append(f"Status: {'Esgotou as tentativas' if task['status'] == 'DEAD' else 'Erro'}")
             report_lines.append(f"Alvo: {task.get('item_id') or 'N/A'}")
             report_lines.append(f"Conta: {task.get('account_nickname') or 'N/A'}")
             report_lines.append(f"Tentativas: {task.get('retry_count', 0)}")
@@ -233,6 +244,25 @@ class UnifiedQueueManagerWindow(tk.Toplevel):
                 details_display, (item.get('last_error_message') or "")[:150]
             ), tags=tags)
         self.title(f"Gerenciador de Fila Unificado ({len(items)} tarefas)")
+        self._refresh_throughput_label()
+
+    def _refresh_throughput_label(self):
+        """Mostra a vazão de cada WorkerPool ativo e reagenda a si mesma enquanto a janela existir."""
+        parts = []
+        for attr in ("bulk_worker", "price_check_worker", "stock_divergence_worker", "promo_worker", "auto_promo_worker"):
+            pool = getattr(getattr(self.app, attr, None), "pool", None)
+            if pool is None:
+                continue
+            stats = pool.stats()
+            if stats["done"] or stats["errors"] or stats["active"]:
+                parts.append(f"{stats['task_type']}: {stats['per_second']:.1f}/s ({stats['active']}/{stats['workers']} ativos)")
+        throttled = get_rate_limiter().total_throttled()
+        if throttled:
+            parts.append(f"429 recebidos: {throttled}")
+        self.throughput_label.config(text=" | ".join(parts) or "Workers ociosos")
+        if getattr(self, "_throughput_after_id", None):
+            self.after_cancel(self._throughput_after_id)
+        self._throughput_after_id = self.after(2000, self._refresh_throughput_label)
 
     def _process_all_now(self):
         messagebox.showinfo("Ação", "Sinalizando todos os workers para processarem suas filas pendentes.", parent=self)
@@ -287,15 +317,15 @@ class UnifiedQueueManagerWindow(tk.Toplevel):
         task_ids_to_reset = []
         if selected_iids:
             task_ids_to_reset = [int(iid) for iid in selected_iids]
-        else: # Se nada selecionado, reseta todos com erro
-            all_tasks = self.db.get_tasks_from_queue(status='ERROR')
+        else: # Se nada selecionado, reseta todos com erro ou que esgotaram as tentativas
+            all_tasks = self.db.get_tasks_from_queue(status='ERROR') + self.db.get_tasks_from_queue(status='DEAD')
             task_ids_to_reset = [t['task_id'] for t in all_tasks]
 
         if not task_ids_to_reset:
             messagebox.showinfo("Ação", "Nenhuma tarefa com erro encontrada para resetar.", parent=self)
             return
 
-        if messagebox.askyesno("Confirmar", f"Resetar {len(task_ids_to_reset)} tarefa(s) com erro para o status 'PENDING'?", parent=self):
+        if messagebox.askyesno("Confirmar", f"Resetar {len(task_ids_to_reset)} tarefa(s) com erro/esgotada(s) para o status 'PENDING'?", parent=self):
             updated_count = self.db.reset_tasks_by_ids(task_ids_to_reset)
             messagebox.showinfo("Sucesso", f"{updated_count} tarefa(s) foram resetadas.", parent=self)
             self._populate_queue_tree()
@@ -51,6 +51,13 @@ class TabTinyProducts(ttk.Frame):
             command=self._on_auto_promo_clicked,
         ).pack(side="left", padx=4)
 
+        # 4) Sincronização incremental do catálogo pela API do Tiny
+        ttk.Button(
+            actions,
+            text="Sincronizar Catálogo Tiny",
+            command=self._on_sync_catalog_clicked,
+        ).pack(side="left", padx=4)
+
         # Separador
         ttk.Separator(self, orient="horizontal").pack(fill="x", pady=(8, 8))
 
@@ -107,3 +114,13 @@ class TabTinyProducts(ttk.Frame):
             self.status_var.set("Sinal enviado ao worker de Auto Promo.")
         except Exception as e:
             messagebox.showerror("Erro", f"Falha ao sinalizar Auto Promo:\n{e}", parent=self)
+
+    def _on_sync_catalog_clicked(self):
+        """
+        Busca na API do Tiny só os produtos alterados desde a última sincronização.
+        """
+        try:
+            self.status_var.set("Sincronizando catálogo do Tiny...")
+            self.app._trigger_tiny_catalog_sync(on_done=lambda report: self.status_var.set(report.message))
+        except Exception as e:
+            messagebox.showerror("Erro", f"Falha ao iniciar a sincronização do catálogo:\n{e}", parent=self)
@@ -1,9 +1,53 @@
 import sqlite3
 import threading
 import os
+import re
 import sys
+import json
+import itertools
+from datetime import datetime, timedelta
 import pandas as pd
 from tkinter import messagebox
+from core.queue_notifier import QueueNotifier, WalQueueWatcher
+from core.text_utils import normalize_sku
+from core.ttl_cache import TTLCache
+from core.tiny_import import TINY_IMPORT_COLUMNS, iter_frame_chunks, iter_tiny_rows
+
+# O índice de tiny_products.sku_key alterna entre estes dois nomes: a tabela de staging
+# da substituição completa é indexada antes da troca, enquanto o índice atual ainda existe.
+TINY_SKU_KEY_INDEX_NAMES = ("idx_tiny_products_sku_key", "idx_tiny_products_sku_key_b")
+
+# Status finais: tarefas nesses status saem de unified_task_queue para task_history (archive_finished_tasks).
+# As falhas (ERROR fatal, DEAD com as tentativas esgotadas) têm prazo próprio na QueueRetentionService,
+# mais longo, para dar tempo de reenfileirar pela janela da fila.
+COMPLETED_TASK_STATUSES = ("DONE", "SUPERSEDED")
+FAILED_TASK_STATUSES = ("ERROR", "DEAD")
+ARCHIVABLE_TASK_STATUSES = COMPLETED_TASK_STATUSES + FAILED_TASK_STATUSES
+
+# Deduplicação no enfileiramento: task_types com dedup ligado por padrão (app_config queue_dedup_<tipo>).
+# A chave é tipo|conta|item e o índice único parcial idx_unified_queue_dedup só vale para PENDING,
+# então cada item tem no máximo uma tarefa pendente; um novo enfileiramento é fundido a ela.
+DEDUP_TASK_TYPES = ("PRICE_CHECK", "AUTO_PROMO")
+# Regras de fusão (app_config queue_dedup_payload_<tipo> / queue_dedup_schedule_<tipo>)
+DEDUP_PAYLOAD_MERGE = {
+    "newest": "excluded.payload_json",   # fica o payload do último enfileiramento
+    "oldest": "payload_json",            # fica o payload da tarefa já pendente
+}
+DEDUP_SCHEDULE_MERGE = {
+    "earliest": "MIN(scheduled_for, excluded.scheduled_for)",
+    "newest": "excluded.scheduled_for",
+    "oldest": "scheduled_for",
+}
+# Volta uma tarefa para PENDING, a menos que já exista outra pendente com a mesma dedup_key
+# (aí ela vira SUPERSEDED). Usado em UPDATEs de uma linha, da tarefa mais nova para a mais antiga.
+_REQUEUE_STATUS_SQL = """
+    CASE WHEN dedup_key IS NOT NULL AND EXISTS (
+        SELECT 1 FROM unified_task_queue AS twin
+         WHERE twin.dedup_key = unified_task_queue.dedup_key AND twin.status = 'PENDING'
+           AND twin.task_id != unified_task_queue.task_id
+    ) THEN 'SUPERSEDED' ELSE 'PENDING' END
+"""
+
 
 class DatabaseManager:
     """
@@ -31,6 +75,15 @@ class DatabaseManager:
         # --- FIM DA LÓGICA ROBUSTA ---
 
         self.thread_local = threading.local()
+        # Workers se inscrevem aqui por task_type e acordam assim que algo é enfileirado
+        self.queue_notifier = QueueNotifier()
+        self._queue_watcher = None
+        self._sku_key_unique = False  # definido na migração (índice único em tiny_products.sku_key)
+        self._tiny_products_listeners = []  # avisados quando SKU/id_produto/id_pai mudam (ex.: TinyIdResolver)
+        self._pricing_version = 0  # muda a cada gravação em pricing_rules/fixed_prices (índice do PricingEngine)
+        self._pricing_version_lock = threading.Lock()
+        # task_type -> (dedup ligado?, ON CONFLICT): lido do app_config uma vez por minuto, não a cada enfileiramento
+        self._dedup_settings_cache = TTLCache(64, 60, name="queue_dedup_settings")
         try:
             os.makedirs(os.path.dirname(self.db_name), exist_ok=True)
             conn = sqlite3.connect(self.db_name)
@@ -61,27 +114,139 @@ class DatabaseManager:
 
     def update_task_result(self, task_id, result_message):
         """[UNIFICADO] Define o status de uma tarefa como DONE e salva sua mensagem de resultado."""
-        query = "UPDATE unified_task_queue SET status = 'DONE', last_error_message = ? WHERE task_id = ?"
+        query = "UPDATE unified_task_queue SET status = 'DONE', last_error_message = ?, updated_timestamp = CURRENT_TIMESTAMP WHERE task_id = ?"
         self._execute_query(query, (result_message, task_id), commit=True)
 
-    def add_task_to_queue(self, task_type: str, account_nickname: str, item_id: str = None, payload: dict = None, delay_minutes: int = 0):
-        """[CORRIGIDO] Adiciona QUALQUER tarefa à fila unificada."""
+    def add_task_to_queue(self, task_type: str, account_nickname: str, item_id: str = None, payload: dict = None, delay_minutes: int = 0, priority: int = 0):
+        """
+        [CORRIGIDO] Adiciona QUALQUER tarefa à fila unificada.
+        A tarefa só é entregue aos workers a partir de 'scheduled_for' (agora + delay_minutes);
+        'priority' maior é processada antes.
+        """
         payload_json = json.dumps(payload, ensure_ascii=False) if payload else '{}'
         scheduled_time = datetime.now() + timedelta(minutes=delay_minutes)
-        query = """
-            INSERT INTO unified_task_queue (task_type, account_nickname, item_id, payload_json, scheduled_for)
-            VALUES (?, ?, ?, ?, ?)
+        dedup_enabled, on_conflict = self._dedup_settings(task_type)
+        dedup_key = self._dedup_key(task_type, account_nickname, item_id) if dedup_enabled else None
+        query = f"""
+            INSERT INTO unified_task_queue (task_type, account_nickname, item_id, payload_json, scheduled_for, priority, dedup_key)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            {on_conflict}
         """
         try:
-            self._execute_query(query, (task_type, account_nickname, item_id, payload_json, scheduled_time), commit=True)
+            # _execute_query engole o erro do SQLite e devolve None: só notifica se a linha entrou
+            cursor = self._execute_query(query, (task_type, account_nickname, item_id, payload_json, scheduled_time, priority, dedup_key), commit=True)
+            if cursor is None or cursor.rowcount < 1:
+                print(f"DB: Tarefa '{task_type}' para item '{item_id or 'N/A'}' NÃO foi adicionada à fila unificada.")
+                return False
             print(f"DB: Tarefa '{task_type}' para item '{item_id or 'N/A'}' adicionada à fila unificada.")
+            self.queue_notifier.notify(task_type)
             return True
         except Exception as e:
             print(f"DB: Erro ao adicionar tarefa '{task_type}' à fila: {e}")
             return False
 
-    def get_tasks_from_queue(self, task_type: str = None, status: str = 'PENDING', limit: int = 10, task_ids: list = None):
-        """[CORRIGIDO] Busca tarefas da fila unificada. Pode filtrar por tipo, status ou IDs."""
+    def add_tasks_to_queue_bulk(self, task_type: str, items, chunk_size: int = 1000) -> list[int]:
+        """
+        [UNIFICADO] Enfileira muitas tarefas do mesmo tipo de uma vez.
+        Cada item é um dict com 'account_nickname' e, opcionalmente, 'item_id', 'payload',
+        'delay_minutes' e 'priority'. Os payloads são serializados uma única vez (o mesmo dict
+        compartilhado por vários itens reaproveita o JSON) e as linhas entram via executemany,
+        uma transação por bloco de chunk_size itens. Retorna os task_ids inseridos; com dedup,
+        itens fundidos a uma tarefa já pendente não geram task_id novo.
+        """
+        dedup_enabled, on_conflict = self._dedup_settings(task_type)
+        query = f"""
+            INSERT INTO unified_task_queue (task_type, account_nickname, item_id, payload_json, scheduled_for, priority, dedup_key)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            {on_conflict}
+        """
+        now_local = datetime.now()
+        payload_json_cache = {}  # id(payload) -> (payload, json); guarda a referência para o id não ser reutilizado
+
+        def _to_row(item):
+            payload = item.get('payload')
+            if payload:
+                cached = payload_json_cache.get(id(payload))
+                if cached is None or cached[0] is not payload:
+                    cached = payload_json_cache[id(payload)] = (payload, json.dumps(payload, ensure_ascii=False))
+                payload_json = cached[1]
+            else:
+                payload_json = '{}'
+            delay_minutes = item.get('delay_minutes') or 0
+            scheduled_time = now_local + timedelta(minutes=delay_minutes) if delay_minutes else now_local
+            dedup_key = self._dedup_key(task_type, item['account_nickname'], item.get('item_id')) if dedup_enabled else None
+            return (task_type, item['account_nickname'], item.get('item_id'), payload_json, scheduled_time,
+                    item.get('priority') or 0, dedup_key)
+
+        conn = self._get_thread_connection()
+        inserted_ids = []
+        merged = 0
+        items_iter = iter(items or [])
+        try:
+            while True:
+                chunk = [_to_row(item) for item in itertools.islice(items_iter, chunk_size)]
+                if not chunk:
+                    break
+                with conn:
+                    # IMMEDIATE: ninguém mais insere até o commit, então os novos task_ids são os > last_id
+                    conn.execute("BEGIN IMMEDIATE")
+                    last_id = conn.execute("SELECT COALESCE(MAX(task_id), 0) FROM unified_task_queue").fetchone()[0]
+                    conn.executemany(query, chunk)
+                    rows = conn.execute("SELECT task_id FROM unified_task_queue WHERE task_id > ? ORDER BY task_id", (last_id,)).fetchall()
+                inserted_ids.extend(row[0] for row in rows)
+                merged += len(chunk) - len(rows)
+        except sqlite3.Error as e:
+            print(f"DB: Erro no enfileiramento em lote '{task_type}' (inseridas {len(inserted_ids)} antes do erro): {e}")
+        if merged:
+            print(f"DB: {merged} tarefas '{task_type}' fundidas a tarefas pendentes equivalentes (dedup).")
+        if inserted_ids or merged:
+            print(f"DB: {len(inserted_ids)} tarefas '{task_type}' adicionadas à fila unificada (lote).")
+            self.queue_notifier.notify(task_type)
+        return inserted_ids
+
+    @staticmethod
+    def _dedup_key(task_type, account_nickname, item_id):
+        """Chave de deduplicação (tipo|conta|item); tarefas sem item_id não são deduplicadas."""
+        if not item_id:
+            return None
+        return f"{task_type}|{account_nickname}|{item_id}"
+
+    def _dedup_settings(self, task_type: str):
+        """
+        (dedup ligado?, cláusula ON CONFLICT) do task_type, pelo app_config:
+            queue_dedup_<tipo>            liga/desliga (padrão: ligado para DEDUP_TASK_TYPES)
+            queue_dedup_payload_<tipo>    'newest' (padrão) ou 'oldest'
+            queue_dedup_schedule_<tipo>   'earliest' (padrão), 'newest' ou 'oldest'
+        A tarefa fundida fica com a maior priority das duas.
+        Em cache por 60s (set_app_config_value de uma chave queue_dedup_* limpa na hora neste processo).
+        """
+        cached = self._dedup_settings_cache.get(task_type)
+        if cached is None:
+            cached = self._load_dedup_settings(task_type)
+            self._dedup_settings_cache.set(task_type, cached)
+        return cached
+
+    def _load_dedup_settings(self, task_type: str):
+        key = (task_type or "").lower()
+        enabled = bool(self.get_app_config_value(f"queue_dedup_{key}", task_type in DEDUP_TASK_TYPES))
+        if not enabled:
+            return False, ""
+        payload_mode = self.get_app_config_value(f"queue_dedup_payload_{key}", "newest")
+        schedule_mode = self.get_app_config_value(f"queue_dedup_schedule_{key}", "earliest")
+        payload_sql = DEDUP_PAYLOAD_MERGE.get(payload_mode, DEDUP_PAYLOAD_MERGE["newest"])
+        schedule_sql = DEDUP_SCHEDULE_MERGE.get(schedule_mode, DEDUP_SCHEDULE_MERGE["earliest"])
+        return True, f"""
+            ON CONFLICT(dedup_key) WHERE dedup_key IS NOT NULL AND status = 'PENDING' DO UPDATE SET
+                payload_json = {payload_sql}, scheduled_for = {schedule_sql},
+                priority = MAX(priority, excluded.priority), updated_timestamp = CURRENT_TIMESTAMP
+        """
+
+    def get_tasks_from_queue(self, task_type: str = None, status: str = 'PENDING', limit: int = 10, task_ids: list = None, only_due: bool = False):
+        """
+        [CORRIGIDO] Busca tarefas da fila unificada. Pode filtrar por tipo, status ou IDs.
+        Com only_due=True ignora tarefas agendadas para o futuro e devolve na ordem de
+        consumo (priority, scheduled_for), a mesma usada por claim_tasks.
+        """
         base_query = "SELECT * FROM unified_task_queue"
         conditions = []
         params = []
@@ -97,11 +262,17 @@ class DatabaseManager:
             if status:
                 conditions.append("status = ?")
                 params.append(status)
+            if only_due:
+                conditions.append("(scheduled_for IS NULL OR scheduled_for <= ?)")
+                params.append(datetime.now())
         
         if conditions:
             base_query += " WHERE " + " AND ".join(conditions)
         
-        base_query += " ORDER BY added_timestamp ASC"
+        if only_due:
+            base_query += " ORDER BY priority DESC, scheduled_for ASC, task_id ASC"
+        else:
+            base_query += " ORDER BY added_timestamp ASC"
         if limit is not None:
             base_query += " LIMIT ?"
             params.append(limit)
@@ -109,11 +280,79 @@ class DatabaseManager:
         rows = self._execute_query(base_query, tuple(params), fetch_all=True)
         return [dict(row) for row in rows] if rows else []
     
-    def update_task_status(self, task_id, new_status, error_message=None, increment_retry=True):
-        """[UNIFICADO] Atualiza o status, mensagem e opcionalmente o contador de retentativas de uma tarefa."""
-        set_clauses = ["status = ?", "last_error_message = ?"]
-        params = [new_status, error_message]
-        
+    def claim_tasks(self, task_type: str, worker_id: str, limit: int = 10, lease_seconds: int = 300) -> list[dict]:
+        """
+        [UNIFICADO] Reivindica atomicamente um lote de tarefas para um worker.
+        Seleciona e marca como PROCESSING em um único UPDATE ... RETURNING, gravando o dono
+        (worker_id) e a expiração do lease. Tarefas PROCESSING com lease vencido (worker que
+        morreu no meio do lote) voltam a ser elegíveis automaticamente.
+        Só entrega tarefas já vencidas (scheduled_for <= agora), por priority e depois scheduled_for,
+        o que é uma varredura do índice idx_unified_queue_dequeue.
+        """
+        if not task_type or not limit:
+            return []
+        now_local = datetime.now()
+        lease_expires_at = now_local + timedelta(seconds=lease_seconds)
+        expired_query = """
+            SELECT task_id FROM unified_task_queue
+             WHERE task_type = ? AND status = 'PROCESSING' AND lease_expires_at < ?
+             ORDER BY task_id DESC
+        """
+        reclaim_query = f"""
+            UPDATE unified_task_queue SET status = {_REQUEUE_STATUS_SQL}, updated_timestamp = CURRENT_TIMESTAMP
+             WHERE task_id = ? AND status = 'PROCESSING'
+        """
+        claim_query = """
+            UPDATE unified_task_queue
+               SET status = 'PROCESSING', worker_id = ?, lease_expires_at = ?, updated_timestamp = CURRENT_TIMESTAMP
+             WHERE task_id IN (
+                    SELECT task_id FROM unified_task_queue
+                     WHERE task_type = ? AND status = 'PENDING'
+                       AND (scheduled_for IS NULL OR scheduled_for <= ?)
+                     ORDER BY priority DESC, scheduled_for ASC
+                     LIMIT ?
+                   )
+            RETURNING *
+        """
+        conn = self._get_thread_connection()
+        try:
+            with conn:
+                expired = conn.execute(expired_query, (task_type, now_local)).fetchall()
+                if expired:  # da mais nova para a mais antiga: com dedup, a mais nova volta a PENDING
+                    conn.executemany(reclaim_query, [(row[0],) for row in expired])
+                rows = conn.execute(claim_query, (worker_id, lease_expires_at, task_type, now_local, limit)).fetchall()
+        except sqlite3.Error as e:
+            print(f"DB: Erro ao reivindicar tarefas '{task_type}' para '{worker_id}': {e}")
+            return []
+        # RETURNING não garante ordem; devolve o lote na ordem da fila.
+        return sorted((dict(row) for row in rows), key=lambda t: (-(t['priority'] or 0), str(t['scheduled_for'] or ''), t['task_id']))
+
+    def extend_task_leases(self, task_ids: list, worker_id: str, lease_seconds: int = 300) -> int:
+        """[UNIFICADO] Renova o lease de tarefas ainda em posse do worker (TaskOutcomeBuffer.hold, durante lotes longos)."""
+        if not task_ids: return 0
+        placeholders = ','.join('?' for _ in task_ids)
+        query = f"""
+            UPDATE unified_task_queue SET lease_expires_at = ?, updated_timestamp = CURRENT_TIMESTAMP
+             WHERE status = 'PROCESSING' AND worker_id = ? AND task_id IN ({placeholders})
+        """
+        params = (datetime.now() + timedelta(seconds=lease_seconds), worker_id) + tuple(task_ids)
+        cursor = self._execute_query(query, params, commit=True)
+        return cursor.rowcount if cursor else 0
+
+    def update_task_status(self, task_id, new_status, error_message=None, increment_retry=None):
+        """
+        [UNIFICADO] Atualiza o status, mensagem e opcionalmente o contador de retentativas de uma tarefa.
+        increment_retry=None: só conta tentativa em status de falha (ERROR/DEAD).
+        """
+        if new_status == 'PENDING':  # não pode colidir com outra tarefa pendente de mesma dedup_key
+            set_clauses = [f"status = {_REQUEUE_STATUS_SQL}", "last_error_message = ?", "updated_timestamp = CURRENT_TIMESTAMP"]
+            params = [error_message]
+        else:
+            set_clauses = ["status = ?", "last_error_message = ?", "updated_timestamp = CURRENT_TIMESTAMP"]
+            params = [new_status, error_message]
+        if increment_retry is None:
+            increment_retry = new_status in ('ERROR', 'DEAD')
+
         if increment_retry:
             set_clauses.append("retry_count = retry_count + 1")
         
@@ -122,6 +361,103 @@ class DatabaseManager:
         
         self._execute_query(query, tuple(params), commit=True)
 
+    @staticmethod
+    def _owner_clause(worker_id):
+        """(condição SQL, parâmetros) que restringe a atualização às tarefas ainda em posse do worker."""
+        if worker_id is None:
+            return "", ()
+        return " AND status = 'PROCESSING' AND worker_id = ?", (worker_id,)
+
+    @staticmethod
+    def _report_stale_outcomes(action, expected, affected, worker_id):
+        if worker_id is not None and affected < expected:
+            print(f"DB: {expected - affected} resultado(s) de '{worker_id}' descartado(s) ao {action}: "
+                  f"a tarefa não está mais com o worker (lease vencido e reivindicada de novo).")
+
+    def complete_tasks(self, results, delete: bool = False, worker_id: str = None) -> int:
+        """
+        [UNIFICADO] Finaliza muitas tarefas numa única transação (executemany).
+        results: [(task_id, mensagem), ...]. Marca DONE com a mensagem ou, com delete=True,
+        remove as tarefas da fila (caso do BULK_EDIT). Com worker_id, só toca tarefas ainda
+        PROCESSING em posse dele (um resultado atrasado não sobrescreve o novo dono).
+        Retorna quantas linhas foram afetadas.
+        """
+        results = [(task_id, message) for task_id, message in results if task_id is not None]
+        if not results:
+            return 0
+        owner_sql, owner_params = self._owner_clause(worker_id)
+        conn = self._get_thread_connection()
+        try:
+            with conn:
+                if delete:
+                    cursor = conn.executemany(f"DELETE FROM unified_task_queue WHERE task_id = ?{owner_sql}",
+                                              [(task_id,) + owner_params for task_id, _ in results])
+                else:
+                    cursor = conn.executemany(
+                        "UPDATE unified_task_queue SET status = 'DONE', last_error_message = ?, "
+                        f"updated_timestamp = CURRENT_TIMESTAMP WHERE task_id = ?{owner_sql}",
+                        [(message, task_id) + owner_params for task_id, message in results]
+                    )
+            self._report_stale_outcomes("finalizar", len(results), cursor.rowcount, worker_id)
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"DB: Erro ao finalizar {len(results)} tarefas em lote: {e}")
+            return 0
+
+    def fail_tasks(self, errors, status: str = 'ERROR', increment_retry: bool = True, worker_id: str = None) -> int:
+        """
+        [UNIFICADO] Registra a falha de muitas tarefas numa única transação (executemany).
+        errors: [(task_id, mensagem de erro), ...]. Com worker_id, só toca tarefas ainda em posse
+        dele (como em complete_tasks). Retorna quantas linhas foram afetadas.
+        """
+        errors = [(task_id, message) for task_id, message in errors if task_id is not None]
+        if not errors:
+            return 0
+        retry_clause = ", retry_count = retry_count + 1" if increment_retry else ""
+        owner_sql, owner_params = self._owner_clause(worker_id)
+        query = (f"UPDATE unified_task_queue SET status = ?, last_error_message = ?{retry_clause}, "
+                 f"updated_timestamp = CURRENT_TIMESTAMP WHERE task_id = ?{owner_sql}")
+        conn = self._get_thread_connection()
+        try:
+            with conn:
+                cursor = conn.executemany(query, [(status, message, task_id) + owner_params for task_id, message in errors])
+            self._report_stale_outcomes("registrar falha", len(errors), cursor.rowcount, worker_id)
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"DB: Erro ao registrar falha de {len(errors)} tarefas em lote: {e}")
+            return 0
+
+    def retry_tasks(self, retries, worker_id: str = None) -> int:
+        """
+        [UNIFICADO] Reagenda tarefas que falharam de forma transitória, numa única transação.
+        retries: [(task_id, mensagem, scheduled_for), ...]. Voltam para PENDING (sem dono/lease),
+        com retry_count + 1, e só são entregues de novo a partir de scheduled_for. Se já houver
+        outra tarefa pendente com a mesma dedup_key, a reagendada vira SUPERSEDED. Com worker_id,
+        só toca tarefas ainda em posse dele (como em complete_tasks).
+        """
+        retries = [(task_id, message, when) for task_id, message, when in retries if task_id is not None]
+        if not retries:
+            return 0
+        owner_sql, owner_params = self._owner_clause(worker_id)
+        conn = self._get_thread_connection()
+        try:
+            with conn:
+                cursor = conn.executemany(
+                    f"""
+                    UPDATE unified_task_queue
+                       SET status = {_REQUEUE_STATUS_SQL}, last_error_message = ?, scheduled_for = ?,
+                           retry_count = retry_count + 1, worker_id = NULL, lease_expires_at = NULL,
+                           updated_timestamp = CURRENT_TIMESTAMP
+                     WHERE task_id = ?{owner_sql}
+                    """,
+                    [(message, when, task_id) + owner_params for task_id, message, when in retries]
+                )
+            self._report_stale_outcomes("reagendar", len(retries), cursor.rowcount, worker_id)
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"DB: Erro ao reagendar {len(retries)} tarefas: {e}")
+            return 0
+
     def delete_tasks_from_queue(self, task_ids: list):
         """[UNIFICADO] Remove tarefas da fila unificada por seus IDs."""
         if not task_ids: return
@@ -129,18 +465,136 @@ class DatabaseManager:
         self._execute_query(query, tuple(task_ids), commit=True)
 
     def reset_tasks_by_ids(self, task_ids: list):
-        """[UNIFICADO] Reseta o status e o contador de retentativas para tarefas com erro."""
+        """
+        [UNIFICADO] Reseta o status e o contador de retentativas para tarefas com erro.
+        Da mais nova para a mais antiga: se já houver uma tarefa pendente com a mesma dedup_key,
+        a resetada vira SUPERSEDED em vez de duplicar o item na fila.
+        """
         if not task_ids: return 0
         now_local = datetime.now()
         placeholders = ','.join('?' for _ in task_ids)
         query = f"""
             UPDATE unified_task_queue
-            SET status = 'PENDING', retry_count = 0, last_error_message = NULL, scheduled_for = ?
-            WHERE task_id IN ({placeholders})
+            SET status = {_REQUEUE_STATUS_SQL}, retry_count = 0, last_error_message = NULL, scheduled_for = ?,
+                updated_timestamp = CURRENT_TIMESTAMP
+            WHERE task_id = ?
         """
-        params = (now_local,) + tuple(task_ids)
-        cursor = self._execute_query(query, params, commit=True)
-        return cursor.rowcount if cursor else 0
+        conn = self._get_thread_connection()
+        try:
+            with conn:
+                cursor = conn.executemany(query, [(now_local, task_id) for task_id in sorted(set(task_ids), reverse=True)])
+            updated = cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"DB: Erro ao resetar {len(task_ids)} tarefas: {e}")
+            updated = 0
+        if updated:
+            rows = self._execute_query(f"SELECT DISTINCT task_type FROM unified_task_queue WHERE task_id IN ({placeholders})", tuple(task_ids), fetch_all=True)
+            self.queue_notifier.notify_many(row['task_type'] for row in rows or [])
+        return updated
+
+    def _task_history_columns(self, conn) -> list:
+        """Colunas comuns à fila e ao histórico (colunas novas da fila que o histórico não tem ficam de fora)."""
+        history = {row[1] for row in conn.execute("PRAGMA table_info(task_history)")}
+        return [row[1] for row in conn.execute("PRAGMA table_info(unified_task_queue)") if row[1] in history]
+
+    def archive_finished_tasks(self, task_type: str = None, older_than_seconds: float = 3600,
+                               batch_size: int = 500, statuses=ARCHIVABLE_TASK_STATUSES) -> int:
+        """
+        [UNIFICADO] Move para task_history as tarefas em status final (statuses; padrão: DONE,
+        SUPERSEDED, ERROR e DEAD) sem alteração há mais de older_than_seconds, em lotes de batch_size (uma transação curta por lote: copia e apaga os
+        mesmos task_ids). Mantém a fila quente pequena e atualiza task_last_status (último status
+        arquivado de cada item). Retorna quantas tarefas foram movidas.
+        """
+        conn = self._get_thread_connection()
+        columns = ", ".join(self._task_history_columns(conn))
+        status_marks = ", ".join("?" for _ in statuses)
+        select_ids = f"""
+            SELECT task_id FROM unified_task_queue
+             WHERE status IN ({status_marks}) AND updated_timestamp < datetime('now', ?)
+               {"AND task_type = ?" if task_type else ""}
+             LIMIT ?
+        """
+        params = (*statuses, f"-{int(older_than_seconds)} seconds", *((task_type,) if task_type else ()), batch_size)
+        moved = 0
+        try:
+            while True:
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    ids = [row[0] for row in conn.execute(select_ids, params)]
+                    if not ids:
+                        break
+                    id_marks = ", ".join("?" for _ in ids)
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO task_history ({columns}) SELECT {columns} FROM unified_task_queue WHERE task_id IN ({id_marks})",
+                        ids
+                    )
+                    conn.execute(
+                        f"""
+                        INSERT INTO task_last_status (task_type, item_id, task_id, status, last_error_message, archived_at)
+                        SELECT task_type, item_id, task_id, status, last_error_message, CURRENT_TIMESTAMP
+                          FROM unified_task_queue
+                         WHERE task_id IN ({id_marks}) AND item_id IS NOT NULL AND status != 'SUPERSEDED'
+                        ON CONFLICT(task_type, item_id) DO UPDATE SET
+                            task_id = excluded.task_id, status = excluded.status,
+                            last_error_message = excluded.last_error_message, archived_at = excluded.archived_at
+                         WHERE excluded.task_id > task_last_status.task_id
+                        """,
+                        ids
+                    )
+                    conn.execute(f"DELETE FROM unified_task_queue WHERE task_id IN ({id_marks})", ids)
+                moved += len(ids)
+                if len(ids) < batch_size:
+                    break
+        except sqlite3.Error as e:
+            print(f"DB: Erro ao arquivar tarefas finalizadas ({moved} movidas antes do erro): {e}")
+        if moved:
+            print(f"DB: {moved} tarefas finalizadas ({'/'.join(statuses)}){f' ({task_type})' if task_type else ''} movidas para task_history.")
+        return moved
+
+    def purge_task_history(self, task_type: str = None, older_than_days: float = 30, batch_size: int = 5000) -> int:
+        """
+        [UNIFICADO] Apaga do task_history (e de task_last_status) o que foi arquivado há mais de
+        older_than_days, em lotes.
+        """
+        query = f"""
+            DELETE FROM task_history WHERE task_id IN (
+                SELECT task_id FROM task_history
+                 WHERE {"task_type = ? AND " if task_type else ""}archived_at < datetime('now', ?)
+                 LIMIT ?
+            )
+        """
+        params = (*((task_type,) if task_type else ()), f"-{float(older_than_days)} days", batch_size)
+        purged = 0
+        while True:
+            cursor = self._execute_query(query, params, commit=True)
+            deleted = cursor.rowcount if cursor else 0
+            purged += max(deleted, 0)
+            if deleted < batch_size:
+                break
+        self._execute_query(
+            f"DELETE FROM task_last_status WHERE {'task_type = ? AND ' if task_type else ''}archived_at < datetime('now', ?)",
+            params[:-1], commit=True
+        )
+        if purged:
+            print(f"DB: {purged} tarefas{f' ({task_type})' if task_type else ''} expurgadas do task_history.")
+        return purged
+
+    def get_archivable_task_types(self, statuses=ARCHIVABLE_TASK_STATUSES) -> list:
+        """task_types com tarefas em status final ainda na fila."""
+        query = f"SELECT DISTINCT task_type FROM unified_task_queue WHERE status IN ({', '.join('?' for _ in statuses)})"
+        rows = self._execute_query(query, tuple(statuses), fetch_all=True)
+        return [row['task_type'] for row in rows or []]
+
+    def get_task_history_types(self) -> list:
+        rows = self._execute_query("SELECT DISTINCT task_type FROM task_history", fetch_all=True)
+        return [row['task_type'] for row in rows or []]
+
+    def get_task_history_count(self, task_type: str = None) -> int:
+        if task_type:
+            result = self._execute_query("SELECT COUNT(*) FROM task_history WHERE task_type = ?", (task_type,), fetch_one=True)
+        else:
+            result = self._execute_query("SELECT COUNT(*) FROM task_history", fetch_one=True)
+        return result[0] if result else 0
 
     def clear_all_tasks_from_queue(self):
         """[UNIFICADO] Limpa todas as tarefas da fila unificada."""
@@ -148,10 +602,55 @@ class DatabaseManager:
             
     def update_product_abc_sales_data(self, sku, qtd, valor):
         """Atualiza os dados de vendas (Qtd e Valor) para um SKU específico."""
-        query = "UPDATE tiny_products SET vendas_qtd = ?, vendas_valor = ? WHERE sku = ?"
-        self._execute_query(query, (qtd, valor, sku), commit=True)
+        query = "UPDATE tiny_products SET vendas_qtd = ?, vendas_valor = ? WHERE sku_key = ?"
+        self._execute_query(query, (qtd, valor, normalize_sku(sku)), commit=True)
 
 
+    def apply_abc_curve_bulk(self, rows, match_normalized: bool = True):
+        """
+        Aplica a Curva ABC inteira de forma set-based, numa única transação:
+        carrega as linhas numa tabela temporária (executemany), zera a curva anterior e aplica
+        vendas/classe/rank/sequência com um único UPDATE ... FROM. Os SKUs sem produto saem
+        de um anti-join.
+        rows: iterável de (sku, qtd, valor, classe, rank) com o SKU já normalizado.
+        match_normalized: casa pela sku_key (SKU normalizado, com índice) em vez do texto cru.
+        Retorna (atualizados, lista de SKUs não encontrados na ordem da planilha).
+        """
+        if match_normalized:
+            join_expr, key_expr = "tiny_products.sku_key", "sku_key"
+        else:
+            join_expr, key_expr = "tiny_products.sku", "sku"
+        conn = self._get_thread_connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS abc_import (
+                    sku TEXT PRIMARY KEY, qtd REAL, valor REAL, cls TEXT, rank INTEGER, matched INTEGER DEFAULT 0
+                )
+            """)
+            conn.execute("DELETE FROM temp.abc_import")
+            # SKU repetido na planilha: a última linha vence (mesmo efeito do loop antigo)
+            conn.executemany("INSERT OR REPLACE INTO temp.abc_import (sku, qtd, valor, cls, rank) VALUES (?, ?, ?, ?, ?)", rows)
+            conn.execute("UPDATE tiny_products SET curva_a_posicao = NULL, curva_a_rank = NULL, import_sequence = NULL, vendas_qtd = 0, vendas_valor = 0")
+            conn.execute(f"""
+                UPDATE tiny_products
+                   SET vendas_qtd = t.qtd,
+                       vendas_valor = t.valor,
+                       curva_a_posicao = t.cls,
+                       curva_a_rank = t.rank,
+                       import_sequence = t.rank,
+                       atualizado_em = CURRENT_TIMESTAMP
+                  FROM temp.abc_import AS t
+                 WHERE {join_expr} = t.sku
+            """)
+            # o IN (subquery) é resolvido pelo índice da chave: sem varrer tiny_products por SKU
+            conn.execute(f"UPDATE temp.abc_import SET matched = 1 WHERE sku IN (SELECT {key_expr} FROM tiny_products)")
+            updated = conn.execute("SELECT COUNT(*) FROM temp.abc_import WHERE matched = 1").fetchone()[0]
+            not_found = [r[0] for r in conn.execute("SELECT sku FROM temp.abc_import WHERE matched = 0 ORDER BY rank")]
+            conn.execute("DROP TABLE temp.abc_import")
+        print(f"DB: Curva ABC aplicada em lote: {updated} produtos atualizados, {len(not_found)} SKUs não encontrados.")
+        return updated, not_found
+
     def clear_all_abc_positions(self):
         """Reseta a classificação ABC, vendas e sequência para todos os produtos."""
         query = "UPDATE tiny_products SET curva_a_posicao = NULL, curva_a_rank = NULL, import_sequence = NULL, vendas_qtd = 0, vendas_valor = 0"
@@ -228,144 +727,223 @@ class DatabaseManager:
         """Deleta um anúncio de concorrente da lista de monitoramento."""
         self._execute_query("DELETE FROM competitor_ads WHERE mlb_id = ?", (mlb_id,), commit=True)
 
-    # DENTRO DA CLASSE DatabaseManager
-    # SUBSTITUA ESTE MÉTODO INTEIRO
     def replace_all_tiny_products(self, df: pd.DataFrame) -> int:
         """
-        [MODO HÍBRIDO E CORRIGIDO] Apaga todos os produtos Tiny e insere os novos a partir de um DataFrame,
-        estabelecendo a relação pai-filho e NORMALIZANDO o campo de 'Situação' para 'A' ou 'I'.
-        """
-        self._execute_query("DELETE FROM tiny_products", commit=True)
-        
-        if 'Código (SKU)' in df.columns:
-            df = df.drop_duplicates(subset=['Código (SKU)'], keep='first')
-
-        sku_to_id_map = {}
-        if 'Código (SKU)' in df.columns and 'ID' in df.columns:
-            df['Código (SKU)'] = df['Código (SKU)'].astype(str)
-            df['ID'] = pd.to_numeric(df['ID'], errors='coerce')
-            sku_to_id_map = pd.Series(df.ID.values, index=df['Código (SKU)']).to_dict()
-
-        rows_to_insert = []
-        for idx, row in df.iterrows():
-            parent_sku = None
-            if 'Código do pai' in row and pd.notna(row['Código do pai']):
-                parent_sku = str(row['Código do pai']).strip()
-            parent_id = sku_to_id_map.get(parent_sku) if parent_sku else None
-
-            # <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<< INÍCIO DA CORREÇÃO >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
-            # Normaliza o campo 'Situação' para o formato 'A' (Ativo) ou 'I' (Inativo)
-            situacao_from_sheet = str(row.get('Situação', 'Ativo')).strip().lower()
-            status_for_db = 'A' if situacao_from_sheet == 'ativo' else 'I'
-            # <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<< FIM DA CORREÇÃO >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
-            
-            rows_to_insert.append((
-                row.get('ID', None),
-                str(row['Código (SKU)']).strip() if 'Código (SKU)' in row else None,
-                row.get('Descrição', ''),
-                float(row.get('Peso bruto (Kg)', 0) or 0),
-                float(row.get('Largura embalagem', 0) or 0),
-                float(row.get('Altura embalagem', 0) or 0),
-                float(row.get('Comprimento embalagem', 0) or 0),
-                float(row.get('Estoque', 0) or 0),
-                status_for_db, # <<<<<<<<<< USA A VARIÁVEL CORRIGIDA AQUI
-                str(row.get('Classificação', '')) if pd.notna(row.get('Classificação')) else '',
-                int(row.get('Rank', 9999)) if pd.notna(row.get('Rank')) else 9999,
-                str(row.get('URL imagem 1', '')) if pd.notna(row.get('URL imagem 1')) else '',
-                idx,
-                parent_id
-            ))
-
-        valid_rows = [r for r in rows_to_insert if r[1]]
-        
-        insert_query = """
-            INSERT OR REPLACE INTO tiny_products (
-                id_produto, sku, descricao, peso, largura, altura,
-                profundidade, stock, status, curva_a_posicao, curva_a_rank, 
-                url_imagem_1, import_sequence, id_pai, atualizado_em
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        Substitui todos os produtos Tiny pelos do DataFrame (exportação do Tiny), com a relação
+        pai-filho resolvida pelo 'Código do pai' e 'Situação' normalizada para 'A'/'I'.
+        SKUs repetidos (pela chave normalizada): vale a primeira linha.
         """
-
-        conn = self._get_thread_connection()
         try:
-            with conn:
-                conn.executemany(insert_query, valid_rows)
-            print(f"{len(valid_rows)} produtos inseridos na base de dados (substituição completa com relação pai-filho).")
-            return len(valid_rows)
+            updated, inserted = self.import_tiny_products_stream(iter_tiny_rows(iter_frame_chunks(df)), replace=True)
         except sqlite3.Error as e:
             print(f"ERRO DB (replace_all_tiny_products): {e}")
             return 0
-        
+        print(f"{updated + inserted} produtos inseridos na base de dados (substituição completa com relação pai-filho).")
+        return updated + inserted
+
     def upsert_tiny_products(self, df: pd.DataFrame) -> tuple[int, int]:
-        """Adiciona ou atualiza produtos Tiny a partir de um DataFrame (baseado no SKU)."""
-        
-        # <<<<<<<<<<<<<<<< ADICIONADO `url_imagem_1` À QUERY >>>>>>>>>>>>>>>>>>
-        query = """
-            INSERT INTO tiny_products (
-                id_produto, sku, descricao, peso, largura, altura, profundidade, stock, 
-                curva_a_posicao, curva_a_rank, url_imagem_1, atualizado_em
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            ON CONFLICT(sku) DO UPDATE SET
-                id_produto = excluded.id_produto,
-                descricao = excluded.descricao,
-                peso = excluded.peso,
-                largura = excluded.largura,
-                altura = excluded.altura,
-                profundidade = excluded.profundidade,
-                stock = excluded.stock,
-                curva_a_posicao = excluded.curva_a_posicao,
-                curva_a_rank = excluded.curva_a_rank,
-                url_imagem_1 = excluded.url_imagem_1,
-                atualizado_em = CURRENT_TIMESTAMP
+        """Adiciona ou atualiza produtos Tiny a partir de um DataFrame (pelo SKU normalizado). Retorna (atualizados, inseridos)."""
+        try:
+            return self.import_tiny_products_stream(iter_tiny_rows(iter_frame_chunks(df)), replace=False)
+        except sqlite3.Error as e:
+            print(f"ERRO DB (upsert_tiny_products): {e}")
+            return 0, 0
+
+    def import_tiny_products_stream(self, row_chunks, replace: bool = False) -> tuple[int, int]:
+        """
+        Grava a exportação do Tiny a partir de blocos de tuplas (core.tiny_import.tiny_rows_from_frame).
+
+        Os blocos vão para a tabela temporária temp.tiny_import com executemany (sem travar o
+        banco principal enquanto o arquivo é lido); inseridos/atualizados saem do diff dela com
+        tiny_products.
+        replace=True: o catálogo novo é montado e indexado em tiny_products_staging e trocado
+        pelo atual com RENAME numa transação curta (_swap_tiny_products_staging): leitores nunca
+        veem o catálogo vazio e uma queda no meio mantém o catálogo antigo.
+        replace=False: upsert set-based pela sku_key numa única transação.
+        Retorna (atualizados, inseridos).
         """
-        # <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<< FIM DA ADIÇÃO >>>>>>>>>>>>>>>>>>>>>>>>
-        
-        updated_count = 0
-        inserted_count = 0
-        
         conn = self._get_thread_connection()
+        cols = ", ".join(TINY_IMPORT_COLUMNS)
+        marks = ", ".join("?" for _ in TINY_IMPORT_COLUMNS)
+        # replace: primeira linha do SKU vence (como antes); upsert: a última sobrescreve
+        staging_insert = f"INSERT OR {'IGNORE' if replace else 'REPLACE'} INTO temp.tiny_import ({cols}) VALUES ({marks})"
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS temp.tiny_import")
+            conn.execute("""
+                CREATE TEMP TABLE tiny_import (
+                    sku_key TEXT PRIMARY KEY, sku TEXT NOT NULL, id_produto INTEGER, descricao TEXT,
+                    peso REAL, largura REAL, altura REAL, profundidade REAL, stock REAL, status TEXT,
+                    curva_a_posicao TEXT, curva_a_rank INTEGER, url_imagem_1 TEXT, import_sequence INTEGER,
+                    parent_key TEXT, id_pai INTEGER
+                )
+            """)
         try:
+            for rows in row_chunks:
+                if rows:
+                    with conn:
+                        conn.executemany(staging_insert, rows)
+
+            with conn:
+                conn.execute("""
+                    UPDATE temp.tiny_import SET id_pai = p.id_produto
+                      FROM temp.tiny_import AS p
+                     WHERE tiny_import.parent_key = p.sku_key
+                """)
+            count_updated = """
+                SELECT COUNT(*) FROM temp.tiny_import AS s
+                 WHERE EXISTS (SELECT 1 FROM tiny_products AS p WHERE p.sku_key = s.sku_key)
+            """
+            staged = conn.execute("SELECT COUNT(*) FROM temp.tiny_import").fetchone()[0]
+            if replace:
+                updated = conn.execute(count_updated).fetchone()[0]
+                self._load_tiny_products_staging(conn)
+                self._swap_tiny_products_staging(conn)
+            else:
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    updated = conn.execute(count_updated).fetchone()[0]
+                    # "WHERE true": sem ele o SQLite confunde o ON CONFLICT com um JOIN do SELECT
+                    conn.execute(f"""
+                        INSERT INTO tiny_products (
+                            id_produto, sku, sku_key, descricao, peso, largura, altura, profundidade, stock,
+                            curva_a_posicao, curva_a_rank, url_imagem_1, atualizado_em, stock_atualizado_em
+                        )
+                        SELECT id_produto, sku, sku_key, COALESCE(descricao, ''), peso, largura, altura, profundidade, stock,
+                               curva_a_posicao, curva_a_rank, url_imagem_1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+                          FROM temp.tiny_import WHERE true
+                        ON CONFLICT({self._tiny_products_conflict_target()}) DO UPDATE SET
+                            id_produto = excluded.id_produto,
+                            descricao = excluded.descricao,
+                            peso = excluded.peso,
+                            largura = excluded.largura,
+                            altura = excluded.altura,
+                            profundidade = excluded.profundidade,
+                            stock = excluded.stock,
+                            curva_a_posicao = excluded.curva_a_posicao,
+                            curva_a_rank = excluded.curva_a_rank,
+                            url_imagem_1 = excluded.url_imagem_1,
+                            atualizado_em = CURRENT_TIMESTAMP,
+                            stock_atualizado_em = CURRENT_TIMESTAMP
+                    """)
+        finally:
+            with conn:
+                conn.execute("DROP TABLE IF EXISTS temp.tiny_import")
+        print(f"DB: Importação Tiny ({'substituição' if replace else 'upsert'}): {staged - updated} inseridos, {updated} atualizados.")
+        self._notify_tiny_products_changed(None)
+        return updated, staged - updated
+
+    def _load_tiny_products_staging(self, conn, chunk_size: int = 5000):
+        """
+        Monta tiny_products_staging (mesmo schema de tiny_products) a partir de temp.tiny_import.
+        A cópia vai em blocos de rowid, um commit por bloco, para não segurar o lock de escrita
+        dos workers; o índice de sku_key é criado no fim, já com a tabela cheia.
+        Sobras de uma substituição interrompida são apagadas aqui, na transação que cria a staging,
+        e não na abertura do banco: outro processo abrindo o banco não derruba uma importação em curso.
+        """
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DROP TABLE IF EXISTS tiny_products_staging")
+            create_sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tiny_products'").fetchone()[0]
+            conn.execute(re.sub(r'^CREATE TABLE\s+"?tiny_products"?', "CREATE TABLE tiny_products_staging", create_sql, count=1))
+        max_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM temp.tiny_import").fetchone()[0]
+        for low in range(0, max_rowid, chunk_size):
             with conn:
-                for _, row in df.iterrows():
-                    sku = str(row['Código (SKU)']).strip() if 'Código (SKU)' in row and pd.notna(row['Código (SKU)']) else None
-                    if not sku:
-                        continue
-
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT 1 FROM tiny_products WHERE sku = ?", (sku,))
-                    exists = cursor.fetchone()
-                    
-                    params = (
-                        row.get('ID', None), sku, row.get('Descrição', ''),
-                        float(row.get('Peso bruto (Kg)', 0) or 0),
-                        float(row.get('Largura embalagem', 0) or 0),
-                        float(row.get('Altura embalagem', 0) or 0),
-                        float(row.get('Comprimento embalagem', 0) or 0),
-                        float(row.get('Estoque', 0) or 0),
-                        row.get('Classificação', None),
-                        int(row.get('Rank', 9999)) if pd.notna(row.get('Rank')) else 9999,
-                        row.get('URL imagem 1', None) # <<<<<<<<<<<<<<< ADICIONADO
+                conn.execute("""
+                    INSERT INTO tiny_products_staging (
+                        id_produto, sku, sku_key, descricao, peso, largura, altura, profundidade, stock, status,
+                        curva_a_posicao, curva_a_rank, url_imagem_1, import_sequence, id_pai, atualizado_em, stock_atualizado_em
                     )
-                    
-                    cursor.execute(query, params)
-                    
-                    if exists:
-                        updated_count += 1
-                    else:
-                        inserted_count += 1
-            return updated_count, inserted_count
-        except sqlite3.Error as e:
-            print(f"ERRO DB (upsert_tiny_products): {e}")
+                    SELECT id_produto, sku, sku_key, COALESCE(descricao, ''), peso, largura, altura, profundidade, stock, status,
+                           COALESCE(curva_a_posicao, ''), curva_a_rank, COALESCE(url_imagem_1, ''), import_sequence, id_pai,
+                           CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+                      FROM temp.tiny_import
+                     WHERE rowid > ? AND rowid <= ?
+                """, (low, low + chunk_size))
+        current = self._find_sku_key_index(conn, "tiny_products")
+        index_name = TINY_SKU_KEY_INDEX_NAMES[1] if current and current[0] == TINY_SKU_KEY_INDEX_NAMES[0] else TINY_SKU_KEY_INDEX_NAMES[0]
+        with conn:
+            # a staging já vem sem duplicados pela chave: o índice sempre pode ser único
+            conn.execute(f"CREATE UNIQUE INDEX {index_name} ON tiny_products_staging(sku_key)")
+
+    def _swap_tiny_products_staging(self, conn):
+        """Troca tiny_products pela staging com dois RENAMEs numa transação; a tabela antiga é apagada depois."""
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DROP TABLE IF EXISTS tiny_products_old")
+            conn.execute("ALTER TABLE tiny_products RENAME TO tiny_products_old")
+            conn.execute("ALTER TABLE tiny_products_staging RENAME TO tiny_products")
+        self._sku_key_unique = True
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS tiny_products_old")
+
+    def upsert_tiny_products_from_api(self, products) -> tuple[int, int]:
+        """
+        Upsert em lote dos produtos vindos da listagem da API do Tiny (services.tiny_sync).
+        products: iterável de dicts com sku, id_produto, descricao e status ('A'/'I').
+        Só esses campos são gravados (a listagem não traz estoque nem dimensões).
+        Retorna (atualizados, inseridos).
+        """
+        rows = {}
+        for p in products:
+            key = normalize_sku(p.get("sku"))
+            if key:
+                rows[key] = (p.get("id_produto"), str(p.get("sku")).strip(), key, p.get("descricao") or "", p.get("status") or "A")
+        if not rows:
             return 0, 0
-
+        conn = self._get_thread_connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            keys = list(rows)
+            existing = 0
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                existing += conn.execute(
+                    f"SELECT COUNT(*) FROM tiny_products WHERE sku_key IN ({', '.join('?' for _ in chunk)})", chunk
+                ).fetchone()[0]
+            conn.executemany(f"""
+                INSERT INTO tiny_products (id_produto, sku, sku_key, descricao, status, atualizado_em)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT({self._tiny_products_conflict_target()}) DO UPDATE SET
+                    id_produto = excluded.id_produto,
+                    descricao = excluded.descricao,
+                    status = excluded.status,
+                    atualizado_em = CURRENT_TIMESTAMP
+            """, list(rows.values()))
+        self._notify_tiny_products_changed([(r[1], r[0], None) for r in rows.values()])
+        return existing, len(rows) - existing
+
+    def get_tiny_stock_snapshot(self, sku_keys) -> dict:
+        """
+        {sku_key: {id_produto, id_pai, stock, age_seconds}} para os SKUs normalizados informados.
+        age_seconds: idade do estoque (stock_atualizado_em, gravado só junto com stock); None se nunca.
+        atualizado_em não serve: a sincronização pela API e a Curva ABC mexem na linha sem tocar no estoque.
+        """
+        keys = [k for k in dict.fromkeys(sku_keys) if k]
+        result = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._execute_query(
+                f"""
+                SELECT sku_key, id_produto, id_pai, stock,
+                       (julianday('now') - julianday(stock_atualizado_em)) * 86400.0 AS age_seconds
+                  FROM tiny_products
+                 WHERE sku_key IN ({', '.join('?' for _ in chunk)})
+                """,
+                chunk, fetch_all=True
+            )
+            for row in rows or []:
+                result[row["sku_key"]] = {"id_produto": row["id_produto"], "id_pai": row["id_pai"],
+                                          "stock": row["stock"], "age_seconds": row["age_seconds"]}
+        return result
 
     def save_or_update_tiny_product(self, product_data):
         """Salva ou atualiza um único produto Tiny na tabela tiny_products."""
-        query = """
+        query = f"""
             INSERT INTO tiny_products (
-                id_produto, sku, descricao, peso, largura, altura, profundidade, status, stock, id_pai, atualizado_em
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            ON CONFLICT(sku) DO UPDATE SET
+                id_produto, sku, sku_key, descricao, peso, largura, altura, profundidade, status, stock, id_pai,
+                atualizado_em, stock_atualizado_em
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            ON CONFLICT({self._tiny_products_conflict_target()}) DO UPDATE SET
                 id_produto = excluded.id_produto,
                 descricao = excluded.descricao,
                 peso = excluded.peso,
@@ -375,11 +953,13 @@ class DatabaseManager:
                 status = excluded.status,
                 stock = excluded.stock,
                 id_pai = excluded.id_pai,
-                atualizado_em = CURRENT_TIMESTAMP;
+                atualizado_em = CURRENT_TIMESTAMP,
+                stock_atualizado_em = CURRENT_TIMESTAMP;
         """
         params = (
             product_data.get('id_produto'),
             product_data.get('sku'),
+            normalize_sku(product_data.get('sku')),
             product_data.get('descricao'),
             product_data.get('peso'),
             product_data.get('largura'),
@@ -390,6 +970,65 @@ class DatabaseManager:
             product_data.get('id_pai')
         )
         self._execute_query(query, params, commit=True)
+        self._notify_tiny_products_changed([(product_data.get('sku'), product_data.get('id_produto'), product_data.get('id_pai'))])
+
+    def add_tiny_products_listener(self, callback):
+        """callback(rows): rows = [(sku, id_produto, id_pai), ...] das linhas gravadas, ou None após uma importação inteira."""
+        self._tiny_products_listeners.append(callback)
+
+    def _notify_tiny_products_changed(self, rows=None):
+        for callback in list(self._tiny_products_listeners):
+            try:
+                callback(rows)
+            except Exception as e:
+                print(f"DB: Erro no listener de tiny_products: {e}")
+
+    def get_tiny_product_ids(self) -> list:
+        """[(sku_key, id_produto, id_pai)] de todos os produtos com id do Tiny."""
+        rows = self._execute_query(
+            "SELECT sku_key, id_produto, id_pai FROM tiny_products WHERE id_produto IS NOT NULL AND sku_key IS NOT NULL",
+            fetch_all=True
+        )
+        return [(r["sku_key"], r["id_produto"], r["id_pai"]) for r in rows] if rows else []
+
+    @staticmethod
+    def _backfill_sku_keys(cursor, table, sku_col, key_col, id_col):
+        """Calcula a chave normalizada (core.text_utils.normalize_sku) das linhas que ainda não têm."""
+        rows = cursor.execute(f"SELECT {id_col}, {sku_col} FROM {table} WHERE {key_col} IS NULL AND {sku_col} IS NOT NULL").fetchall()
+        if rows:
+            cursor.executemany(f"UPDATE {table} SET {key_col} = ? WHERE {id_col} = ?", [(normalize_sku(r[1]), r[0]) for r in rows])
+            print(f"  -> Migrando DB: {len(rows)} chaves '{key_col}' preenchidas em '{table}'.")
+
+    @staticmethod
+    def _ensure_sku_key_index(cursor) -> bool:
+        """
+        Índice único em tiny_products.sku_key. Se a base já tiver SKUs que colidem depois de
+        normalizados (ex.: 'abc' e 'ABC '), cai para um índice comum e avisa. Retorna se ficou único.
+        """
+        existing = DatabaseManager._find_sku_key_index(cursor, "tiny_products")
+        if existing:
+            return existing[1]
+        try:
+            cursor.execute("CREATE UNIQUE INDEX idx_tiny_products_sku_key ON tiny_products(sku_key)")
+            return True
+        except sqlite3.IntegrityError:
+            dupes = cursor.execute("SELECT sku_key FROM tiny_products GROUP BY sku_key HAVING COUNT(*) > 1 LIMIT 10").fetchall()
+            print(f"DB AVISO: SKUs duplicados após normalização ({', '.join(r[0] for r in dupes)}...). Usando índice não-único em sku_key.")
+            cursor.execute("CREATE INDEX idx_tiny_products_sku_key ON tiny_products(sku_key)")
+            return False
+
+    @staticmethod
+    def _find_sku_key_index(cursor, table: str):
+        """(nome, único) do índice só sobre sku_key da tabela, ou None."""
+        for index in cursor.execute(f"PRAGMA index_list({table})").fetchall():
+            columns = [col[2] for col in cursor.execute(f"PRAGMA index_info({index[1]})").fetchall()]
+            if columns == ["sku_key"]:
+                return index[1], bool(index[2])
+        return None
+
+    def _tiny_products_conflict_target(self) -> str:
+        """Alvo do ON CONFLICT dos upserts: a chave normalizada quando o índice é único."""
+        return "sku_key" if self._sku_key_unique else "sku"
 
     def get_all_tiny_products(self):
         """
@@ -424,10 +1063,10 @@ class DatabaseManager:
            SET curva_a_posicao   = ?,
                curva_a_rank      = ?,
                import_sequence   = ?
-         WHERE sku = ?
+         WHERE sku_key = ?
         """
         # sequence é o índice da linha (idx) no DataFrame
-        self._execute_query(query, (classification, rank, sequence, sku), commit=True)
+        self._execute_query(query, (classification, rank, sequence, normalize_sku(sku)), commit=True)
             
     def add_item_to_promo_queue(self, account_nickname, promotion_id, promotion_type, items_payload, extra_data):
         """[UNIFICADO] Adiciona uma tarefa de Ativação de Promoção."""
@@ -526,8 +1165,26 @@ class DatabaseManager:
             self.thread_local.conn.close()
             self.thread_local.conn = None
 
+    def start_queue_watcher(self, interval: float = 0.5):
+        """
+        Liga o notificador entre processos: observa o -wal e acorda os inscritos do
+        queue_notifier quando outro processo enfileira tarefas. Idempotente.
+        """
+        if self._queue_watcher is not None and self._queue_watcher.is_alive():
+            return self._queue_watcher
+        self._queue_watcher = WalQueueWatcher(self, self.queue_notifier, interval=interval)
+        self._queue_watcher.start()
+        print(f"DB: Observador da fila entre processos iniciado (intervalo {interval}s).")
+        return self._queue_watcher
+
+    def stop_queue_watcher(self):
+        if self._queue_watcher is not None:
+            self._queue_watcher.stop()
+            self._queue_watcher = None
+
     def close_all_connections_for_app_exit(self): 
         """Intended to be called when the application is shutting down."""
+        self.stop_queue_watcher()
         print("DatabaseManager: Attempting to close main thread's connection (if any).")
         self._close_thread_connection(force_close=True)
 
@@ -577,6 +1234,26 @@ class DatabaseManager:
                 retry_count INTEGER DEFAULT 0, last_error_message TEXT
             )
             """,
+            # Arquivo das tarefas concluídas (mesmas colunas da fila + archived_at), fora da tabela quente
+            """
+            CREATE TABLE IF NOT EXISTS task_history (
+                task_id INTEGER PRIMARY KEY, task_type TEXT NOT NULL, item_id TEXT,
+                account_nickname TEXT NOT NULL, status TEXT, payload_json TEXT,
+                retry_count INTEGER DEFAULT 0, last_error_message TEXT,
+                added_timestamp DATETIME, updated_timestamp DATETIME, scheduled_for DATETIME,
+                worker_id TEXT, lease_expires_at DATETIME, priority INTEGER DEFAULT 0,
+                archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            # Último status arquivado por (task_type, item_id): uma linha por item, atualizada pelo
+            # archive_finished_tasks, para o mapa de status não varrer o task_history inteiro
+            """
+            CREATE TABLE IF NOT EXISTS task_last_status (
+                task_type TEXT NOT NULL, item_id TEXT NOT NULL, task_id INTEGER NOT NULL,
+                status TEXT, last_error_message TEXT, archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (task_type, item_id)
+            )
+            """,
             """
             CREATE TABLE IF NOT EXISTS catalog_rejections (
                 item_id TEXT NOT NULL,
@@ -605,7 +1282,7 @@ class DatabaseManager:
             "CREATE TABLE IF NOT EXISTS promo_exclusions (exclusion_type TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (exclusion_type, value))",
             "CREATE TABLE IF NOT EXISTS sku_processed_images (sku TEXT NOT NULL, image_url TEXT NOT NULL, added_timestamp DATETIME, PRIMARY KEY (sku, image_url))",
             # <<<<<<<<<<<<<<<<<<<<<<<< INÍCIO DA MODIFICAÇÃO >>>>>>>>>>>>>>>>>>>>
-            "CREATE TABLE IF NOT EXISTS tiny_products (id_produto INTEGER, sku TEXT PRIMARY KEY, descricao TEXT, peso REAL, largura REAL, altura REAL, profundidade REAL, stock REAL, status TEXT DEFAULT 'A', curva_a_posicao TEXT, curva_a_rank INTEGER, url_imagem_1 TEXT, import_sequence INTEGER, atualizado_em DATETIME, vendas_qtd REAL DEFAULT 0, vendas_valor REAL DEFAULT 0, id_pai INTEGER)",
+            "CREATE TABLE IF NOT EXISTS tiny_products (id_produto INTEGER, sku TEXT PRIMARY KEY, descricao TEXT, peso REAL, largura REAL, altura REAL, profundidade REAL, stock REAL, status TEXT DEFAULT 'A', curva_a_posicao TEXT, curva_a_rank INTEGER, url_imagem_1 TEXT, import_sequence INTEGER, atualizado_em DATETIME, vendas_qtd REAL DEFAULT 0, vendas_valor REAL DEFAULT 0, id_pai INTEGER, stock_atualizado_em DATETIME)",
             # <<<<<<<<<<<<<<<<<<<<<<<<< FIM DA MODIFICAÇÃO >>>>>>>>>>>>>>>>>>>>>
             "CREATE TABLE IF NOT EXISTS product_groups (group_id INTEGER PRIMARY KEY AUTOINCREMENT, group_name TEXT NOT NULL UNIQUE, description TEXT)",
             "CREATE TABLE IF NOT EXISTS product_group_skus (group_id INTEGER NOT NULL, sku TEXT NOT NULL, PRIMARY KEY (group_id, sku), FOREIGN KEY (group_id) REFERENCES product_groups (group_id) ON DELETE CASCADE)",
@@ -663,7 +1340,11 @@ class DatabaseManager:
             required_columns = {
                 "added_timestamp": "DATETIME DEFAULT CURRENT_TIMESTAMP",
                 "updated_timestamp": "DATETIME DEFAULT CURRENT_TIMESTAMP",
-                "scheduled_for": "DATETIME"
+                "scheduled_for": "DATETIME",
+                "worker_id": "TEXT",
+                "lease_expires_at": "DATETIME",
+                "priority": "INTEGER DEFAULT 0",
+                "dedup_key": "TEXT"
             }
 
             for col_name, col_definition in required_columns.items():
@@ -675,6 +1356,9 @@ class DatabaseManager:
                         cursor.execute(f"UPDATE unified_task_queue SET {col_name} = CURRENT_TIMESTAMP WHERE {col_name} IS NULL")
                     print(f"  -> Coluna '{col_name}' adicionada com sucesso.")
             
+            # Tarefas antigas sem agendamento passam a valer desde a sua criação (horário local,
+            # o mesmo usado por add_task_to_queue)
+            cursor.execute("UPDATE unified_task_queue SET scheduled_for = datetime(added_timestamp, 'localtime') WHERE scheduled_for IS NULL")
             print("DB Init: Verificação de colunas concluída.")
         except sqlite3.Error as e:
             print(f"SQLite migration warning (unified_task_queue): {e}")
@@ -684,7 +1368,8 @@ class DatabaseManager:
         try:
             info_tiny = cursor.execute("PRAGMA table_info(tiny_products)").fetchall()
             existing_cols_tiny = {row[1] for row in info_tiny}
-            required_cols_tiny = {"vendas_qtd": "REAL DEFAULT 0", "vendas_valor": "REAL DEFAULT 0", "id_pai": "INTEGER"}
+            required_cols_tiny = {"vendas_qtd": "REAL DEFAULT 0", "vendas_valor": "REAL DEFAULT 0", "id_pai": "INTEGER", "sku_key": "TEXT",
+                                  "stock_atualizado_em": "DATETIME"}
             
             for col, definition in required_cols_tiny.items():
                 if col not in existing_cols_tiny:
@@ -693,12 +1378,41 @@ class DatabaseManager:
             print("DB Init: Verificação de colunas da 'tiny_products' concluída.")
         except sqlite3.Error as e:
             print(f"SQLite migration warning (tiny_products): {e}")
+
+        # SKU normalizado (sku_key) em tiny_products e ml_variations: preenche o que faltar e indexa
+        try:
+            info_var = cursor.execute("PRAGMA table_info(ml_variations)").fetchall()
+            if "seller_sku_key" not in {row[1] for row in info_var}:
+                print("  -> Migrando DB: Adicionando coluna 'seller_sku_key' à 'ml_variations'...")
+                cursor.execute("ALTER TABLE ml_variations ADD COLUMN seller_sku_key TEXT")
+            self._backfill_sku_keys(cursor, "tiny_products", "sku", "sku_key", "rowid")
+            self._backfill_sku_keys(cursor, "ml_variations", "seller_sku", "seller_sku_key", "variation_id")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_ml_variations_sku_key ON ml_variations(seller_sku_key)")
+            self._sku_key_unique = self._ensure_sku_key_index(cursor)
+        except sqlite3.Error as e:
+            print(f"SQLite migration warning (sku_key): {e}")
         # <<<<<<<<<<<<<<<<<<<<<<<<< FIM DA CORREÇÃO >>>>>>>>>>>>>>>>>>>>>
 
         # --- ETAPA 3: CRIAR ÍNDICES ---
         try:
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_unified_queue_status ON unified_task_queue(status)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_unified_queue_tasktype ON unified_task_queue(task_type)")
+            # Índice de consumo da fila: mantém o dequeue como varredura de faixa mesmo com muitas tarefas DONE
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_unified_queue_dequeue ON unified_task_queue(task_type, status, priority DESC, scheduled_for)")
+            # Deduplicação: no máximo uma tarefa PENDING por dedup_key (alvo do ON CONFLICT do enfileiramento)
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_unified_queue_dedup ON unified_task_queue(dedup_key) WHERE dedup_key IS NOT NULL AND status = 'PENDING'")
+            # Histórico: expurgo por tipo/idade como varredura de faixa; último status por item (PRICE_CHECK)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_task_history_type_archived ON task_history(task_type, archived_at)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_task_history_type_item ON task_history(task_type, item_id)")
+            # task_last_status nova num banco que já tem histórico: preenche uma vez a partir dele
+            if cursor.execute("SELECT 1 FROM task_last_status LIMIT 1").fetchone() is None:
+                cursor.execute("""
+                    INSERT OR IGNORE INTO task_last_status (task_type, item_id, task_id, status, last_error_message, archived_at)
+                    SELECT task_type, item_id, MAX(task_id), status, last_error_message, archived_at
+                      FROM task_history
+                     WHERE item_id IS NOT NULL AND status != 'SUPERSEDED'
+                     GROUP BY task_type, item_id
+                """)
             print("DB Init: Índices da fila verificados/criados.")
         except sqlite3.Error:
             pass
@@ -706,6 +1420,8 @@ class DatabaseManager:
         # --- ETAPA 4: CRIAR GATILHOS (APÓS GARANTIR QUE AS COLUNAS EXISTEM) ---
         # Sempre remove os gatilhos antigos antes de criar os novos.
         cursor.execute("DROP TRIGGER IF EXISTS update_compat_profile_db_updated_at;")
+        # A fila não usa mais gatilho: cada UPDATE de status grava updated_timestamp no próprio
+        # statement (o gatilho fazia um segundo UPDATE por linha em toda mudança de status).
         cursor.execute("DROP TRIGGER IF EXISTS unified_queue_update_timestamp;")
 
         trigger_queries = [
@@ -715,13 +1431,6 @@ class DatabaseManager:
             BEGIN
                 UPDATE compatibility_profiles_db SET updated_at = CURRENT_TIMESTAMP WHERE profile_name = OLD.profile_name;
             END;
-            """,
-            """
-            CREATE TRIGGER unified_queue_update_timestamp
-            AFTER UPDATE ON unified_task_queue FOR EACH ROW
-            BEGIN
-                UPDATE unified_task_queue SET updated_timestamp = CURRENT_TIMESTAMP WHERE task_id = OLD.task_id;
-            END;
             """
         ]
         for trigger_query in trigger_queries:
@@ -762,13 +1471,13 @@ class DatabaseManager:
                 # Insere ou substitui as variações
                 if variations_data:
                     variations_to_upsert = [
-                        (v['variation_id'], v['parent_item_id'], v['seller_sku'], v['attributes_json'])
+                        (v['variation_id'], v['parent_item_id'], v['seller_sku'], normalize_sku(v['seller_sku']), v['attributes_json'])
                         for v in variations_data
                     ]
                     cursor.executemany(
                         """
-                        INSERT OR REPLACE INTO ml_variations (variation_id, parent_item_id, seller_sku, attributes_json)
-                        VALUES (?, ?, ?, ?)
+                        INSERT OR REPLACE INTO ml_variations (variation_id, parent_item_id, seller_sku, seller_sku_key, attributes_json)
+                        VALUES (?, ?, ?, ?, ?)
                         """,
                         variations_to_upsert
                     )
@@ -787,9 +1496,9 @@ class DatabaseManager:
             SELECT v.parent_item_id, v.variation_id
             FROM ml_variations v
             JOIN ml_parent_items p ON v.parent_item_id = p.item_id
-            WHERE v.seller_sku = ? AND p.account_nickname = ?
+            WHERE v.seller_sku_key = ? AND p.account_nickname = ?
         """
-        row = self._execute_query(query, (sku, account_nickname), fetch_one=True)
+        row = self._execute_query(query, (normalize_sku(sku), account_nickname), fetch_one=True)
         return dict(row) if row else None
 
     def get_variations_for_parent(self, parent_item_id: str) -> list[dict]:
@@ -821,7 +1530,7 @@ class DatabaseManager:
                 FROM 
                     unified_task_queue
                 WHERE 
-                    task_type = 'PRICE_CHECK' AND item_id IS NOT NULL
+                    task_type = 'PRICE_CHECK' AND item_id IS NOT NULL AND status != 'SUPERSEDED'
             )
             SELECT 
                 item_id, 
@@ -840,6 +1549,14 @@ class DatabaseManager:
                     'status': row['status'],
                     'result': row['last_error_message']
                 }
+        # Itens cuja última verificação já foi arquivada: task_last_status (uma linha por item,
+        # mantida pelo archive_finished_tasks), sem varrer o task_history
+        history_rows = self._execute_query(
+            "SELECT item_id, status, last_error_message FROM task_last_status WHERE task_type = 'PRICE_CHECK'",
+            fetch_all=True
+        )
+        for row in history_rows or []:
+            status_map.setdefault(row['item_id'], {'status': row['status'], 'result': row['last_error_message']})
         return status_map
 
     def save_pricing_rule(self, rule_data):
@@ -874,6 +1591,7 @@ class DatabaseManager:
         
         try:
             self._execute_query(query, rule_data, commit=True)
+            self._bump_pricing_version()
             return True, "Regra salva com sucesso."
         except sqlite3.IntegrityError:
             return False, "Já existe uma regra com este nome."
@@ -889,6 +1607,15 @@ class DatabaseManager:
     def delete_pricing_rule(self, rule_id):
         """Deleta uma regra de precificação pelo seu ID."""
         self._execute_query("DELETE FROM pricing_rules WHERE rule_id = ?", (rule_id,), commit=True)
+        self._bump_pricing_version()
+
+    def _bump_pricing_version(self):
+        with self._pricing_version_lock:
+            self._pricing_version += 1
+
+    def get_pricing_version(self) -> int:
+        """Contador (em memória) de alterações em pricing_rules/fixed_prices feitas por este processo."""
+        return self._pricing_version
 
 
     def save_ml_account(self, nickname, data_dict):
@@ -968,11 +1695,13 @@ class DatabaseManager:
     # --- Fixed Price DB Methods ---
     def save_fixed_price(self, sku: str, price: float, notes: str = ""):
         query = "INSERT OR REPLACE INTO fixed_prices (sku, price, notes) VALUES (?, ?, ?)"
-        self._execute_query(query, (sku.strip().upper(), price, notes), commit=True)
+        self._execute_query(query, (normalize_sku(sku), price, notes), commit=True)
+        self._bump_pricing_version()
 
     def delete_fixed_price(self, sku: str):
         query = "DELETE FROM fixed_prices WHERE sku = ?"
-        self._execute_query(query, (sku.strip().upper(),), commit=True)
+        self._execute_query(query, (normalize_sku(sku),), commit=True)
+        self._bump_pricing_version()
 
     def get_all_fixed_prices(self) -> dict:
         """Loads all fixed prices into a dictionary {sku: price} for quick lookups."""
@@ -1083,6 +1812,8 @@ class DatabaseManager:
             (key, value_type, value_to_save), 
             commit=True
         )
+        if str(key).startswith("queue_dedup_"):
+            self._dedup_settings_cache.clear()
 
     def load_all_app_config(self, default_config_structure_dict):
         """Loads all configuration values, using defaults and saving them if keys are missing in DB."""
@@ -0,0 +1,171 @@
+# core/http_cache.py
+"""
+Cache persistente de respostas HTTP (JSON) para metadados que mudam pouco
+(árvore de categorias, detalhes de categoria, tabelas de tarifas).
+
+- SQLite em core.config.CACHE_DIR/http_cache.db, chave = URL + params ordenados
+  (nunca o token: só use para endpoints cuja resposta não depende da conta).
+- TTL por família de endpoint (TTL_RULES); vencido o TTL, revalida com If-None-Match
+  e, em 304, só renova a validade sem baixar o corpo de novo.
+- Limite de tamanho em bytes com despejo LRU (last_access).
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+from core.config import CACHE_DIR
+
+# (regex sobre o path da URL, TTL em segundos). Primeira que casar vale.
+TTL_RULES = [
+    (re.compile(r"^/sites/[^/]+/categories/all$"), 24 * 3600),
+    (re.compile(r"^/sites/[^/]+/categories$"), 24 * 3600),
+    (re.compile(r"^/categories/[^/]+/attributes$"), 3 * 24 * 3600),
+    (re.compile(r"^/categories/[^/]+$"), 7 * 24 * 3600),
+    (re.compile(r"^/sites/[^/]+/listing_prices$"), 12 * 3600),
+]
+DEFAULT_TTL = 3600
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+
+def ttl_for_url(url: str) -> int:
+    path = urllib.parse.urlsplit(url).path
+    for pattern, ttl in TTL_RULES:
+        if pattern.match(path):
+            return ttl
+    return DEFAULT_TTL
+
+
+def cache_key(url: str, params=None) -> str:
+    if not params:
+        return url
+    return url + "?" + urllib.parse.urlencode(sorted((str(k), str(v)) for k, v in params.items()))
+
+
+class HttpResponseCache:
+    def __init__(self, db_path: str = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.db_path = db_path or os.path.join(CACHE_DIR, "http_cache.db")
+        self.max_bytes = max_bytes
+        self.thread_local = threading.local()
+        self._write_lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS http_cache (
+                cache_key TEXT PRIMARY KEY,
+                etag TEXT,
+                body TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_http_cache_last_access ON http_cache (last_access)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self.thread_local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            self.thread_local.conn = conn
+        return conn
+
+    def lookup(self, key: str):
+        """(body_json, etag, fresh, last_access) ou None se não houver entrada."""
+        row = self._conn().execute(
+            "SELECT body, etag, expires_at, last_access FROM http_cache WHERE cache_key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], row[2] > time.time(), row[3]
+
+    def touch(self, key: str, ttl: float = None):
+        """Marca uso (LRU) e, se ttl vier, renova a validade (após um 304)."""
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            if ttl is None:
+                conn.execute("UPDATE http_cache SET last_access = ? WHERE cache_key = ?", (now, key))
+            else:
+                conn.execute("UPDATE http_cache SET last_access = ?, expires_at = ? WHERE cache_key = ?", (now, now + ttl, key))
+
+    def store(self, key: str, body_json: str, etag: str = None, ttl: float = DEFAULT_TTL):
+        now = time.time()
+        size = len(body_json.encode("utf-8"))
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO http_cache (cache_key, etag, body, size, fetched_at, expires_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, etag, body_json, size, now, now + ttl, now)
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT cache_key, size FROM http_cache ORDER BY last_access ASC"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM http_cache WHERE cache_key = ?", victims)
+
+    def get_json(self, url, params, send, ttl: float = None):
+        """
+        Retorna o JSON de url+params usando o cache.
+        send(extra_headers) faz a requisição real e devolve a Response (requests).
+        """
+        key = cache_key(url, params)
+        ttl = ttl_for_url(url) if ttl is None else ttl
+        cached = self.lookup(key)
+        if cached and cached[2]:
+            self.hits += 1
+            if time.time() - cached[3] > 60:  # LRU não precisa de precisão: evita um write por leitura
+                self.touch(key)
+            return json.loads(cached[0])
+
+        extra_headers = {"If-None-Match": cached[1]} if cached and cached[1] else {}
+        resp = send(extra_headers)
+        if resp.status_code == 304 and cached:
+            self.revalidated += 1
+            self.touch(key, ttl)
+            return json.loads(cached[0])
+        resp.raise_for_status()
+        self.misses += 1
+        data = resp.json()
+        self.store(key, json.dumps(data, ensure_ascii=False), resp.headers.get("ETag"), ttl)
+        return data
+
+    def stats(self) -> dict:
+        row = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM http_cache").fetchone()
+        return {"entries": row[0], "bytes": row[1], "max_bytes": self.max_bytes,
+                "hits": self.hits, "revalidated": self.revalidated, "misses": self.misses}
+
+    def clear(self):
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.execute("DELETE FROM http_cache")
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_http_cache() -> HttpResponseCache:
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = HttpResponseCache()
+        return _default_cache
@@ -0,0 +1,80 @@
+# core/http_session.py
+"""
+Sessões HTTP compartilhadas (keep-alive) por host.
+
+Cada host (api.mercadolibre.com, erp.tiny.com.br, ...) tem um requests.Session com um pool
+de conexões do tamanho da concorrência dos workers, timeout padrão e gzip. Reaproveitar a
+sessão evita um handshake TCP+TLS por chamada.
+
+Uso:
+    resp = get_session(url).get(url, headers=..., params=...)
+"""
+import threading
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = 25          # segundos (connect + read), usado quando a chamada não informa timeout
+DEFAULT_POOL_MAXSIZE = 16     # conexões mantidas por host; ajustado por configure_pools()
+
+_sessions = {}                # host -> PooledSession
+_lock = threading.Lock()
+_pool_maxsize = DEFAULT_POOL_MAXSIZE
+
+
+class PooledSession(requests.Session):
+    """requests.Session com timeout padrão (requests não tem timeout nenhum por padrão)."""
+
+    def __init__(self, pool_maxsize: int = DEFAULT_POOL_MAXSIZE, default_timeout: float = DEFAULT_TIMEOUT):
+        super().__init__()
+        self.default_timeout = default_timeout
+        # pool_block=False: se a concorrência passar do pool, abre conexão extra em vez de travar
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0, pool_block=False)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        # urllib3 descompacta gzip/deflate de forma transparente
+        self.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.default_timeout
+        return super().request(method, url, **kwargs)
+
+
+def _host(url_or_host: str) -> str:
+    if "://" in (url_or_host or ""):
+        return urllib.parse.urlsplit(url_or_host).netloc.lower()
+    return (url_or_host or "").lower()
+
+
+def get_session(url_or_host: str) -> PooledSession:
+    """Sessão compartilhada do host da URL (criada na primeira chamada)."""
+    host = _host(url_or_host)
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = _sessions[host] = PooledSession(pool_maxsize=_pool_maxsize)
+        return session
+
+
+def configure_pools(pool_maxsize: int):
+    """
+    Ajusta o tamanho do pool por host (ex.: soma das threads dos WorkerPools).
+    Sessões já abertas são descartadas e recriadas sob demanda com o novo tamanho.
+    """
+    global _pool_maxsize
+    with _lock:
+        _pool_maxsize = max(1, int(pool_maxsize))
+        old = list(_sessions.values())
+        _sessions.clear()
+    for session in old:
+        session.close()
+
+
+def close_all_sessions():
+    with _lock:
+        old = list(_sessions.values())
+        _sessions.clear()
+    for session in old:
+        session.close()
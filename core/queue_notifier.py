@@ -0,0 +1,100 @@
+# core/queue_notifier.py
+import os
+import threading
+
+
+class QueueNotifier:
+    """
+    Notificação in-process por task_type: quem enfileira chama notify(task_type) e os
+    workers inscritos acordam na hora, sem esperar o timeout do Event.wait().
+    Inscritos podem ser threading.Event (recebem .set()) ou qualquer callable sem argumentos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # task_type -> list[Event | callable]
+
+    def subscribe(self, task_type, subscriber=None):
+        """Inscreve um Event/callable para o task_type. Retorna o inscrito (cria um Event se omitido)."""
+        if subscriber is None:
+            subscriber = threading.Event()
+        with self._lock:
+            subscribers = self._subscribers.setdefault(task_type, [])
+            if subscriber not in subscribers:
+                subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, task_type, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(task_type, [])
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+
+    def notify(self, task_type):
+        """Acorda todos os inscritos do task_type. Nunca propaga exceções para quem enfileirou."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(task_type, []))
+        for subscriber in subscribers:
+            try:
+                if hasattr(subscriber, "set"):
+                    subscriber.set()
+                else:
+                    subscriber()
+            except Exception as e:
+                print(f"[QueueNotifier] Erro ao notificar inscrito de '{task_type}': {e}")
+
+    def notify_many(self, task_types):
+        for task_type in set(task_types):
+            self.notify(task_type)
+
+
+class WalQueueWatcher(threading.Thread):
+    """
+    Notificador entre processos (opcional): observa o arquivo -wal do SQLite e, quando ele muda,
+    procura tarefas PENDING novas (task_id acima do último visto) e notifica o QueueNotifier local
+    com os task_types encontrados. Assim um worker em outro processo acorda em ~interval segundos
+    quando alguém enfileira pelo mesmo banco.
+    """
+
+    def __init__(self, db_manager, notifier: QueueNotifier, interval: float = 0.5):
+        super().__init__(daemon=True, name="WalQueueWatcher")
+        self.db = db_manager
+        self.notifier = notifier
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _file_signature(self):
+        signature = []
+        for path in (self.db.db_name + "-wal", self.db.db_name):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _max_task_id(self):
+        row = self.db._execute_query("SELECT COALESCE(MAX(task_id), 0) FROM unified_task_queue", fetch_one=True)
+        return row[0] if row else 0
+
+    def run(self):
+        last_signature = self._file_signature()
+        last_task_id = self._max_task_id()
+        try:
+            while not self._stop_event.wait(self.interval):
+                signature = self._file_signature()
+                if signature == last_signature:
+                    continue
+                last_signature = signature
+                rows = self.db._execute_query(
+                    "SELECT DISTINCT task_type FROM unified_task_queue WHERE task_id > ? AND status = 'PENDING'",
+                    (last_task_id,), fetch_all=True
+                )
+                last_task_id = max(last_task_id, self._max_task_id())
+                if rows:
+                    self.notifier.notify_many(row[0] for row in rows)
+        finally:
+            self.db._close_thread_connection()
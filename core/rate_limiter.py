@@ -0,0 +1,240 @@
+# core/rate_limiter.py
+"""
+Rate limiter compartilhado por todas as chamadas de integração (ML e Tiny).
+
+Um token bucket por (host, conta): cada requisição consome um token; os tokens voltam a
+'rate' por segundo até 'capacity'. Em 429 o bucket pausa pelo Retry-After (ou um backoff
+crescente, se o header não vier) e reduz a taxa pela metade; a cada resposta OK a taxa volta
+a subir aos poucos até o limite configurado (AIMD). Assim várias contas rodam no máximo
+sustentável sem uma derrubar a outra.
+
+Uso típico:
+    limiter = get_rate_limiter()
+    resp = limiter.call(url, account, lambda: session.get(url, ...))
+"""
+import threading
+import time
+import hashlib
+import urllib.parse
+from email.utils import parsedate_to_datetime
+
+# host -> (requisições/s, rajada). Valores conservadores; ajustáveis com configure().
+DEFAULT_HOST_LIMITS = {
+    "api.mercadolibre.com": (10.0, 20),
+    "api.tiny.com.br": (1.0, 3),        # API v2 (token por conta)
+    "erp.tiny.com.br": (2.0, 5),        # API v3 (OAuth)
+}
+FALLBACK_LIMIT = (5.0, 10)
+
+
+def parse_retry_after(value):
+    """Retry-After em segundos (aceita número ou data HTTP). None se ausente/inválido."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return max(0.0, float(value))
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def account_key_from_token(access_token):
+    """Chave derivada do token (não guarda o token em si). Muda a cada renovação do token."""
+    if not access_token:
+        return "anon"
+    return "tok-" + hashlib.sha1(str(access_token).encode("utf-8")).hexdigest()[:10]
+
+
+_unkeyed_warned = set()
+_unkeyed_lock = threading.Lock()
+
+
+def resolve_account_key(account_nickname, access_token=None):
+    """
+    Conta do bucket: sempre o apelido (account_nickname), o mesmo em todos os caminhos.
+    Sem apelido cai na chave do token, que gera um segundo bucket para a mesma conta (dobrando
+    a taxa efetiva) e um bucket novo a cada renovação do token; por isso avisa, uma vez por token.
+    """
+    if account_nickname:
+        return account_nickname
+    key = account_key_from_token(access_token)
+    with _unkeyed_lock:
+        first = key not in _unkeyed_warned
+        _unkeyed_warned.add(key)
+    if first:
+        print(f"RateLimiter: AVISO chamada sem account_nickname; usando bucket pelo token ({key}). "
+              f"Passe o apelido da conta para não dividir o limite dela em dois buckets.")
+    return key
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int, min_rate: float = None):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = float(min_rate) if min_rate else max(0.1, self.max_rate / 16)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._consecutive_429 = 0
+        self.lock = threading.Lock()
+        # métricas
+        self.requests = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+
+    def _refill(self, now):
+        elapsed = now - self._last
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self._last = now
+
+    def reserve(self) -> float:
+        """Consome um token e devolve quantos segundos o chamador deve esperar antes de enviar."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1.0
+            self.requests += 1
+            wait_s = 0.0
+            if self.tokens < 0:
+                wait_s = -self.tokens / self.rate
+            wait_s = max(wait_s, self._paused_until - now)
+            self.total_wait += wait_s
+            return wait_s
+
+    def on_throttled(self, retry_after=None):
+        with self.lock:
+            self.throttled += 1
+            self._consecutive_429 += 1
+            pause = retry_after if retry_after is not None else min(60.0, 2.0 ** self._consecutive_429)
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            self.rate = max(self.min_rate, self.rate / 2.0)
+            self.tokens = min(self.tokens, 0.0)
+
+    def on_success(self):
+        with self.lock:
+            self._consecutive_429 = 0
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            self._refill(time.monotonic())
+            return {
+                "tokens": round(self.tokens, 2),
+                "capacity": self.capacity,
+                "fill": round(max(0.0, self.tokens) / self.capacity, 3) if self.capacity else 0.0,
+                "rate": round(self.rate, 3),
+                "max_rate": self.max_rate,
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "total_wait_s": round(self.total_wait, 2),
+                "paused_for_s": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            }
+
+
+class RateLimiter:
+    def __init__(self, host_limits: dict = None):
+        self._lock = threading.Lock()
+        self._host_limits = dict(DEFAULT_HOST_LIMITS)
+        if host_limits:
+            self._host_limits.update(host_limits)
+        self._buckets = {}  # (host, account) -> TokenBucket
+
+    @staticmethod
+    def _host(url_or_host: str) -> str:
+        if "://" in (url_or_host or ""):
+            return urllib.parse.urlsplit(url_or_host).netloc.lower()
+        return (url_or_host or "").lower()
+
+    def configure(self, host: str, rate: float, burst: int):
+        """Altera o limite de um host; buckets já criados passam a usar o novo teto."""
+        host = self._host(host)
+        with self._lock:
+            self._host_limits[host] = (float(rate), int(burst))
+            for (bucket_host, _), bucket in self._buckets.items():
+                if bucket_host == host:
+                    with bucket.lock:
+                        bucket.max_rate = bucket.rate = float(rate)
+                        bucket.capacity = float(burst)
+
+    def bucket(self, url_or_host: str, account=None) -> TokenBucket:
+        key = (self._host(url_or_host), account or "default")
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rate, burst = self._host_limits.get(key[0], FALLBACK_LIMIT)
+                bucket = self._buckets[key] = TokenBucket(rate, burst)
+            return bucket
+
+    def reserve(self, url_or_host: str, account=None) -> float:
+        return self.bucket(url_or_host, account).reserve()
+
+    def acquire(self, url_or_host: str, account=None) -> float:
+        """Bloqueia até poder enviar. Retorna o tempo esperado (s)."""
+        wait_s = self.reserve(url_or_host, account)
+        if wait_s > 0:
+            time.sleep(wait_s)
+        return wait_s
+
+    def report(self, url_or_host: str, account=None, status_code=None, retry_after=None):
+        """Alimenta o bucket com o resultado da chamada (429 -> pausa/reduz; 2xx/3xx -> recupera)."""
+        bucket = self.bucket(url_or_host, account)
+        if status_code == 429:
+            bucket.on_throttled(parse_retry_after(retry_after))
+        elif isinstance(status_code, int) and status_code < 400:
+            bucket.on_success()
+
+    def call(self, url: str, account, send, max_retries: int = 3):
+        """
+        Executa send() respeitando o bucket de (host de url, account). Em 429 o bucket pausa
+        e a chamada é repetida até max_retries vezes. Retorna a última resposta (o chamador
+        continua responsável por raise_for_status()).
+        """
+        response = None
+        for attempt in range(max_retries):
+            self.acquire(url, account)
+            response = send()
+            status_code = getattr(response, "status_code", None)
+            headers = getattr(response, "headers", None) or {}
+            self.report(url, account, status_code, headers.get("Retry-After") if status_code == 429 else None)
+            if status_code != 429:
+                break
+            if attempt < max_retries - 1:
+                print(f"RateLimiter: 429 em {self._host(url)} (conta {account or 'default'}). Tentativa {attempt + 1}/{max_retries}.")
+        return response
+
+    def snapshot(self) -> list[dict]:
+        """Métricas por bucket: preenchimento, taxa atual, requisições e quantas vezes levou 429."""
+        with self._lock:
+            items = list(self._buckets.items())
+        return [dict(host=host, account=account, **bucket.snapshot()) for (host, account), bucket in items]
+
+    def total_throttled(self) -> int:
+        with self._lock:
+            buckets = list(self._buckets.values())
+        return sum(b.throttled for b in buckets)
+
+
+_default_limiter = None
+_default_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Instância única do processo, compartilhada por integrações, App e workers."""
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter()
+        return _default_limiter
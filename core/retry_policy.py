@@ -0,0 +1,130 @@
+# core/retry_policy.py
+"""
+Política de retentativa das tarefas da fila unificada (por task_type).
+
+Falha retentável (429, 408, 5xx, timeout/conexão) volta para PENDING com scheduled_for no futuro:
+backoff exponencial (base_delay * multiplier^(tentativa-1), limitado a max_delay) com jitter,
+respeitando o Retry-After do 429 quando vier. Esgotadas as max_attempts a tarefa vai para DEAD.
+Erro fatal vai direto para ERROR, que continua pedindo ação manual ("Resetar Falhas"): demais 4xx
+(validação, recurso inexistente, permissão) e qualquer exceção sem status HTTP que não seja de rede
+(KeyError, JSON inválido, "SKU não encontrado"...): tentar de novo não muda o resultado.
+Quem conhece o status da falha levanta TaskError(mensagem, status_code=...).
+
+Configuração (app_config, com o valor geral como padrão):
+    retry_max_attempts[_<task_type>]          (5)
+    retry_base_delay_seconds[_<task_type>]    (30)
+    retry_max_delay_seconds[_<task_type>]     (3600)
+"""
+import random
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+try:
+    import requests
+except Exception:
+    requests = None
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+# Falhas de rede sem status HTTP (transitórias)
+RETRYABLE_EXCEPTION_TYPES = (ConnectionError, TimeoutError) + (
+    (requests.exceptions.ConnectionError, requests.exceptions.Timeout) if requests is not None else ()
+)
+# "HTTP 503", "status 429", "status_code=500", "código 502", "Erro 429"...
+_STATUS_IN_MESSAGE = re.compile(r"(?:http|status(?:_code)?|c[óo]digo|erro)\D{0,3}([1-5]\d\d)\b", re.IGNORECASE)
+
+
+class TaskError(Exception):
+    """Falha de tarefa com o status HTTP de origem (e, se quem levanta souber, se vale tentar de novo)."""
+
+    def __init__(self, message, status_code: int = None, retryable: bool = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+
+
+def status_code_from_text(text):
+    """Status HTTP citado num texto de log/resumo (ex.: "HTTP 503"), ou None. Só para montar um TaskError."""
+    match = _STATUS_IN_MESSAGE.search(str(text or ""))
+    return int(match.group(1)) if match else None
+
+
+def error_status_code(error):
+    """Status HTTP do erro (atributo status_code ou response do requests), ou None."""
+    for candidate in (getattr(error, "status_code", None), getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(candidate, int):
+            return candidate
+    return None
+
+
+def is_retryable(error) -> bool:
+    """429/408/5xx e falhas de rede são transitórias; demais 4xx e erros sem status HTTP são fatais."""
+    if getattr(error, "retryable", None) is not None:
+        return bool(error.retryable)
+    status = error_status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES or status >= 500
+    return isinstance(error, RETRYABLE_EXCEPTION_TYPES)
+
+
+def _retry_after_seconds(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("Retry-After") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 5
+    base_delay: float = 30.0
+    max_delay: float = 3600.0
+    multiplier: float = 2.0
+    jitter: float = 0.5  # fração do atraso sorteada para baixo (0 = sem jitter)
+
+    @classmethod
+    def from_config(cls, db, task_type: str):
+        policy = cls()
+        get_config = getattr(db, "get_app_config_value", None)
+        if not get_config:
+            return policy
+        key = (task_type or "").lower()
+
+        def setting(name, default):
+            general = get_config(name, default)
+            return get_config(f"{name}_{key}", general) if key else general
+
+        try:
+            policy.max_attempts = max(1, int(setting("retry_max_attempts", policy.max_attempts)))
+            policy.base_delay = max(0.0, float(setting("retry_base_delay_seconds", policy.base_delay)))
+            policy.max_delay = max(policy.base_delay, float(setting("retry_max_delay_seconds", policy.max_delay)))
+        except (TypeError, ValueError) as e:
+            print(f"[RetryPolicy {task_type}] Configuração inválida, usando padrão: {e}")
+            return cls()
+        return policy
+
+    def delay_for(self, attempt: int, rng=random) -> float:
+        """Atraso (s) antes da tentativa seguinte à de número attempt (1 = primeira falha)."""
+        delay = min(self.max_delay, self.base_delay * (self.multiplier ** max(0, attempt - 1)))
+        return delay * (1 - self.jitter * rng.random())
+
+    def decide(self, retry_count: int, error, now: datetime = None, rng=random):
+        """
+        (status, scheduled_for, mensagem) para uma falha. retry_count = falhas anteriores da tarefa.
+        status: 'PENDING' (reagendada), 'DEAD' (esgotou) ou 'ERROR' (fatal).
+        """
+        attempt = int(retry_count or 0) + 1
+        message = str(error) if error is not None else ""
+        if not is_retryable(error):
+            return "ERROR", None, message
+        if attempt >= self.max_attempts:
+            return "DEAD", None, f"{message} (desistiu após {attempt} tentativa(s))"
+        delay = self.delay_for(attempt, rng)
+        retry_after = _retry_after_seconds(error)
+        if retry_after:
+            delay = max(delay, retry_after)
+        scheduled_for = (now or datetime.now()) + timedelta(seconds=delay)
+        return ("PENDING", scheduled_for,
+                f"{message} (tentativa {attempt}/{self.max_attempts}; nova tentativa às {scheduled_for:%H:%M:%S})")
@@ -2,6 +2,8 @@ import re
 import requests
 from bs4 import BeautifulSoup
 
+from core.http_session import get_session
+
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36',
     'Accept-Language': 'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7'
@@ -17,7 +19,7 @@ def scrape_stock_from_html(html_text):
 def scrape_competitor_info(product_url):
     data = {"title": None, "price": None, "stock": None, "error": None}
     try:
-        resp = requests.get(product_url, headers=HEADERS, timeout=20)
+        resp = get_session(product_url).get(product_url, headers=HEADERS, timeout=20)
         resp.raise_for_status()
         soup = BeautifulSoup(resp.text, 'lxml')
 
@@ -46,3 +48,7 @@ def scrape_competitor_info(product_url):
         data['error'] = f"Erro inesperado: {e}"
 
     return data
+
+def scrape_ml_product_basic_info(product_url):
+    """Dados básicos (título, preço, estoque) de um anúncio ML — mesma raspagem usada para concorrentes."""
+    return scrape_competitor_info(product_url)
@@ -42,3 +42,15 @@ def debug_plaintext_refs(text):
     print("--- DEBUG PLAINTEXT TEXT ---")
     print(text)
     print("----------------------------")
+
+def normalize_sku(sku):
+    """
+    Chave canônica de SKU (sem espaços nas pontas, maiúsculas) usada em tiny_products.sku_key,
+    fixed_prices e ml_variations.seller_sku_key. Retorna None para vazio/NaN.
+    """
+    if sku is None:
+        return None
+    if isinstance(sku, float) and sku != sku:  # NaN vindo do pandas
+        return None
+    key = str(sku).strip().upper()
+    return key or None
@@ -0,0 +1,175 @@
+# core/tiny_import.py
+"""
+Leitura em blocos da exportação de produtos do Tiny (xlsx/csv) para a tiny_products.
+
+- iter_tiny_export(): lê o arquivo em DataFrames de até chunksize linhas (csv com
+  pandas chunksize; xlsx com openpyxl read_only, se instalado). A memória não cresce com
+  o tamanho do arquivo.
+- tiny_rows_from_frame(): converte um bloco em tuplas prontas para executemany, coluna
+  a coluna (sem iterrows), na ordem de TINY_IMPORT_COLUMNS.
+- import_tiny_file(): junta as duas coisas e grava via
+  DatabaseManager.import_tiny_products_stream() (tabela de staging + diff).
+"""
+import csv
+import os
+
+import pandas as pd
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Ordem das tuplas geradas por tiny_rows_from_frame (= colunas da temp.tiny_import)
+TINY_IMPORT_COLUMNS = (
+    "sku_key", "sku", "id_produto", "descricao", "peso", "largura", "altura", "profundidade",
+    "stock", "status", "curva_a_posicao", "curva_a_rank", "url_imagem_1", "import_sequence", "parent_key",
+)
+
+# Colunas de identificador: lidas como texto para "00123" não virar 123.0
+TEXT_COLUMNS = {"Código (SKU)": str, "Código do pai": str}
+
+
+def _text(series):
+    """Série de texto sem espaços nas pontas; vazio vira <NA>."""
+    if pd.api.types.is_numeric_dtype(series):
+        # SKU numérico vindo do xlsx (12345.0) -> "12345"
+        series = series.map(lambda v: None if pd.isna(v) else (str(int(v)) if float(v).is_integer() else str(v)))
+    series = series.astype("string").str.strip()
+    return series.mask(series == "")
+
+
+def _number(series, default):
+    """Converte para float aceitando vírgula decimal ("1.234,5"); inválido vira default."""
+    if not pd.api.types.is_numeric_dtype(series):
+        txt = series.astype("string").str.strip()
+        has_comma = txt.str.contains(",", regex=False, na=False)
+        txt = txt.where(~has_comma, txt.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+        series = txt
+    return pd.to_numeric(series, errors="coerce").fillna(default)
+
+
+def _nullable(series):
+    """Lista Python com None no lugar de NaN/<NA> (o que o sqlite3 espera)."""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def tiny_rows_from_frame(df: pd.DataFrame, seq_start: int = 0) -> list:
+    """
+    Converte um bloco da planilha do Tiny em tuplas (ordem de TINY_IMPORT_COLUMNS).
+    import_sequence é a posição da linha no arquivo (seq_start + posição no bloco).
+    Linhas sem SKU são descartadas.
+    """
+    n = len(df)
+    if n == 0 or "Código (SKU)" not in df.columns:
+        return []
+
+    def col(name):
+        return df[name] if name in df.columns else pd.Series([None] * n, index=df.index, dtype=object)
+
+    sku = _text(df["Código (SKU)"])
+    sku_key = sku.str.upper()  # mesma regra de core.text_utils.normalize_sku: strip + upper
+    parent_key = _text(col("Código do pai")).str.upper()
+    if "Situação" in df.columns:
+        status = (df["Situação"].astype("string").str.strip().str.lower() == "ativo").map({True: "A", False: "I"})
+    else:
+        status = pd.Series("A", index=df.index)
+    id_produto = pd.to_numeric(col("ID"), errors="coerce").astype("Int64")
+    rank = pd.to_numeric(col("Rank"), errors="coerce").fillna(9999).astype(int)
+    sequence = pd.Series(range(seq_start, seq_start + n), index=df.index)
+
+    columns = [
+        _nullable(sku_key), _nullable(sku), _nullable(id_produto), _nullable(col("Descrição")),
+        _number(col("Peso bruto (Kg)"), 0.0).tolist(),
+        _number(col("Largura embalagem"), 0.0).tolist(),
+        _number(col("Altura embalagem"), 0.0).tolist(),
+        _number(col("Comprimento embalagem"), 0.0).tolist(),
+        _number(col("Estoque"), 0.0).tolist(),
+        status.astype(object).tolist(),
+        _nullable(_text(col("Classificação"))),
+        rank.tolist(),
+        _nullable(_text(col("URL imagem 1"))),
+        sequence.tolist(),
+        _nullable(parent_key),
+    ]
+    return [row for row in zip(*columns) if row[0] is not None]
+
+
+def iter_tiny_rows(frames, seq_start: int = 0):
+    """Aplica tiny_rows_from_frame em cada bloco, mantendo a sequência contínua entre blocos."""
+    seq = seq_start
+    for frame in frames:
+        yield tiny_rows_from_frame(frame, seq)
+        seq += len(frame)
+
+
+def iter_frame_chunks(df: pd.DataFrame, chunksize: int = DEFAULT_CHUNK_SIZE):
+    """Fatia um DataFrame já carregado (replace_all/upsert_tiny_products recebem um df)."""
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def _sniff_csv(file_path):
+    """(encoding, separador) da exportação. O Tiny exporta ';' e às vezes latin-1."""
+    with open(file_path, "rb") as f:
+        raw = f.read(64 * 1024)
+    try:
+        encoding, sample = "utf-8-sig", raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        encoding, sample = "latin-1", raw.decode("latin-1")
+    try:
+        sep = csv.Sniffer().sniff(sample.split("\n", 1)[0], delimiters=";,\t").delimiter
+    except csv.Error:
+        sep = ";"
+    return encoding, sep
+
+
+def _iter_xlsx_read_only(file_path, chunksize):
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, ())]
+        width = len(header)
+        buffer = []
+        for row in rows:
+            row = tuple(row[:width]) + (None,) * (width - len(row))
+            if any(v is not None for v in row):
+                buffer.append(row)
+            if len(buffer) >= chunksize:
+                yield pd.DataFrame(buffer, columns=header)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header)
+    finally:
+        wb.close()
+
+
+def iter_tiny_export(file_path: str, chunksize: int = DEFAULT_CHUNK_SIZE):
+    """Gera DataFrames de até chunksize linhas a partir da exportação do Tiny (.csv/.xlsx/.xls)."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in (".csv", ".txt"):
+        encoding, sep = _sniff_csv(file_path)
+        reader = pd.read_csv(file_path, sep=sep, encoding=encoding, dtype=TEXT_COLUMNS, chunksize=chunksize)
+        for frame in reader:
+            frame.columns = [str(c).strip() for c in frame.columns]
+            yield frame
+    elif ext in (".xlsx", ".xlsm") and openpyxl is not None:
+        yield from _iter_xlsx_read_only(file_path, chunksize)
+    else:
+        # .xls ou sem openpyxl: o pandas carrega a planilha inteira; ainda gravamos em blocos
+        df = pd.read_excel(file_path, dtype=TEXT_COLUMNS)
+        df.columns = [str(c).strip() for c in df.columns]
+        yield from iter_frame_chunks(df, chunksize)
+
+
+def import_tiny_file(db_manager, file_path: str, replace: bool = False, chunksize: int = DEFAULT_CHUNK_SIZE):
+    """
+    Importa a exportação do Tiny em streaming.
+    replace=True substitui o catálogo inteiro; senão faz upsert pelo SKU normalizado.
+    Retorna (atualizados, inseridos).
+    """
+    rows = iter_tiny_rows(iter_tiny_export(file_path, chunksize))
+    return db_manager.import_tiny_products_stream(rows, replace=replace)
+
@@ -0,0 +1,140 @@
+# core/ttl_cache.py
+"""
+Cache em memória com limite de tamanho (LRU) e validade por entrada (TTL), seguro entre threads.
+
+Substitui dicts soltos usados como cache (ex.: App.tiny_product_details_cache), que crescem
+sem limite e nunca expiram. Aceita a mesma interface de dict usada nesses pontos
+(get, [], in, pop, len) e conta hits/misses/despejos.
+
+Persistência opcional: com persist_path, save() grava as entradas ainda válidas num JSON e
+o construtor as recarrega (só valores serializáveis em JSON).
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize: int = 1000, ttl: float = 3600, name: str = "cache", persist_path: str = None):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self.name = name
+        self.persist_path = persist_path
+        self._data = OrderedDict()   # key -> (expires_at em time.time(), value); fim = mais recente
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        if persist_path:
+            self.load()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            if entry[0] <= time.time():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (exp, _) in self._data.items() if exp <= now]
+            for k in expired:
+                del self._data[k]
+            self.expirations += len(expired)
+        return len(expired)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        if self.pop(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[0] > time.time()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"name": self.name, "size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "expirations": self.expirations, "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0}
+
+    def save(self) -> int:
+        """Grava as entradas válidas em persist_path (escrita atômica). Retorna quantas gravou."""
+        if not self.persist_path:
+            return 0
+        now = time.time()
+        with self._lock:
+            entries = [[k, exp, v] for k, (exp, v) in self._data.items() if exp > now]
+        tmp_path = self.persist_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"[TTLCache {self.name}] Falha ao salvar em disco: {e}")
+            return 0
+        return len(entries)
+
+    def load(self) -> int:
+        """Recarrega de persist_path o que ainda não expirou (respeitando maxsize)."""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return 0
+        try:
+            with open(self.persist_path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[TTLCache {self.name}] Cache em disco ignorado: {e}")
+            return 0
+        now = time.time()
+        with self._lock:
+            for key, expires_at, value in entries[-self.maxsize:]:
+                if expires_at > now:
+                    self._data[key] = (expires_at, value)
+        return len(self._data)
@@ -0,0 +1,76 @@
+"""
+Benchmark do enfileiramento na unified_task_queue: add_task_to_queue item a item
+(um INSERT + commit por tarefa) contra add_tasks_to_queue_bulk (executemany por bloco).
+
+Uso (a partir da raiz do projeto):
+    python -m data.benchmarks.bench_enqueue
+    python -m data.benchmarks.bench_enqueue --sizes 1000 10000 100000 --legacy-max 10000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from core.database_manager import DatabaseManager
+
+
+def _new_db(tmp_dir, name):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DatabaseManager(os.path.join(tmp_dir, name))
+
+
+def _close_db(db):
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.close_db()
+
+
+def _items(n):
+    rules = {"markup_percent": 35.0, "min_margin": 10.0}
+    return [{"account_nickname": "conta_bench", "item_id": f"MLB{i:09d}", "payload": rules} for i in range(n)]
+
+
+def bench_legacy(db, n):
+    items = _items(n)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # add_task_to_queue imprime uma linha por tarefa
+        for it in items:
+            db.add_task_to_queue("PRICE_CHECK", it["account_nickname"], it["item_id"], it["payload"])
+    return time.perf_counter() - start
+
+
+def bench_bulk(db, n, chunk_size):
+    items = _items(n)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        task_ids = db.add_tasks_to_queue_bulk("PRICE_CHECK", items, chunk_size=chunk_size)
+    elapsed = time.perf_counter() - start
+    assert len(task_ids) == n, f"esperava {n} task_ids, recebeu {len(task_ids)}"
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--legacy-max", type=int, default=10000, help="maior N medido no modo item a item")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'N':>8} | {'modo':<10} | {'tempo (s)':>10} | {'tarefas/s':>12}")
+    print("-" * 50)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n in args.sizes:
+            if n <= args.legacy_max:
+                db = _new_db(tmp_dir, f"legacy_{n}.db")
+                elapsed = bench_legacy(db, n)
+                _close_db(db)
+                print(f"{n:>8} | {'item/item':<10} | {elapsed:>10.3f} | {n / elapsed:>12,.0f}")
+            db = _new_db(tmp_dir, f"bulk_{n}.db")
+            elapsed = bench_bulk(db, n, args.chunk_size)
+            _close_db(db)
+            print(f"{n:>8} | {'lote':<10} | {elapsed:>10.3f} | {n / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
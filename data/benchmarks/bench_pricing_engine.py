@@ -0,0 +1,72 @@
+"""
+Benchmark do recálculo de preços: um item por vez (PricingEngine.price_one, como o recálculo
+inline do orquestrador) contra uma passada em lote (PricingEngine.price_items).
+
+Regras sintéticas em faixas de preço por conta/tipo de anúncio; os preços do Tiny já estão no
+cache (mede só a avaliação das regras, sem rede).
+
+Uso (a partir da raiz do projeto):
+    python -m data.benchmarks.bench_pricing_engine
+    python -m data.benchmarks.bench_pricing_engine --items 50000 --rules 200 --single-max 2000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from core.database_manager import DatabaseManager
+from services.pricing_engine import PricingEngine
+
+ACCOUNTS = ["LOJA1", "LOJA2", "LOJA3", "*"]
+LISTING_TYPES = ["gold_special", "gold_pro", "*"]
+
+
+def _setup(path, n_items, n_rules):
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = DatabaseManager(path)
+    for i in range(n_rules):
+        db.save_pricing_rule({
+            "rule_id": None, "rule_name": f"regra {i}", "account_nickname": ACCOUNTS[i % len(ACCOUNTS)],
+            "listing_type": LISTING_TYPES[i % len(LISTING_TYPES)], "price_threshold": float(i * 10 % 500),
+            "comparison_operator": ">=", "base_price_source": "tiny_price", "fixed_value_add": 2.0,
+            "percentage_markup": 30.0 + i % 20, "include_shipping_cost": 0, "description": "",
+            "fixed_value_discount": 0.0, "percentage_discount": 0.0,
+        })
+    cache = {f"SKU{i:07d}": {"precos": {"preco": float(i % 700 + 5)}} for i in range(n_items)}
+    items = [{"item_id": f"MLB{i}", "account_nickname": ACCOUNTS[i % 3], "sku": f"SKU{i:07d}",
+              "listing_type_id": LISTING_TYPES[i % 2]} for i in range(n_items)]
+    return db, PricingEngine(db, details_cache=cache), items
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--rules", type=int, default=60)
+    parser.add_argument("--single-max", type=int, default=2000, help="itens no modo um-a-um (extrapolado)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db, engine, items = _setup(os.path.join(tmp, "bench.db"), args.items, args.rules)
+        engine.load()
+
+        sample = items[:args.single_max]
+        start = time.perf_counter()
+        for item in sample:
+            engine.price_one(item["account_nickname"], item["sku"], listing_type_id=item["listing_type_id"])
+        single = (time.perf_counter() - start) / len(sample) * len(items)
+
+        start = time.perf_counter()
+        report = engine.price_items(items)
+        batch = time.perf_counter() - start
+
+        print(f"{args.items} itens, {args.rules} regras")
+        print(f"  um a um (extrapolado): {single:8.2f}s")
+        print(f"  lote:                  {batch:8.2f}s  ({report.message})")
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.close_db()
+
+
+if __name__ == "__main__":
+    main()
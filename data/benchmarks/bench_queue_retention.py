@@ -0,0 +1,64 @@
+"""
+Benchmark da retenção da fila: latência de claim_tasks, get_task_count_by_type e
+get_all_price_check_statuses com N tarefas DONE acumuladas na unified_task_queue, antes e
+depois de archive_finished_tasks movê-las para task_history.
+
+Uso (a partir da raiz do projeto):
+    python -m data.benchmarks.bench_queue_retention
+    python -m data.benchmarks.bench_queue_retention --done 100000 500000 --pending 200
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from core.database_manager import DatabaseManager
+
+
+def _timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _measure(db, pending):
+    def claim_and_release():
+        tasks = db.claim_tasks("PRICE_CHECK", "bench", limit=10)
+        ids = [t["task_id"] for t in tasks]
+        db._execute_query(f"UPDATE unified_task_queue SET status = 'PENDING' WHERE task_id IN ({','.join('?' * len(ids))})",
+                          ids, commit=True)
+    return (_timed(claim_and_release), _timed(lambda: db.get_task_count_by_type("PRICE_CHECK")),
+            _timed(lambda: db.get_all_price_check_statuses(), repeat=2))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--done", type=int, nargs="+", default=[20000, 200000])
+    parser.add_argument("--pending", type=int, default=100)
+    args = parser.parse_args()
+
+    for n_done in args.done:
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()) as out:
+            db = DatabaseManager(os.path.join(tmp, "bench.db"))
+            items = [{"account_nickname": "conta", "item_id": f"MLB{i}"} for i in range(n_done + args.pending)]
+            ids = db.add_tasks_to_queue_bulk("PRICE_CHECK", items, chunk_size=5000)
+            db._execute_query(f"UPDATE unified_task_queue SET status = 'DONE', updated_timestamp = datetime('now', '-1 day') "
+                              f"WHERE task_id <= ?", (ids[n_done - 1],), commit=True)
+            before = _measure(db, args.pending)
+            start = time.perf_counter()
+            moved = db.archive_finished_tasks("PRICE_CHECK", older_than_seconds=3600, batch_size=2000)
+            archive_time = time.perf_counter() - start
+            after = _measure(db, args.pending)
+            db.close_db()
+        print(f"{n_done} DONE + {args.pending} PENDING (arquivadas {moved} em {archive_time:.2f}s)")
+        for label, b, a in zip(("claim_tasks", "get_task_count_by_type", "get_all_price_check_statuses"), before, after):
+            print(f"  {label:30s} antes {b:9.2f} ms   depois {a:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
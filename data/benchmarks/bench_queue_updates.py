@@ -0,0 +1,110 @@
+"""
+Micro-benchmark das mudanças de status na unified_task_queue: o gatilho antigo
+unified_queue_update_timestamp (AFTER UPDATE FOR EACH ROW -> segundo UPDATE na mesma linha)
+contra updated_timestamp gravado no próprio statement (update_task_status / reset_tasks_by_ids).
+
+Fila com --rows tarefas; mede --updates chamadas de update_task_status (um commit cada) e
+reset_tasks_by_ids em lotes de --reset-batch ids; no modo atual mede também fail_tasks em grupos
+de --flush-size (o que o TaskOutcomeBuffer grava por flush) contra update_task_status tarefa a tarefa. Os dois modos rodam alternados --repeat vezes
+e vale o melhor tempo de cada (o custo do commit oscila bastante entre execuções).
+
+Uso (a partir da raiz do projeto):
+    python -m data.benchmarks.bench_queue_updates
+    python -m data.benchmarks.bench_queue_updates --rows 100000 --updates 5000 --reset-batch 500
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from core.database_manager import DatabaseManager
+
+LEGACY_TRIGGER = """
+    CREATE TRIGGER unified_queue_update_timestamp
+    AFTER UPDATE ON unified_task_queue FOR EACH ROW
+    BEGIN
+        UPDATE unified_task_queue SET updated_timestamp = CURRENT_TIMESTAMP WHERE task_id = OLD.task_id;
+    END;
+"""
+
+
+def _legacy_update_task_status(db, task_id, new_status, error_message=None):
+    db._execute_query(
+        "UPDATE unified_task_queue SET status = ?, last_error_message = ?, retry_count = retry_count + 1 WHERE task_id = ?",
+        (new_status, error_message, task_id), commit=True
+    )
+
+
+def _legacy_reset_tasks_by_ids(db, task_ids):
+    placeholders = ','.join('?' for _ in task_ids)
+    db._execute_query(
+        f"UPDATE unified_task_queue SET status = 'PENDING', retry_count = 0, last_error_message = NULL, scheduled_for = ? "
+        f"WHERE task_id IN ({placeholders})",
+        (datetime.now(),) + tuple(task_ids), commit=True
+    )
+
+
+def _run(tmp, name, rows, updates, reset_batch, legacy, flush_size=50):
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = DatabaseManager(os.path.join(tmp, name))
+        ids = db.add_tasks_to_queue_bulk("BULK_EDIT", ({"account_nickname": "conta", "item_id": f"MLB{i}"} for i in range(rows)),
+                                         chunk_size=10000)
+    if legacy:
+        db._execute_query(LEGACY_TRIGGER, commit=True)
+    update_status = (lambda tid: _legacy_update_task_status(db, tid, "ERROR", "falhou")) if legacy else \
+        (lambda tid: db.update_task_status(tid, "ERROR", "falhou"))
+    reset = (lambda chunk: _legacy_reset_tasks_by_ids(db, chunk)) if legacy else db.reset_tasks_by_ids
+
+    targets = ids[::max(1, rows // updates)][:updates]
+    start = time.perf_counter()
+    for tid in targets:
+        update_status(tid)
+    status_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(0, len(targets), reset_batch):
+        reset(targets[i:i + reset_batch])
+    reset_time = time.perf_counter() - start
+
+    grouped_time = status_time
+    if not legacy:
+        start = time.perf_counter()
+        for i in range(0, len(targets), flush_size):
+            db.fail_tasks((tid, "falhou") for tid in targets[i:i + flush_size])
+        grouped_time = time.perf_counter() - start
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.close_db()
+    return status_time, reset_time, grouped_time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--reset-batch", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--flush-size", type=int, default=50)
+    args = parser.parse_args()
+
+    runs = {True: [], False: []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.repeat):
+            for legacy_mode in (True, False):
+                runs[legacy_mode].append(_run(tmp, f"bench_{i}_{legacy_mode}.db", args.rows, args.updates,
+                                              args.reset_batch, legacy=legacy_mode, flush_size=args.flush_size))
+    legacy = [min(r[k] for r in runs[True]) for k in (0, 1, 2)]
+    current = [min(r[k] for r in runs[False]) for k in (0, 1, 2)]
+
+    print(f"fila com {args.rows} tarefas, {args.updates} mudanças de status")
+    for label, old, new in (("update_task_status", legacy[0], current[0]),
+                            (f"reset_tasks_by_ids (lotes de {args.reset_batch})", legacy[1], current[1])):
+        print(f"  {label:38s} gatilho {args.updates / old:9.0f}/s   no statement {args.updates / new:9.0f}/s   ({old / new:.2f}x)")
+    print(f"  {f'fail_tasks (grupos de {args.flush_size})':38s} um a um {args.updates / current[0]:9.0f}/s   em lote      "
+          f"{args.updates / current[2]:9.0f}/s   ({current[0] / current[2]:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark da importação de produtos do Tiny: o upsert antigo (DataFrame inteiro + iterrows +
+SELECT 1 por linha) contra a importação em streaming (core.tiny_import.import_tiny_file:
+blocos do csv -> conversão vetorizada -> staging + executemany).
+
+Mede tempo e pico de memória Python (tracemalloc) sobre um csv sintético no formato da
+exportação do Tiny. O catálogo já tem metade dos SKUs, então metade vira update.
+
+Uso (a partir da raiz do projeto):
+    python -m data.benchmarks.bench_tiny_import
+    python -m data.benchmarks.bench_tiny_import --sizes 20000 200000 --legacy-max 20000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from core.database_manager import DatabaseManager
+from core.tiny_import import DEFAULT_CHUNK_SIZE, import_tiny_file
+from core.text_utils import normalize_sku
+
+HEADER = "ID;Código (SKU);Descrição;Peso bruto (Kg);Largura embalagem;Altura embalagem;Comprimento embalagem;Estoque;Situação;Código do pai;URL imagem 1\n"
+
+
+def _write_export(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER)
+        for i in range(n):
+            parent = f"SKU{i - i % 5:07d}" if i % 5 else ""
+            f.write(f"{i};SKU{i:07d};Produto de teste {i};0,{i % 900 + 100};10;5;20;{i % 40};Ativo;{parent};https://img.example/{i}.jpg\n")
+
+
+def _new_db(path, preload):
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = DatabaseManager(path)
+    conn = db._get_thread_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO tiny_products (id_produto, sku, sku_key, descricao) VALUES (?, ?, ?, 'antigo')",
+            ((i, f"SKU{i:07d}", normalize_sku(f"SKU{i:07d}")) for i in range(0, preload * 2, 2))
+        )
+    return db
+
+
+def _close_db(db):
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.close_db()
+
+
+def legacy_upsert(db, csv_path):
+    """Cópia do upsert_tiny_products antigo (uma linha por vez, com SELECT de existência)."""
+    df = pd.read_csv(csv_path, sep=";", dtype={"Código (SKU)": str, "Código do pai": str})
+    query = """
+        INSERT INTO tiny_products (
+            id_produto, sku, sku_key, descricao, peso, largura, altura, profundidade, stock,
+            curva_a_posicao, curva_a_rank, url_imagem_1, atualizado_em
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(sku_key) DO UPDATE SET
+            id_produto = excluded.id_produto, descricao = excluded.descricao, peso = excluded.peso,
+            largura = excluded.largura, altura = excluded.altura, profundidade = excluded.profundidade,
+            stock = excluded.stock, curva_a_posicao = excluded.curva_a_posicao,
+            curva_a_rank = excluded.curva_a_rank, url_imagem_1 = excluded.url_imagem_1,
+            atualizado_em = CURRENT_TIMESTAMP
+    """
+    updated = inserted = 0
+    conn = db._get_thread_connection()
+    with conn:
+        for _, row in df.iterrows():
+            sku = str(row['Código (SKU)']).strip()
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM tiny_products WHERE sku_key = ?", (normalize_sku(sku),))
+            exists = cursor.fetchone()
+            peso = str(row.get('Peso bruto (Kg)', 0)).replace(",", ".")
+            cursor.execute(query, (
+                row.get('ID', None), sku, normalize_sku(sku), row.get('Descrição', ''),
+                float(peso or 0), float(row.get('Largura embalagem', 0) or 0),
+                float(row.get('Altura embalagem', 0) or 0), float(row.get('Comprimento embalagem', 0) or 0),
+                float(row.get('Estoque', 0) or 0), None, 9999, row.get('URL imagem 1', None)
+            ))
+            if exists:
+                updated += 1
+            else:
+                inserted += 1
+    return updated, inserted
+
+
+def _measure(fn, *args, memory=True):
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn(*args)
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--legacy-max", type=int, default=50000, help="maior N medido no modo antigo")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--no-memory", action="store_true", help="não mede memória (tracemalloc deixa tudo mais lento)")
+    args = parser.parse_args()
+    memory = not args.no_memory
+
+    print(f"{'N':>8} | {'modo':<10} | {'tempo (s)':>10} | {'linhas/s':>10} | {'pico MB':>8} | atualizados/inseridos")
+    print("-" * 80)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n in args.sizes:
+            csv_path = os.path.join(tmp_dir, f"tiny_{n}.csv")
+            _write_export(csv_path, n)
+            modes = [("streaming", lambda db: import_tiny_file(db, csv_path, chunksize=args.chunk_size))]
+            if n <= args.legacy_max:
+                modes.insert(0, ("iterrows", lambda db: legacy_upsert(db, csv_path)))
+            for label, run in modes:
+                db = _new_db(os.path.join(tmp_dir, f"{label}_{n}.db"), n // 4)
+                result, elapsed, peak = _measure(run, db, memory=memory)
+                _close_db(db)
+                print(f"{n:>8} | {label:<10} | {elapsed:>10.3f} | {n / elapsed:>10,.0f} | {peak / 1e6:>8.1f} | {result[0]}/{result[1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,13 @@
-import requests
+from integrations.mercadolivre_api import make_cached_ml_api_request
 
-def make_ml_api_request_for_category_browser(url, access_token):
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    return response.json()
+def make_ml_api_request_for_category_browser(url, access_token, account_nickname=None):
+    # categorias mudam pouco: servidas pelo cache em disco (TTL + ETag), com rate limit e sessão pooled
+    return make_cached_ml_api_request(url, access_token, account_nickname=account_nickname)
 
-def get_site_categories_for_browser(site_id, access_token):
+def get_site_categories_for_browser(site_id, access_token, account_nickname=None):
     url = f"https://api.mercadolibre.com/sites/{site_id}/categories"
-    return make_ml_api_request_for_category_browser(url, access_token)
+    return make_ml_api_request_for_category_browser(url, access_token, account_nickname)
 
-def get_category_details_for_browser(category_id, access_token):
+def get_category_details_for_browser(category_id, access_token, account_nickname=None):
     url = f"https://api.mercadolibre.com/categories/{category_id}"
-    return make_ml_api_request_for_category_browser(url, access_token)
+    return make_ml_api_request_for_category_browser(url, access_token, account_nickname)
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from core.database_manager import DatabaseManager
+from core.text_utils import normalize_sku
+from services.abc_service import ABCService
+
+class ABCServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.temp_dir.name, "abc.db"))
+        for sku in ("abc-1 ", "XYZ", "OLD"):
+            self.db._execute_query(
+                "INSERT INTO tiny_products (sku, sku_key, curva_a_posicao, vendas_qtd) VALUES (?, ?, 'A', 99)",
+                (sku, normalize_sku(sku)), commit=True
+            )
+        self.df = pd.DataFrame({
+            "SKU": ["xyz", "ABC-1", "NOPE"],
+            "Quantidade": [5, 10, 1],
+            "Valor": [50.0, 300.0, 1.0],
+            "Classe_ABC": ["b", "A", "C"],
+        })
+
+    def tearDown(self):
+        self.db.close_db()
+        self.temp_dir.cleanup()
+
+    def _snapshot(self):
+        rows = self.db._execute_query(
+            "SELECT sku, vendas_qtd, vendas_valor, curva_a_posicao, curva_a_rank, import_sequence FROM tiny_products ORDER BY sku",
+            fetch_all=True
+        )
+        return [tuple(r) for r in rows]
+
+    def test_bulk_apply_updates_in_one_pass(self):
+        report = ABCService().apply_to_db(self.db, self.df)
+        self.assertTrue(report.success)
+        self.assertEqual(report.updated, 2)
+        self.assertEqual(report.not_found, ["NOPE"])
+        self.assertEqual(self._snapshot(), [
+            ("OLD", 0, 0, None, None, None),           # curva anterior foi zerada
+            ("XYZ", 5.0, 50.0, "B", 2, 2),
+            ("abc-1 ", 10.0, 300.0, "A", 1, 1),        # casa pela sku_key
+        ])
+
+    def test_bulk_and_row_by_row_classification_agree(self):
+        ABCService(bulk=False).apply_to_db(self.db, self.df)
+        legacy = [(r[0], r[3], r[4], r[5]) for r in self._snapshot()]
+        ABCService().apply_to_db(self.db, self.df)
+        bulk = [(r[0], r[3], r[4], r[5]) for r in self._snapshot()]
+        self.assertEqual(legacy, bulk)
+
+    def test_sku_key_backfill_unique_index_and_lookup(self):
+        # linha antiga sem chave (base anterior à migração): o init seguinte preenche
+        self.db._execute_query("INSERT INTO tiny_products (sku) VALUES (' legacy-9')", commit=True)
+        self.db.close_db()
+        self.db = DatabaseManager(self.db.db_name)
+        row = self.db._execute_query("SELECT sku_key FROM tiny_products WHERE sku = ' legacy-9'", fetch_one=True)
+        self.assertEqual(row["sku_key"], "LEGACY-9")
+        self.assertTrue(self.db._sku_key_unique)
+
+        # upsert por SKU com outra grafia atualiza o mesmo produto
+        self.db.save_or_update_tiny_product({"sku": "xyz ", "descricao": "Produto XYZ", "stock": 3})
+        rows = self.db._execute_query("SELECT sku, descricao FROM tiny_products WHERE sku_key = 'XYZ'", fetch_all=True)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["descricao"], "Produto XYZ")
+
+        plan = self.db._execute_query("EXPLAIN QUERY PLAN SELECT 1 FROM tiny_products WHERE sku_key = ?", ("XYZ",), fetch_all=True)
+        self.assertIn("idx_tiny_products_sku_key", " ".join(r["detail"] for r in plan))
+
+if __name__ == '__main__':
+    unittest.main()
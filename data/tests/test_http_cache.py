@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from core.http_cache import HttpResponseCache, ttl_for_url
+
+class HttpResponseCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = HttpResponseCache(os.path.join(self.temp_dir.name, "http_cache.db"))
+        self.url = "https://api.mercadolibre.com/categories/MLB1234"
+
+    def tearDown(self):
+        self.cache.thread_local.conn.close()
+        self.temp_dir.cleanup()
+
+    def _response(self, status_code, body=None, etag=None):
+        resp = MagicMock(status_code=status_code, headers={"ETag": etag} if etag else {})
+        resp.json.return_value = body
+        return resp
+
+    def test_fresh_entry_skips_network_and_stale_revalidates_with_etag(self):
+        send = MagicMock(return_value=self._response(200, {"id": "MLB1234"}, etag='"v1"'))
+        self.assertEqual(self.cache.get_json(self.url, None, send), {"id": "MLB1234"})
+        self.assertEqual(self.cache.get_json(self.url, None, send), {"id": "MLB1234"})
+        self.assertEqual(send.call_count, 1)
+
+        # vence o TTL: a próxima leitura manda If-None-Match e aproveita o 304
+        self.cache._conn().execute("UPDATE http_cache SET expires_at = 0")
+        send.return_value = self._response(304)
+        self.assertEqual(self.cache.get_json(self.url, None, send), {"id": "MLB1234"})
+        send.assert_called_with({"If-None-Match": '"v1"'})
+        self.assertEqual(self.cache.stats()["revalidated"], 1)
+
+    def test_lru_eviction_respects_max_bytes(self):
+        self.cache.max_bytes = 50
+        self.cache.store("a", '"' + "x" * 30 + '"')
+        self.cache.store("b", '"' + "y" * 30 + '"')
+        self.assertIsNone(self.cache.lookup("a"))
+        self.assertIsNotNone(self.cache.lookup("b"))
+
+    def test_ttl_per_endpoint_family(self):
+        self.assertGreater(ttl_for_url(self.url), ttl_for_url("https://api.mercadolibre.com/sites/MLB/categories"))
+
+if __name__ == '__main__':
+    unittest.main()
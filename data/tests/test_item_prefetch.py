@@ -0,0 +1,60 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from core.database_manager import DatabaseManager
+from services.ml_tokens import MLTokenProvider
+from workers.price_check_worker import PriceCheckWorker
+
+
+class ItemPrefetchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.temp_dir.name, "prefetch.db"))
+
+    def tearDown(self):
+        self.db.close_db()
+        self.temp_dir.cleanup()
+
+    def test_token_provider_refreshes_expired_token_and_persists(self):
+        self.db.save_ml_account("loja", {"access_token": "velho", "refresh_token": "r1", "expires_at": time.time() + 10})
+        refresh = Mock(return_value={"access_token": "novo", "refresh_token": "r2", "expires_in": 21600})
+        tokens = MLTokenProvider(self.db, refresh_fn=refresh)
+
+        self.assertEqual(tokens.get_token("loja"), "novo")
+        self.assertEqual(tokens.get_token("loja"), "novo")
+        refresh.assert_called_once_with("r1")
+        self.assertEqual(self.db.load_all_ml_accounts()["loja"]["refresh_token"], "r2")
+        self.assertIsNone(tokens.get_token("outra"))
+
+    @patch("integrations.mercadolivre_api.make_ml_api_request")
+    def test_price_check_worker_reads_claimed_batch_via_multiget(self, mock_request):
+        mock_request.side_effect = lambda url, token, params=None, account_nickname=None: [
+            {"code": 200, "body": {"id": i, "price": 10}} for i in params["ids"].split(",")
+        ]
+        for i in range(3):
+            self.db.add_task_to_queue("PRICE_CHECK", "loja", f"MLB{i}", {})
+        app = SimpleNamespace(db_manager=self.db, price_check_worker_event=threading.Event(),
+                              _get_current_ml_access_token_for_account=lambda nickname: "TOKEN")
+        app.price_check_worker_event.set()
+        worker = PriceCheckWorker(app)
+        seen = {}
+
+        def process(task):
+            seen[task["item_id"]] = task.get("_item_data")
+            worker.stop()
+        worker._process_single_price_check = process
+        worker.run()
+
+        self.assertEqual(mock_request.call_count, 1)  # um multiget para o lote, não um GET por tarefa
+        self.assertEqual(mock_request.call_args.kwargs["account_nickname"], "loja")
+        self.assertEqual(seen, {f"MLB{i}": {"id": f"MLB{i}", "price": 10} for i in range(3)})
+        self.assertEqual({t["status"] for t in self.db.get_tasks_from_queue("PRICE_CHECK", status=None, limit=None)}, {"DONE"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,13 @@
+import threading
 import unittest
 from unittest.mock import patch
 from integrations import mercadolivre_api as ml
 
 class MercadoLivreApiTestCase(unittest.TestCase):
 
-    @patch("integrations.mercadolivre_api.requests.post")
-    def test_get_access_token(self, mock_post):
+    @patch("integrations.mercadolivre_api.get_session")
+    def test_get_access_token(self, mock_get_session):
+        mock_post = mock_get_session.return_value.post
         mock_post.return_value.status_code = 200
         mock_post.return_value.json.return_value = {"access_token": "abc123"}
 
@@ -13,21 +15,53 @@ class MercadoLivreApiTestCase(unittest.TestCase):
         self.assertIn("access_token", result)
         self.assertEqual(result["access_token"], "abc123")
 
-    @patch("integrations.mercadolivre_api.requests.get")
-    def test_get_user_info(self, mock_get):
+    @patch("integrations.mercadolivre_api.get_session")
+    def test_get_user_info(self, mock_get_session):
+        mock_get = mock_get_session.return_value.get
         mock_get.return_value.status_code = 200
         mock_get.return_value.json.return_value = {"id": 98765, "nickname": "teste_ml"}
 
         result = ml.get_user_info("fake_token")
         self.assertEqual(result["nickname"], "teste_ml")
 
-    @patch("integrations.mercadolivre_api.requests.get")
-    def test_make_ml_api_request(self, mock_get):
+    @patch("integrations.mercadolivre_api.get_session")
+    def test_make_ml_api_request(self, mock_get_session):
+        mock_get = mock_get_session.return_value.get
         mock_get.return_value.status_code = 200
         mock_get.return_value.json.return_value = {"price": 100, "stock": 5}
 
         result = ml.make_ml_api_request("https://fake.api/test", "fake_token")
         self.assertEqual(result["price"], 100)
+        mock_get_session.assert_called_with("https://fake.api/test")
+
+    @patch("integrations.mercadolivre_api.make_ml_api_request")
+    def test_multiget_chunks_ids_and_maps_errors(self, mock_request):
+        def fake_multiget(url, token, params=None, account_nickname=None):
+            ids = params["ids"].split(",")
+            return [{"code": 404, "body": {"message": "not found"}} if i == "MLB7" else {"code": 200, "body": {"id": i, "price": 10}} for i in ids]
+        mock_request.side_effect = fake_multiget
+
+        ids = [f"MLB{i}" for i in range(25)]
+        result = ml.get_items_multiget(ids, "fake_token", attributes=["id", "price"])
+        self.assertEqual(mock_request.call_count, 2)  # 20 + 5
+        self.assertEqual(mock_request.call_args_list[0].kwargs["params"]["attributes"], "id,price")
+        self.assertEqual(result["MLB3"]["price"], 10)
+        self.assertEqual(result["MLB7"]["code"], 404)
+
+    @patch("integrations.mercadolivre_api.get_items_multiget")
+    def test_item_batcher_coalesces_concurrent_requests(self, mock_multiget):
+        mock_multiget.side_effect = lambda ids, *a, **k: {i: {"id": i} for i in ids}
+        batcher = ml.ItemBatcher("fake_token", max_wait=0.2)
+        results = {}
+
+        def fetch(item_id):
+            results[item_id] = batcher.get_item(item_id, timeout=5)
+
+        threads = [threading.Thread(target=fetch, args=(f"MLB{i}",)) for i in range(5)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        self.assertEqual(mock_multiget.call_count, 1)
+        self.assertEqual(results["MLB4"], {"id": "MLB4"})
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+from integrations import mercadolivre_async as mla
+
+class MercadoLivreAsyncTestCase(unittest.TestCase):
+
+    @patch.object(mla, "aiohttp", None)  # força o caminho via sessões pooled
+    @patch("integrations.mercadolivre_async.get_session")
+    def test_gather_items_uses_multiget_chunks_and_maps_errors(self, mock_get_session):
+        def fake_get(url, headers=None, params=None):
+            resp = MagicMock(status_code=200, headers={})
+            self.assertTrue(url.endswith("/items"))
+            ids = params["ids"].split(",")
+            resp.json.return_value = [
+                {"code": 404, "body": {"message": "not found"}} if i == "MLB_ERR" else {"code": 200, "body": {"id": i}}
+                for i in ids
+            ]
+            return resp
+        mock_get_session.return_value.get.side_effect = fake_get
+
+        ids = [f"MLB{i}" for i in range(24)] + ["MLB1", "MLB_ERR"]
+        result = mla.gather_items_sync(ids, "fake_token", account_nickname="conta_async", attributes=["id", "price"])
+        self.assertEqual(len(result), 25)
+        self.assertEqual(result["MLB2"], {"id": "MLB2"})
+        self.assertEqual(result["MLB_ERR"]["code"], 404)
+        calls = mock_get_session.return_value.get.call_args_list
+        self.assertEqual(len(calls), 2)  # 20 + 5 ids, não um GET por item
+        self.assertEqual(calls[0].kwargs["params"]["attributes"], "id,price")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from core.database_manager import DatabaseManager
+from services.pricing_engine import COMPARISON_OPERATORS, PricingEngine
+
+
+def _rule(name, account, listing, op, threshold, **values):
+    rule = {"rule_id": None, "rule_name": name, "account_nickname": account, "listing_type": listing,
+            "price_threshold": threshold, "comparison_operator": op, "base_price_source": "tiny_price",
+            "fixed_value_add": 0.0, "percentage_markup": 0.0, "include_shipping_cost": 0,
+            "description": "", "fixed_value_discount": 0.0, "percentage_discount": 0.0}
+    rule.update(values)
+    return rule
+
+
+class PricingEngineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.temp_dir.name, "pricing.db"))
+        self.db.save_pricing_rule(_rule("geral", "*", "*", ">=", 0, percentage_markup=50))
+        self.db.save_pricing_rule(_rule("loja premium", "LOJA", "premium", ">=", 0, percentage_markup=100))
+        self.db.save_pricing_rule(_rule("loja caro", "LOJA", "premium", ">=", 100, percentage_markup=10,
+                                        fixed_value_add=5))
+        self.db.save_fixed_price("fix-1", 42.0)
+        self.details = {"A": {"precos": {"preco": 20.0}}, "B": {"precos": {"preco": 200.0, "precoPromocional": 150.0}},
+                        "FIX-1": {"precos": {"preco": 10.0}}}
+        self.details_fn = mock.Mock(side_effect=lambda sku: self.details.get(sku.upper()))
+        self.engine = PricingEngine(self.db, details_fn=self.details_fn, max_workers=2)
+
+    def tearDown(self):
+        self.db.close_db()
+        self.temp_dir.cleanup()
+
+    def test_batch_picks_most_specific_rule_and_fixed_price(self):
+        report = self.engine.price_items([
+            {"item_id": "1", "account_nickname": "OUTRA", "sku": "a", "listing_type_id": "gold_pro"},
+            {"item_id": "2", "account_nickname": "loja", "sku": "A", "listing_type_id": "gold_pro"},
+            {"item_id": "3", "account_nickname": "LOJA", "sku": "b", "listing_type_id": "gold_pro"},
+            {"item_id": "4", "account_nickname": "LOJA", "sku": "fix-1", "listing_type_id": "gold_pro"},
+            {"item_id": "5", "account_nickname": "LOJA", "sku": "missing", "listing_type_id": "gold_pro"},
+        ])
+        results = report.results.set_index("item_id")
+        self.assertEqual(results.loc["1", "final_price"], 30.0)
+        self.assertEqual(results.loc["2", "final_price"], 40.0)
+        self.assertEqual(results.loc["3", "final_price"], 170.0)   # promocional 150 * 1.1 + 5
+        self.assertEqual(results.loc["3", "rule_name"], "loja caro")
+        self.assertEqual(results.loc["4", "final_price"], 42.0)
+        self.assertIsNotNone(results.loc["5", "error"])
+        self.assertEqual((report.priced, report.fixed, report.errors), (3, 1, 1))
+        self.assertEqual(len(report.logs), 4)  # preço fixo não gera log de cálculo
+
+        # detalhes ficam no cache: segunda passada não chama a API de novo
+        calls = self.details_fn.call_count
+        self.engine.price_items([{"item_id": "1", "account_nickname": "X", "sku": "A"}])
+        self.assertEqual(self.details_fn.call_count, calls)
+
+    def test_price_one_with_given_cost(self):
+        result = self.engine.price_one("LOJA", "ZZZ", listing_type_id="premium", cost=10.0)
+        self.assertEqual(result["final_price"], 20.0)
+        self.assertIsNone(result["error"])
+        self.details_fn.assert_not_called()
+
+    def test_single_item_recalc_matches_batch_for_tiny_cost_rule(self):
+        from types import SimpleNamespace
+        from app_gui.main_app import App
+        self.db.save_pricing_rule(_rule("custo", "CUSTO", "*", ">=", 0, base_price_source="tiny_cost",
+                                        percentage_markup=100))
+        self.details["C"] = {"precos": {"preco": 200.0, "precoCusto": 50.0}}
+        batch = self.engine.price_items([{"item_id": "1", "account_nickname": "CUSTO", "sku": "c",
+                                          "listing_type_id": "gold_pro"}]).results.iloc[0]
+        single = App._recalculate_price_unified(SimpleNamespace(pricing_engine=self.engine), "CUSTO", "c",
+                                                listing_type_id="gold_pro", item_id="1")
+        self.assertEqual(batch["final_price"], 100.0)  # precoCusto 50 * 2, não o preço de venda
+        self.assertEqual(single["final_price"], batch["final_price"])
+
+    def test_rule_index_matches_linear_scan_and_recompiles_on_change(self):
+        rng = random.Random(7)
+        for i in range(40):
+            self.db.save_pricing_rule(_rule(
+                f"r{i}", rng.choice(["LOJA", "OUTRA", "*"]), rng.choice(["gold_pro", "gold_special", "*"]),
+                rng.choice([">", ">=", "<", "<=", "=", "!="]), float(rng.choice([0, 10, 20, 50, 100])),
+                base_price_source=rng.choice(["tiny_price", "tiny_cost"]),
+            ))
+        items = [{"item_id": str(i), "account_nickname": rng.choice(["LOJA", "OUTRA", "X"]), "sku": "S",
+                  "listing_type_id": rng.choice(["gold_pro", "gold_special"]),
+                  "cost": float(rng.choice([5, 10, 20, 35, 50, 100, 150]))} for i in range(300)]
+        results = self.engine.price_items(items).results
+
+        def first_match(item):  # ordem de precedência percorrida linha a linha
+            for rule in self.engine.rules:
+                if (rule["_account"] in (None, item["account_nickname"].lower())
+                        and rule["_listing"] in (None, item["listing_type_id"])
+                        and COMPARISON_OPERATORS[rule["comparison_operator"]](item["cost"], rule["_threshold"])):
+                    return rule["rule_name"]
+            return None
+
+        self.assertEqual(list(results["rule_name"]), [first_match(item) for item in items])
+
+        with mock.patch.object(self.db, "get_all_pricing_rules", wraps=self.db.get_all_pricing_rules) as reads:
+            self.engine.price_items(items[:5])
+            reads.assert_not_called()  # nada mudou: índice compilado é reaproveitado
+            self.db.delete_pricing_rule(self.engine.rules[0]["rule_id"])
+            self.engine.price_items(items[:5])
+            self.assertEqual(reads.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from core.rate_limiter import RateLimiter, parse_retry_after, resolve_account_key
+
+class RateLimiterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.limiter = RateLimiter({"api.test": (10.0, 2)})
+
+    def test_burst_then_wait_per_account(self):
+        url = "https://api.test/items/1"
+        self.assertEqual(self.limiter.reserve(url, "conta1"), 0.0)
+        self.assertEqual(self.limiter.reserve(url, "conta1"), 0.0)
+        self.assertGreater(self.limiter.reserve(url, "conta1"), 0.0)
+        # outra conta tem bucket próprio
+        self.assertEqual(self.limiter.reserve(url, "conta2"), 0.0)
+
+    def test_429_pauses_for_retry_after_and_reduces_rate(self):
+        self.limiter.report("https://api.test/x", "conta1", 429, "3")
+        snap = next(s for s in self.limiter.snapshot() if s["account"] == "conta1")
+        self.assertEqual(snap["throttled"], 1)
+        self.assertEqual(snap["rate"], 5.0)
+        self.assertGreater(self.limiter.reserve("https://api.test/x", "conta1"), 2.5)
+
+    def test_call_retries_after_429(self):
+        self.limiter.configure("api.test", 1000.0, 5)
+        throttled = MagicMock(status_code=429, headers={"Retry-After": "0"})
+        ok = MagicMock(status_code=200, headers={})
+        send = MagicMock(side_effect=[throttled, ok])
+        self.assertIs(self.limiter.call("https://api.test/y", "conta1", send), ok)
+        self.assertEqual(send.call_count, 2)
+
+    def test_account_key_is_the_nickname_regardless_of_token(self):
+        self.assertEqual(resolve_account_key("loja1", "token-antigo"), "loja1")
+        self.assertEqual(resolve_account_key("loja1", "token-renovado"), "loja1")
+        with patch("builtins.print") as mock_print:
+            key = resolve_account_key(None, "token-sem-conta")
+            resolve_account_key(None, "token-sem-conta")
+        self.assertTrue(key.startswith("tok-"))
+        self.assertEqual(mock_print.call_count, 1)  # avisa, uma vez por token
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("7"), 7.0)
+        self.assertIsNone(parse_retry_after("abc"))
+        self.assertIsNone(parse_retry_after(None))
+
+if __name__ == '__main__':
+    unittest.main()
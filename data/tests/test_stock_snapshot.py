@@ -0,0 +1,82 @@
+import os
+import tempfile
+import time
+import unittest
+
+from core.database_manager import DatabaseManager
+from services.stock_snapshot import StockSnapshotService
+
+
+class FakeTinyV3:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, method, endpoint, params=None):
+        self.calls.append(endpoint)
+        if endpoint == "/produtos":
+            return {"itens": [{"id": 900}]} if params["codigo"] == "API-ONLY" else {"itens": []}
+        if endpoint == "/produtos/900":
+            return {"id": 900, "variacoes": [{"id": 901}]}
+        if endpoint.startswith("/estoque/"):
+            return {"depositos": [{"id": 7, "nome": "Principal", "saldo": 12.0, "disponivel": 10.0}]}
+        return None
+
+
+class StockSnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.temp_dir.name, "stock.db"))
+        self.db.save_or_update_tiny_product({"id_produto": 501, "sku": "VAR-1", "stock": 3, "id_pai": 500})
+        self.api = FakeTinyV3()
+        self.snapshot = StockSnapshotService(self.db, self.api, deposito_id_fn=lambda: "7", max_age_seconds=60)
+
+    def tearDown(self):
+        self.db.close_db()
+        self.temp_dir.cleanup()
+
+    def test_catalog_id_and_variation_skip_lookup_calls(self):
+        self.snapshot.prefetch(["var-1", "API-ONLY"])
+        self.assertEqual(self.snapshot.get_available_stock("var-1"), 10.0)
+        self.assertEqual(self.api.calls, ["/estoque/501"])  # id e variação vieram de tiny_products
+
+        # outra conta com o mesmo SKU: servido da memória
+        self.assertEqual(self.snapshot.get_available_stock(" VAR-1 "), 10.0)
+        self.assertEqual(self.api.calls, ["/estoque/501"])
+
+    def test_physical_stock_served_from_fresh_catalog_row(self):
+        self.assertEqual(self.snapshot.get_available_stock("VAR-1", sum_reserves=True), 3.0)
+        self.assertEqual(self.api.calls, [])
+
+    def test_row_touched_without_stock_does_not_refresh_stock_age(self):
+        self.db._execute_query("UPDATE tiny_products SET stock_atualizado_em = datetime('now', '-1 day'), "
+                               "atualizado_em = datetime('now', '-1 day')", commit=True)
+        self.db.upsert_tiny_products_from_api([{"sku": "VAR-1", "id_produto": 501, "descricao": "Renomeado", "status": "A"}])
+        self.db.apply_abc_curve_bulk([("VAR-1", 5, 50.0, "A", 1)])
+
+        self.assertEqual(self.snapshot.get_available_stock("VAR-1", sum_reserves=True), 12.0)
+        self.assertEqual(self.api.calls, ["/estoque/501"])  # o 3 da planilha antiga não é servido como fresco
+
+    def test_catalog_rows_expire_and_are_bounded(self):
+        snapshot = StockSnapshotService(self.db, self.api, deposito_id_fn=lambda: "7", max_age_seconds=60,
+                                        max_skus=2, catalog_ttl_seconds=0.05)
+        snapshot.prefetch(["VAR-1"])
+        time.sleep(0.1)
+        # importação feita por outro processo (sem listener aqui): a linha é relida do banco
+        self.db._execute_query("UPDATE tiny_products SET stock = 8", commit=True)
+        self.assertEqual(snapshot.get_available_stock("VAR-1", sum_reserves=True), 8.0)
+
+        snapshot = StockSnapshotService(self.db, self.api, max_skus=2)
+        snapshot.prefetch(["A", "B", "C", "D"])
+        self.assertEqual(len(snapshot._catalog), 2)
+
+    def test_api_fallback_resolves_single_variation_once(self):
+        self.assertEqual(self.snapshot.get_available_stock("API-ONLY", sum_reserves=True), 12.0)
+        self.assertEqual(self.api.calls, ["/produtos", "/produtos/900", "/estoque/901"])
+        self.snapshot.invalidate("API-ONLY")
+        self.snapshot.get_available_stock("API-ONLY")
+        self.assertEqual(self.api.calls[3:], ["/estoque/901"])
+        self.assertIsNone(self.snapshot.get_available_stock("NOPE"))
+
+
+if __name__ == '__main__':
+    unittest.main()
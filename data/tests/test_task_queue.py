@@ -29,5 +29,12 @@ class TaskQueueTestCase(unittest.TestCase):
         self.assertEqual(updated['status'], "DONE")
         self.assertEqual(updated['last_error_message'], "OK")
 
+    def test_pending_tasks_respect_schedule_and_priority(self):
+        self.queue.add_task("test", "acc1", "later", delay_minutes=10)
+        self.queue.add_task("test", "acc1", "normal")
+        self.queue.add_task("test", "acc1", "urgent", priority=5)
+        tasks = self.queue.get_pending_tasks()
+        self.assertEqual([t["item_id"] for t in tasks], ["urgent", "normal"])
+
 if __name__ == '__main__':
     unittest.main()
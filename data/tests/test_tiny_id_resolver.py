@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from core.database_manager import DatabaseManager
+from services.tiny_id_resolver import TinyIdResolver
+
+
+class TinyIdResolverTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.temp_dir.name, "ids.db"))
+        self.db.save_or_update_tiny_product({"id_produto": 10, "sku": "abc", "id_pai": 1})
+        self.api = mock.Mock(return_value={"itens": []})
+        self.resolver = TinyIdResolver(self.db, self.api, negative_ttl=60)
+        self.resolver.load()
+        self.db.add_tiny_products_listener(self.resolver.on_tiny_products_changed)
+
+    def tearDown(self):
+        self.db.close_db()
+        self.temp_dir.cleanup()
+
+    def test_resolves_from_catalog_without_api(self):
+        self.assertEqual(self.resolver.resolve(" ABC "), "10")
+        self.assertEqual(self.resolver.parent_of("abc"), "1")
+        self.api.assert_not_called()
+
+    def test_writes_update_index_and_clear_negative_cache(self):
+        self.assertIsNone(self.resolver.resolve("NEW"))
+        self.assertIsNone(self.resolver.resolve("NEW"))
+        self.assertEqual(self.api.call_count, 1)  # negativo em cache pelo TTL
+
+        self.db.save_or_update_tiny_product({"id_produto": 20, "sku": "new"})
+        self.assertEqual(self.resolver.resolve("NEW"), "20")
+
+        self.db.replace_all_tiny_products(pd.DataFrame({"ID": [30], "Código (SKU)": ["ABC"]}))
+        self.assertEqual(self.resolver.resolve("abc"), "30")
+        self.assertEqual(self.api.call_count, 1)
+
+    def test_api_failure_is_not_cached_as_missing(self):
+        self.api.return_value = None
+        self.assertIsNone(self.resolver.resolve("X1"))
+        self.api.return_value = {"itens": [{"id": 77}]}
+        self.assertEqual(self.resolver.resolve("X1"), "77")
+
+
+if __name__ == '__main__':
+    unittest.main()
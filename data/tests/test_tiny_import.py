@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from core.database_manager import DatabaseManager
+from core.tiny_import import import_tiny_file
+
+CSV_HEADER = "ID;Código (SKU);Descrição;Peso bruto (Kg);Estoque;Situação;Código do pai\n"
+
+
+class TinyImportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.temp_dir.name, "tiny.db"))
+        self.csv_path = os.path.join(self.temp_dir.name, "produtos.csv")
+
+    def tearDown(self):
+        self.db.close_db()
+        self.temp_dir.cleanup()
+
+    def _write_csv(self, lines):
+        with open(self.csv_path, "w", encoding="utf-8") as f:
+            f.write(CSV_HEADER + "".join(lines))
+
+    def _products(self):
+        rows = self.db._execute_query(
+            "SELECT sku, sku_key, descricao, peso, stock, status, id_pai FROM tiny_products ORDER BY sku_key", fetch_all=True
+        )
+        return [tuple(r) for r in rows]
+
+    def test_streaming_upsert_counts_inserted_and_updated(self):
+        self._write_csv([
+            "10;00123;Pai;1,5;4;Ativo;\n",
+            "11;abc-1 ;Filho;0,25;2;Inativo;00123\n",
+            "12;;Sem SKU;0;0;Ativo;\n",
+        ])
+        self.assertEqual(import_tiny_file(self.db, self.csv_path, chunksize=1), (0, 2))
+
+        self._write_csv(["11;ABC-1;Filho novo;0,3;7;Ativo;\n", "13;NEW;Novo;2;1;Ativo;\n"])
+        self.assertEqual(import_tiny_file(self.db, self.csv_path, chunksize=1), (1, 1))
+        self.assertEqual(self._products(), [
+            ("00123", "00123", "Pai", 1.5, 4.0, "A", None),
+            ("abc-1", "ABC-1", "Filho novo", 0.3, 7.0, "A", None),  # upsert não grava Situação nem pai
+            ("NEW", "NEW", "Novo", 2.0, 1.0, "A", None),
+        ])
+
+    def test_replace_resolves_parent_and_keeps_first_duplicate(self):
+        self._write_csv(["1;OLD;Antigo;0;0;Ativo;\n"])
+        import_tiny_file(self.db, self.csv_path)
+        df = pd.DataFrame({
+            "ID": [10, 11, 12],
+            "Código (SKU)": ["P1", "f1", "F1 "],
+            "Descrição": ["Pai", "Filho", "Duplicado"],
+            "Situação": ["Ativo", "Inativo", "Ativo"],
+            "Código do pai": [None, "p1", None],
+        })
+        self.assertEqual(self.db.replace_all_tiny_products(df), 2)
+        self.assertEqual(self._products(), [
+            ("f1", "F1", "Filho", 0.0, 0.0, "I", 10),
+            ("P1", "P1", "Pai", 0.0, 0.0, "A", None),
+        ])
+
+    def test_replace_swaps_staging_and_survives_failure_before_swap(self):
+        self._write_csv(["1;A1;Um;0;1;Ativo;\n", "2;A2;Dois;0;1;Ativo;\n"])
+        import_tiny_file(self.db, self.csv_path, replace=True)
+        import_tiny_file(self.db, self.csv_path, replace=True)  # segunda troca usa o outro nome de índice
+        self.assertEqual(len(self._products()), 2)
+        self.assertIsNotNone(self.db._find_sku_key_index(self.db._get_thread_connection(), "tiny_products"))
+
+        self._write_csv(["3;B1;Novo;0;1;Ativo;\n"])
+        with mock.patch.object(DatabaseManager, "_swap_tiny_products_staging", side_effect=RuntimeError("queda")):
+            with self.assertRaises(RuntimeError):
+                import_tiny_file(self.db, self.csv_path, replace=True)
+        self.assertEqual([p[0] for p in self._products()], ["A1", "A2"])  # catálogo antigo intacto
+
+        leftovers = "SELECT name FROM sqlite_master WHERE name IN ('tiny_products_staging', 'tiny_products_old')"
+        other = DatabaseManager(self.db.db_name)  # abrir o banco (outro processo/worker) não mexe na staging
+        self.assertEqual([r[0] for r in other._execute_query(leftovers, fetch_all=True)], ["tiny_products_staging"])
+        other.close_db()
+
+        import_tiny_file(self.db, self.csv_path, replace=True)  # a próxima importação limpa a sobra
+        self.assertEqual([p[0] for p in self._products()], ["B1"])
+        self.assertEqual(self.db._execute_query(leftovers, fetch_all=True), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from core.database_manager import DatabaseManager
+from services.tiny_sync import TinyCatalogSync
+
+
+class FakeTinyV3:
+    """Imita GET /produtos da API v3 (filtro dataAlteracao + paginação limit/offset)."""
+
+    def __init__(self, products):
+        self.products = products
+        self.calls = []
+
+    def __call__(self, method, endpoint, params=None):
+        self.calls.append(dict(params))
+        since = params.get("dataAlteracao", "")
+        matching = [p for p in self.products if p["dataAlteracao"] >= since]
+        page = matching[params["offset"]:params["offset"] + params["limit"]]
+        return {"itens": page, "paginacao": {"limit": params["limit"], "offset": params["offset"], "total": len(matching)}}
+
+
+class TinyCatalogSyncTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.temp_dir.name, "sync.db"))
+        self.api = FakeTinyV3([
+            {"id": i, "sku": f"sku-{i}", "descricao": f"Produto {i}", "situacao": "A", "dataAlteracao": f"2024-05-01 10:00:{i:02d}"}
+            for i in range(5)
+        ])
+
+    def tearDown(self):
+        self.db.close_db()
+        self.temp_dir.cleanup()
+
+    def test_first_run_pages_everything_and_stores_watermark(self):
+        report = TinyCatalogSync(self.db, self.api, page_size=2, batch_size=3).run()
+        self.assertTrue(report.success)
+        self.assertEqual((report.fetched, report.inserted, report.updated, report.pages), (5, 5, 0, 3))
+        self.assertNotIn("dataAlteracao", self.api.calls[0])
+        self.assertEqual(self.db.get_app_config_value(TinyCatalogSync.WATERMARK_KEY), "2024-05-01 10:00:04")
+
+    def test_next_run_only_fetches_changes_since_watermark(self):
+        TinyCatalogSync(self.db, self.api, page_size=2, overlap_seconds=0).run()
+        self.api.products[1] = dict(self.api.products[1], descricao="Renomeado", situacao="I", dataAlteracao="2024-05-02 08:00:00")
+        self.api.calls.clear()
+
+        report = TinyCatalogSync(self.db, self.api, page_size=2, overlap_seconds=0).run()
+        self.assertEqual(self.api.calls[0]["dataAlteracao"], "2024-05-01 10:00:04")
+        self.assertEqual((report.fetched, report.inserted, report.updated), (2, 0, 2))  # o da marca d'água + o alterado
+        row = self.db._execute_query("SELECT descricao, status FROM tiny_products WHERE sku_key = 'SKU-1'", fetch_one=True)
+        self.assertEqual((row["descricao"], row["status"]), ("Renomeado", "I"))
+        self.assertEqual(self.db.get_app_config_value(TinyCatalogSync.WATERMARK_KEY), "2024-05-02 08:00:00")
+
+    def test_failed_page_keeps_watermark(self):
+        TinyCatalogSync(self.db, self.api).run()
+        report = TinyCatalogSync(self.db, lambda *a, **k: None).run()
+        self.assertFalse(report.success)
+        self.assertEqual(self.db.get_app_config_value(TinyCatalogSync.WATERMARK_KEY), "2024-05-01 10:00:04")
+
+    def test_exception_is_reported_instead_of_raised(self):
+        with patch.object(self.db, "upsert_tiny_products_from_api", side_effect=RuntimeError("disco cheio")):
+            report = TinyCatalogSync(self.db, self.api, page_size=2, batch_size=3).run()
+        self.assertFalse(report.success)
+        self.assertIn("disco cheio", report.message)
+        self.assertIsNone(self.db.get_app_config_value(TinyCatalogSync.WATERMARK_KEY))
+
+        def broken_api(*args, **kwargs):
+            raise ConnectionError("sem rede")
+        report = TinyCatalogSync(self.db, broken_api).run()
+        self.assertFalse(report.success)
+        self.assertIn("sem rede", report.message)
+
+
+if __name__ == '__main__':
+    unittest.main()
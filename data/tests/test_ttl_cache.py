@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from core.ttl_cache import TTLCache
+
+
+class TTLCacheTestCase(unittest.TestCase):
+    def test_lru_eviction_keeps_recently_used(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache["A"] = 1
+        cache["B"] = 2
+        self.assertEqual(cache.get("A"), 1)  # A passa a ser o mais recente
+        cache["C"] = 3
+        self.assertNotIn("B", cache)
+        self.assertIn("A", cache)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_entries_expire_after_ttl(self):
+        cache = TTLCache(maxsize=10, ttl=30)
+        with mock.patch("core.ttl_cache.time.time", return_value=1000.0):
+            cache.set("A", {"preco": 10})
+            cache.set("B", 1, ttl=100)
+        with mock.patch("core.ttl_cache.time.time", return_value=1031.0):
+            self.assertIsNone(cache.get("A"))
+            self.assertEqual(cache.get("B"), 1)
+            stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["expirations"]), (1, 1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_persistence_round_trip_skips_expired(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.json")
+            cache = TTLCache(maxsize=10, ttl=60, persist_path=path)
+            cache["SKU1"] = {"precos": {"precoCusto": 5.5}}
+            cache.set("SKU2", 2, ttl=-1)
+            self.assertEqual(cache.save(), 1)
+
+            reloaded = TTLCache(maxsize=10, ttl=60, persist_path=path)
+            self.assertEqual(reloaded["SKU1"], {"precos": {"precoCusto": 5.5}})
+            self.assertEqual(len(reloaded), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
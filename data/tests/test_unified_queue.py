@@ -0,0 +1,309 @@
+import unittest
+import tempfile
+import os
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from core.database_manager import DatabaseManager
+
+class UnifiedQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.temp_dir.name, "queue.db"))
+
+    def tearDown(self):
+        self.db.close_db()
+        self.temp_dir.cleanup()
+
+    def _add(self, task_type="PRICE_CHECK", item_id="MLB1", **kwargs):
+        self.assertTrue(self.db.add_task_to_queue(task_type, "conta1", item_id, {"x": 1}, **kwargs))
+
+    def test_claim_marks_batch_with_owner_and_lease(self):
+        for i in range(5):
+            self._add(item_id=f"MLB{i}")
+
+        claimed = self.db.claim_tasks("PRICE_CHECK", "worker-a", limit=3, lease_seconds=60)
+        self.assertEqual(len(claimed), 3)
+        self.assertTrue(all(t["status"] == "PROCESSING" and t["worker_id"] == "worker-a" for t in claimed))
+
+        # um segundo worker nunca recebe as mesmas tarefas
+        other = self.db.claim_tasks("PRICE_CHECK", "worker-b", limit=10, lease_seconds=60)
+        self.assertEqual(len(other), 2)
+        self.assertFalse({t["task_id"] for t in claimed} & {t["task_id"] for t in other})
+        self.assertEqual(self.db.claim_tasks("PRICE_CHECK", "worker-c", limit=10), [])
+
+    def test_expired_lease_is_reclaimed(self):
+        self._add()
+        first = self.db.claim_tasks("PRICE_CHECK", "worker-a", limit=1, lease_seconds=60)
+        self.assertEqual(len(first), 1)
+
+        # simula um worker que morreu: o lease venceu
+        self.db._execute_query(
+            "UPDATE unified_task_queue SET lease_expires_at = ? WHERE task_id = ?",
+            (datetime.now() - timedelta(seconds=1), first[0]["task_id"]), commit=True
+        )
+        reclaimed = self.db.claim_tasks("PRICE_CHECK", "worker-b", limit=1)
+        self.assertEqual([t["task_id"] for t in reclaimed], [first[0]["task_id"]])
+        self.assertEqual(reclaimed[0]["worker_id"], "worker-b")
+
+    def test_claim_filters_by_task_type(self):
+        self._add("BULK_EDIT")
+        self.assertEqual(self.db.claim_tasks("PRICE_CHECK", "worker-a"), [])
+        self.assertEqual(len(self.db.claim_tasks("BULK_EDIT", "worker-a")), 1)
+
+    def test_claim_skips_tasks_not_yet_due(self):
+        self._add("AUTO_PROMO", item_id="MLB_LATER", delay_minutes=30)
+        self._add("AUTO_PROMO", item_id="MLB_NOW")
+        claimed = self.db.claim_tasks("AUTO_PROMO", "worker-a", limit=10)
+        self.assertEqual([t["item_id"] for t in claimed], ["MLB_NOW"])
+        self.assertEqual(self.db.get_tasks_from_queue("AUTO_PROMO", only_due=True), [])
+
+    def test_claim_orders_by_priority_then_schedule(self):
+        self._add(item_id="MLB_LOW")
+        self._add(item_id="MLB_HIGH", priority=10)
+        self._add(item_id="MLB_LOW_2")
+        claimed = self.db.claim_tasks("PRICE_CHECK", "worker-a", limit=2)
+        self.assertEqual([t["item_id"] for t in claimed], ["MLB_HIGH", "MLB_LOW"])
+
+    def test_bulk_enqueue_returns_inserted_ids(self):
+        shared_rules = {"markup": 1.2}
+        items = [{"account_nickname": "conta1", "item_id": f"MLB{i}", "payload": shared_rules} for i in range(7)]
+        items.append({"account_nickname": "conta1", "item_id": "MLB_LATER", "delay_minutes": 30})
+
+        task_ids = self.db.add_tasks_to_queue_bulk("PRICE_CHECK", items, chunk_size=3)
+        self.assertEqual(len(task_ids), 8)
+        stored = self.db.get_tasks_from_queue(task_ids=task_ids, limit=None)
+        self.assertEqual(sorted(t["task_id"] for t in stored), task_ids)
+        self.assertEqual(stored[0]["payload_json"], '{"markup": 1.2}')
+        # o item com atraso não é entregue agora
+        self.assertEqual(len(self.db.claim_tasks("PRICE_CHECK", "worker-a", limit=100)), 7)
+
+    def test_enqueue_wakes_only_matching_subscribers(self):
+        price_event = self.db.queue_notifier.subscribe("PRICE_CHECK")
+        bulk_event = self.db.queue_notifier.subscribe("BULK_EDIT")
+        self._add("PRICE_CHECK")
+        self.assertTrue(price_event.is_set())
+        self.assertFalse(bulk_event.is_set())
+
+        self.db.add_tasks_to_queue_bulk("BULK_EDIT", [{"account_nickname": "conta1", "item_id": "MLB9"}])
+        self.assertTrue(bulk_event.is_set())
+
+    def test_wal_watcher_wakes_on_insert_from_other_connection(self):
+        event = self.db.queue_notifier.subscribe("STOCK_DIVERGENCE")
+        self.db.start_queue_watcher(interval=0.05)
+        try:
+            other = DatabaseManager(self.db.db_name)  # simula outro processo: notifier próprio
+            other.add_task_to_queue("STOCK_DIVERGENCE", "conta1", "MLB1")
+            self.assertTrue(event.wait(timeout=5))
+            other.close_db()
+        finally:
+            self.db.stop_queue_watcher()
+
+    def test_retention_moves_done_tasks_to_history(self):
+        from services.queue_retention import QueueRetentionService
+        for i in range(5):
+            self._add(item_id=f"MLB{i}")
+        self._add("BULK_EDIT", item_id="MLB_B")
+        tasks = self.db.get_tasks_from_queue("PRICE_CHECK", limit=None)
+        for task in tasks[:3]:
+            self.db.update_task_status(task["task_id"], "DONE", "OK")
+        self.db.update_task_status(tasks[3]["task_id"], "ERROR", "falhou")
+        self.db._execute_query("UPDATE unified_task_queue SET updated_timestamp = datetime('now', '-2 hours')", commit=True)
+
+        self.db.set_app_config_value("queue_archive_after_seconds_price_check", 60)
+        report = QueueRetentionService(self.db, batch_size=2).run_once()
+        self.assertEqual(report.archived, {"PRICE_CHECK": 3})
+        self.assertEqual(self.db.get_task_count_by_type("PRICE_CHECK"), 2)  # ERROR e PENDING ficam
+        self.assertEqual(self.db.get_task_history_count("PRICE_CHECK"), 3)
+        # o último status do item continua visível mesmo arquivado
+        self.assertEqual(self.db.get_all_price_check_statuses()["MLB0"], {"status": "DONE", "result": "OK"})
+        # nova verificação do mesmo item arquivada depois: task_last_status fica com a mais nova
+        self._add(item_id="MLB0")
+        newer = self.db.claim_tasks("PRICE_CHECK", "worker-a", limit=10)
+        self.db.complete_tasks([(t["task_id"], "OK 2") for t in newer if t["item_id"] == "MLB0"])
+        self.db._execute_query("UPDATE unified_task_queue SET updated_timestamp = datetime('now', '-2 hours')", commit=True)
+        self.assertEqual(self.db.archive_finished_tasks("PRICE_CHECK", older_than_seconds=60, statuses=("DONE",)), 1)
+        self.assertEqual(self.db.get_all_price_check_statuses()["MLB0"], {"status": "DONE", "result": "OK 2"})
+        self.assertEqual(self.db._execute_query("SELECT COUNT(*) FROM task_last_status", fetch_one=True)[0], 3)
+
+        for table in ("task_history", "task_last_status"):
+            self.db._execute_query(f"UPDATE {table} SET archived_at = datetime('now', '-40 days')", commit=True)
+        self.assertEqual(QueueRetentionService(self.db).run_once().purged, {"PRICE_CHECK": 4})
+        self.assertNotIn("MLB0", self.db.get_all_price_check_statuses())
+
+    def test_retention_archives_failed_tasks_after_their_own_period(self):
+        from services.queue_retention import QueueRetentionService
+        for i in range(2):
+            self._add(item_id=f"MLB{i}")
+        first, second = self.db.get_tasks_from_queue("PRICE_CHECK", limit=None)
+        self.db.update_task_status(first["task_id"], "DEAD", "tentativas esgotadas")
+        self.db.update_task_status(second["task_id"], "ERROR", "anúncio não encontrado")
+        self.db._execute_query("UPDATE unified_task_queue SET updated_timestamp = datetime('now', '-2 hours')", commit=True)
+
+        self.assertEqual(QueueRetentionService(self.db).run_once().archived, {})  # ainda dá para reenfileirar
+        self.db._execute_query("UPDATE unified_task_queue SET updated_timestamp = datetime('now', '-8 days')", commit=True)
+        self.assertEqual(QueueRetentionService(self.db).run_once().archived, {"PRICE_CHECK": 2})
+        self.assertEqual(self.db.get_task_count_by_type("PRICE_CHECK"), 0)
+        self.assertEqual(self.db.get_all_price_check_statuses()["MLB0"]["status"], "DEAD")
+        self.assertEqual(self.db.get_all_price_check_statuses()["MLB1"]["status"], "ERROR")
+
+    def test_status_updates_stamp_updated_timestamp_without_trigger(self):
+        self._add()
+        task_id = self.db.get_tasks_from_queue("PRICE_CHECK")[0]["task_id"]
+        self.db._execute_query("UPDATE unified_task_queue SET updated_timestamp = '2000-01-01 00:00:00'", commit=True)
+        self.db.update_task_status(task_id, "ERROR", "falhou")
+        row = self.db.get_tasks_from_queue(task_ids=[task_id])[0]
+        self.assertGreater(row["updated_timestamp"], "2000-01-01 00:00:00")
+        triggers = self.db._execute_query(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'unified_task_queue'", fetch_all=True)
+        self.assertEqual(triggers, [])
+
+
+    def test_complete_and_fail_tasks_in_one_transaction(self):
+        from workers.outcome_buffer import TaskOutcomeBuffer
+        for i in range(6):
+            self._add(item_id=f"MLB{i}")
+        tasks = self.db.claim_tasks("PRICE_CHECK", "worker-a", limit=10)
+        ids = [t["task_id"] for t in tasks]
+
+        buffer = TaskOutcomeBuffer(self.db, max_items=3, max_delay=60)  # sem RetryPolicy: falha vira ERROR
+        buffer.complete(ids[0], "OK")
+        self.assertEqual(buffer.fail(tasks[1], Exception("falhou")), "ERROR")
+        self.assertEqual(buffer.pending(), 2)  # ainda não gravou
+        buffer.complete(ids[2], "OK")           # max_items: grava o lote
+        self.assertEqual(buffer.pending(), 0)
+        self.assertEqual(self.db.complete_tasks([(ids[3], None)], delete=True), 1)
+
+        rows = {t["task_id"]: t for t in self.db.get_tasks_from_queue(task_ids=ids)}
+        self.assertEqual((rows[ids[0]]["status"], rows[ids[0]]["last_error_message"]), ("DONE", "OK"))
+        self.assertEqual((rows[ids[1]]["status"], rows[ids[1]]["retry_count"]), ("ERROR", 1))
+        self.assertNotIn(ids[3], rows)
+        self.assertEqual(rows[ids[4]]["status"], "PROCESSING")
+
+    def test_outcome_buffer_flushes_by_time_without_new_outcomes(self):
+        import time
+        from workers.outcome_buffer import TaskOutcomeBuffer
+        self._add()
+        task = self.db.claim_tasks("PRICE_CHECK", "worker-a", limit=1)[0]
+        buffer = TaskOutcomeBuffer(self.db, max_items=100, max_delay=0.1, worker_id="worker-a")
+        buffer.complete(task["task_id"], "OK")
+        status = lambda: self.db.get_tasks_from_queue(task_ids=[task["task_id"]])[0]["status"]
+        deadline = time.monotonic() + 5
+        while status() != "DONE" and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual((status(), buffer.pending()), ("DONE", 0))  # gravado sem novo resultado nem flush()
+        self.assertEqual(buffer.close(), 0)
+
+    def test_stale_outcome_does_not_touch_reclaimed_task(self):
+        from workers.outcome_buffer import TaskOutcomeBuffer
+        self._add(task_type="BULK_EDIT")
+        task = self.db.claim_tasks("BULK_EDIT", "worker-a", limit=1, lease_seconds=60)[0]
+        buffer = TaskOutcomeBuffer(self.db, max_items=100, max_delay=60, delete_completed=True, worker_id="worker-a")
+        buffer.complete(task["task_id"])
+
+        # o lease de worker-a vence antes do flush e worker-b reivindica a tarefa
+        self.db._execute_query("UPDATE unified_task_queue SET lease_expires_at = ?",
+                               (datetime.now() - timedelta(seconds=1),), commit=True)
+        self.assertEqual(len(self.db.claim_tasks("BULK_EDIT", "worker-b", limit=1)), 1)
+        buffer.flush()
+        row = self.db.get_tasks_from_queue(task_ids=[task["task_id"]])[0]
+        self.assertEqual((row["status"], row["worker_id"]), ("PROCESSING", "worker-b"))
+        self.assertEqual(self.db.fail_tasks([(task["task_id"], "atrasado")], worker_id="worker-a"), 0)
+        self.assertEqual(self.db.complete_tasks([(task["task_id"], None)], delete=True, worker_id="worker-b"), 1)
+
+    def test_held_batch_lease_is_renewed_until_outcome_is_written(self):
+        from workers.outcome_buffer import TaskOutcomeBuffer
+        for i in range(2):
+            self._add(item_id=f"MLB{i}")
+        tasks = self.db.claim_tasks("PRICE_CHECK", "worker-a", limit=10, lease_seconds=1)
+        buffer = TaskOutcomeBuffer(self.db, max_items=100, max_delay=60, worker_id="worker-a", lease_seconds=1)
+        buffer.hold(tasks)
+        buffer.complete(tasks[0]["task_id"])
+        buffer.flush()
+
+        time.sleep(1.5)  # mais que o lease original: sem renovação o lote voltaria para a fila
+        self.assertEqual(self.db.claim_tasks("PRICE_CHECK", "worker-b", limit=10), [])
+        row = self.db.get_tasks_from_queue(task_ids=[tasks[1]["task_id"]])[0]
+        self.assertEqual((row["status"], row["worker_id"]), ("PROCESSING", "worker-a"))
+        buffer.complete(tasks[1]["task_id"])
+        self.assertEqual(buffer.close(), 1)
+        self.assertEqual(buffer._leased, set())
+
+    def test_retry_policy_reschedules_transient_and_dead_letters(self):
+        from core.retry_policy import RetryPolicy, TaskError
+        from workers.outcome_buffer import TaskOutcomeBuffer
+        for i in range(3):
+            self._add(item_id=f"MLB{i}")
+        tasks = self.db.claim_tasks("PRICE_CHECK", "worker-a", limit=10)
+        ids = [t["task_id"] for t in tasks]
+
+        policy = RetryPolicy(max_attempts=2, base_delay=600, jitter=0)
+        buffer = TaskOutcomeBuffer(self.db, max_items=100, max_delay=60, retry_policy=policy)
+        self.assertEqual(policy.decide(0, KeyError("payload_json"))[0], "ERROR")  # sem status e sem ser de rede
+        self.assertEqual(buffer.fail(tasks[0], TaskError("Too Many Requests", status_code=429)), "PENDING")
+        self.assertEqual(buffer.fail(tasks[1], TaskError("anúncio não encontrado", status_code=404)), "ERROR")
+        self.assertEqual(buffer.fail(dict(tasks[2], retry_count=1), TimeoutError("timeout")), "DEAD")
+        self.assertEqual(buffer.flush(), 3)
+
+        rows = {t["task_id"]: t for t in self.db.get_tasks_from_queue(task_ids=ids)}
+        retried = rows[ids[0]]
+        self.assertEqual((retried["status"], retried["retry_count"], retried["worker_id"]), ("PENDING", 1, None))
+        self.assertGreater(datetime.fromisoformat(str(retried["scheduled_for"])), datetime.now() + timedelta(seconds=500))
+        self.assertEqual(rows[ids[1]]["status"], "ERROR")
+        self.assertEqual(rows[ids[2]]["status"], "DEAD")
+        self.assertEqual(self.db.claim_tasks("PRICE_CHECK", "worker-b", limit=10), [])  # backoff ainda não venceu
+        self.assertEqual(self.db.reset_tasks_by_ids([ids[2]]), 1)
+        self.assertEqual([t["task_id"] for t in self.db.claim_tasks("PRICE_CHECK", "worker-b", limit=10)], [ids[2]])
+
+    def test_failed_insert_returns_false_and_does_not_notify(self):
+        notified = []
+        self.db.queue_notifier.notify = notified.append
+        self.assertFalse(self.db.add_task_to_queue("PRICE_CHECK", None, "MLB1"))  # account_nickname NOT NULL
+        self.assertEqual(notified, [])
+        self.assertTrue(self.db.add_task_to_queue("PRICE_CHECK", "conta1", "MLB1"))
+        self.assertEqual(notified, ["PRICE_CHECK"])
+
+    def test_dedup_settings_read_once_not_per_enqueue(self):
+        with patch.object(self.db, "get_app_config_value", wraps=self.db.get_app_config_value) as get_config:
+            for i in range(5):
+                self._add(item_id=f"MLB{i}")
+        self.assertEqual(get_config.call_count, 3)  # ligado + payload + agendamento, uma vez só
+        self.db.set_app_config_value("queue_dedup_price_check", False)  # mudar a configuração vale na hora
+        self._add(item_id="MLB0")
+        self.assertEqual(len(self.db.get_tasks_from_queue("PRICE_CHECK", limit=None)), 6)
+
+    def test_dedup_merges_pending_and_supersedes_on_requeue(self):
+        db = self.db
+        self.assertTrue(db.add_task_to_queue("PRICE_CHECK", "conta1", "MLB1", {"v": 1}, delay_minutes=10))
+        self.assertTrue(db.add_task_to_queue("PRICE_CHECK", "conta1", "MLB1", {"v": 2}, priority=5))
+        self.assertEqual(db.add_tasks_to_queue_bulk("PRICE_CHECK", [{"account_nickname": "conta1", "item_id": "MLB1",
+                                                                      "payload": {"v": 3}, "delay_minutes": 30}]), [])
+        pending = db.get_tasks_from_queue("PRICE_CHECK", limit=None)
+        self.assertEqual(len(pending), 1)  # payload mais novo, agendamento mais cedo, maior prioridade
+        self.assertEqual((pending[0]["payload_json"], pending[0]["priority"]), ('{"v": 3}', 5))
+        self.assertLessEqual(datetime.fromisoformat(str(pending[0]["scheduled_for"])), datetime.now())
+
+        db.set_app_config_value("queue_dedup_payload_price_check", "oldest")
+        db.add_task_to_queue("PRICE_CHECK", "conta1", "MLB1", {"v": 4})
+        self.assertEqual(db.get_tasks_from_queue("PRICE_CHECK", limit=None)[0]["payload_json"], '{"v": 3}')
+        db.add_task_to_queue("BULK_EDIT", "conta1", "MLB1", {"v": 1})
+        db.add_task_to_queue("BULK_EDIT", "conta1", "MLB1", {"v": 1})
+        self.assertEqual(len(db.get_tasks_from_queue("BULK_EDIT", limit=None)), 2)  # sem dedup por padrão
+
+        # em processamento a tarefa sai do índice: um novo enfileiramento cria outra pendente;
+        # ao voltar para PENDING (lease vencido, retry ou reset) a mais antiga é substituída
+        first = db.claim_tasks("PRICE_CHECK", "worker-a", limit=1)[0]
+        db.add_task_to_queue("PRICE_CHECK", "conta1", "MLB1", {"v": 5})
+        self.assertEqual(db.retry_tasks([(first["task_id"], "HTTP 503", datetime.now())]), 1)
+        self.assertEqual(db.get_tasks_from_queue(task_ids=[first["task_id"]])[0]["status"], "SUPERSEDED")
+        second = db.claim_tasks("PRICE_CHECK", "worker-a", limit=1)[0]
+        db.add_task_to_queue("PRICE_CHECK", "conta1", "MLB1", {"v": 6})
+        db.update_task_status(second["task_id"], "ERROR", "falhou")
+        self.assertEqual(db.reset_tasks_by_ids([second["task_id"]]), 1)
+        statuses = [t["status"] for t in db.get_tasks_from_queue("PRICE_CHECK", status=None, limit=None)]
+        self.assertEqual(statuses.count("PENDING"), 1)
+        self.assertEqual(db.get_all_price_check_statuses()["MLB1"]["status"], "PENDING")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import threading
+import time
+import unittest
+
+from workers.worker_pool import AccountPacer, WorkerPool
+
+class WorkerPoolTestCase(unittest.TestCase):
+    def test_batch_runs_concurrently_and_counts_results(self):
+        pool = WorkerPool("PRICE_CHECK", max_workers=4)
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def handler(task):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            if task["task_id"] == 3:
+                raise RuntimeError("falha simulada")
+            if task["task_id"] == 5:
+                return False  # falha já registrada pelo handler (caso dos workers)
+
+        tasks = [{"task_id": i, "account_nickname": f"conta{i}"} for i in range(8)]
+        self.assertEqual(pool.run_batch(tasks, handler), 8)
+        pool.shutdown()
+
+        self.assertGreater(peak[0], 1)
+        stats = pool.stats()
+        self.assertEqual((stats["done"], stats["errors"], stats["active"]), (6, 2, 0))
+        self.assertGreater(stats["per_second"], 0)
+
+    def test_pacer_spaces_calls_of_the_same_account_only(self):
+        pacer = AccountPacer(0.05)
+        self.assertEqual(pacer.acquire("conta1"), 0.0)
+        self.assertEqual(pacer.acquire("conta2"), 0.0)
+        self.assertGreater(pacer.acquire("conta1"), 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
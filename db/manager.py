@@ -44,10 +44,24 @@ class DatabaseManager:
             status TEXT DEFAULT 'PENDING',
             retry_count INTEGER DEFAULT 0,
             last_error_message TEXT,
-            scheduled_for TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            added_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            scheduled_for TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+            added_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            priority INTEGER DEFAULT 0
         )
         """)
+        # Migração de bancos antigos (prioridade e updated_timestamp, gravado pelos UPDATEs de status)
+        existing_cols = {row[1] for row in cursor.execute("PRAGMA table_info(unified_task_queue)").fetchall()}
+        if "priority" not in existing_cols:
+            cursor.execute("ALTER TABLE unified_task_queue ADD COLUMN priority INTEGER DEFAULT 0")
+        if "updated_timestamp" not in existing_cols:
+            # ALTER TABLE não aceita default CURRENT_TIMESTAMP em tabela com linhas: preenche à parte
+            cursor.execute("ALTER TABLE unified_task_queue ADD COLUMN updated_timestamp TIMESTAMP")
+            cursor.execute("UPDATE unified_task_queue SET updated_timestamp = COALESCE(added_timestamp, CURRENT_TIMESTAMP)")
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_unified_queue_dequeue
+            ON unified_task_queue(task_type, status, priority DESC, scheduled_for)
+        """)
 
     def _get_thread_connection(self):
         if not hasattr(self.thread_local, "connection"):
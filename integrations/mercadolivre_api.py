@@ -1,5 +1,10 @@
-import requests
+import threading
 import urllib.parse
+from concurrent.futures import Future
+
+from core.rate_limiter import get_rate_limiter, resolve_account_key
+from core.http_session import get_session
+from core.http_cache import get_http_cache
 
 ML_CLIENT_ID = '3574022221088825'
 ML_CLIENT_SECRET = 'msLQzMKsrF0is2hyoBgaa4dqE47E1SXE'
@@ -7,6 +12,7 @@ ML_REDIRECT_URI = 'https://api.meliunlocker.cc/callback'
 ML_SITE_ID = "MLB"
 ML_API_BASE_URL = "https://api.mercadolibre.com"
 APP_USER_AGENT = "MLAdCreatorMultiAccount/3.0.0"
+ML_MULTIGET_MAX_IDS = 20  # limite do /items?ids=
 
 def get_auth_url():
     return (
@@ -25,37 +31,185 @@ def get_access_token(auth_code):
         "redirect_uri": ML_REDIRECT_URI
     }
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    resp = requests.post(url, data=payload, headers=headers)
+    resp = get_rate_limiter().call(url, "oauth", lambda: get_session(url).post(url, data=payload, headers=headers))
+    resp.raise_for_status()
+    return resp.json()
+
+def refresh_access_token(refresh_token):
+    """Troca o refresh_token por um novo par de tokens (o ML invalida o refresh_token usado)."""
+    url = f"{ML_API_BASE_URL}/oauth/token"
+    payload = {
+        "grant_type": "refresh_token",
+        "client_id": ML_CLIENT_ID,
+        "client_secret": ML_CLIENT_SECRET,
+        "refresh_token": refresh_token
+    }
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    resp = get_rate_limiter().call(url, "oauth", lambda: get_session(url).post(url, data=payload, headers=headers))
     resp.raise_for_status()
     return resp.json()
 
-def get_user_info(access_token):
+def get_user_info(access_token, account_nickname=None):
+    """/users/me. Sem account_nickname (conta ainda sendo cadastrada) usa o bucket "oauth", como a troca de tokens."""
     url = f"{ML_API_BASE_URL}/users/me"
     headers = {"Authorization": f"Bearer {access_token}"}
-    resp = requests.get(url, headers=headers)
+    resp = get_rate_limiter().call(url, account_nickname or "oauth", lambda: get_session(url).get(url, headers=headers))
     resp.raise_for_status()
     return resp.json()
 
-def make_ml_api_request(url, access_token, params=None, user_agent=None):
+def make_ml_api_request(url, access_token, params=None, user_agent=None, account_nickname=None):
+    """GET na API do ML passando pelo rate limiter da conta (account_nickname; sem ele, o token, com aviso)."""
     headers = {
         "Authorization": f"Bearer {access_token}",
         "User-Agent": user_agent or APP_USER_AGENT
     }
-    resp = requests.get(url, headers=headers, params=params)
+    account = resolve_account_key(account_nickname, access_token)
+    resp = get_rate_limiter().call(url, account, lambda: get_session(url).get(url, headers=headers, params=params))
     resp.raise_for_status()
     return resp.json()
 
-def get_site_categories(site_id, access_token):
-    return make_ml_api_request(
-        f"{ML_API_BASE_URL}/sites/{site_id}/categories", access_token
+def make_cached_ml_api_request(url, access_token, params=None, user_agent=None, account_nickname=None, ttl=None):
+    """
+    Como make_ml_api_request, mas servido pelo cache em disco (core.http_cache): TTL por família
+    de endpoint e revalidação por ETag. Só para metadados que não dependem da conta (categorias etc.).
+    """
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "User-Agent": user_agent or APP_USER_AGENT
+    }
+    account = resolve_account_key(account_nickname, access_token)
+
+    def _send(extra_headers):
+        return get_rate_limiter().call(
+            url, account, lambda: get_session(url).get(url, headers={**headers, **extra_headers}, params=params)
+        )
+    return get_http_cache().get_json(url, params, _send, ttl)
+
+def get_site_categories(site_id, access_token, account_nickname=None):
+    return make_cached_ml_api_request(
+        f"{ML_API_BASE_URL}/sites/{site_id}/categories", access_token, account_nickname=account_nickname
     )
 
-def get_category_details(cat_id, access_token):
-    return make_ml_api_request(
-        f"{ML_API_BASE_URL}/categories/{cat_id}", access_token
+def get_category_details(cat_id, access_token, account_nickname=None):
+    return make_cached_ml_api_request(
+        f"{ML_API_BASE_URL}/categories/{cat_id}", access_token, account_nickname=account_nickname
     )
 
-def get_category_dump(site_id, access_token):
-    return make_ml_api_request(
-        f"{ML_API_BASE_URL}/sites/{site_id}/categories/all", access_token
+def get_category_dump(site_id, access_token, account_nickname=None):
+    return make_cached_ml_api_request(
+        f"{ML_API_BASE_URL}/sites/{site_id}/categories/all", access_token, account_nickname=account_nickname
     )
+
+def get_items_multiget(item_ids, access_token, attributes=None, account_nickname=None):
+    """
+    Lê vários anúncios via /items?ids=... (até 20 por chamada).
+    'attributes' (lista ou string "id,price,...") projeta só os campos necessários.
+    Retorna {item_id: body}; ids que o ML devolve com code != 200 vêm como {"error": ..., "code": ...}.
+    """
+    unique_ids = list(dict.fromkeys(i for i in item_ids if i))
+    if isinstance(attributes, (list, tuple, set)):
+        attributes = ",".join(attributes)
+    results = {}
+    for start in range(0, len(unique_ids), ML_MULTIGET_MAX_IDS):
+        chunk = unique_ids[start:start + ML_MULTIGET_MAX_IDS]
+        params = {"ids": ",".join(chunk)}
+        if attributes:
+            params["attributes"] = attributes
+        entries = make_ml_api_request(f"{ML_API_BASE_URL}/items", access_token, params=params, account_nickname=account_nickname)
+        results.update(parse_multiget_entries(chunk, entries))
+    return results
+
+def parse_multiget_entries(chunk, entries):
+    """Resposta de um /items?ids= (lista de {code, body}) -> {item_id: body ou {"error", "code"}} para os ids do chunk."""
+    results = {}
+    for pos, entry in enumerate(entries or []):
+        body = entry.get("body") or {}
+        item_id = body.get("id") or (chunk[pos] if pos < len(chunk) else None)
+        if entry.get("code") == 200:
+            results[item_id] = body
+        else:
+            results[item_id] = {"error": body.get("message") or body.get("error") or "Erro no multiget", "code": entry.get("code")}
+    for item_id in chunk:
+        results.setdefault(item_id, {"error": "Item ausente na resposta do multiget", "code": None})
+    return results
+
+
+class ItemBatcher:
+    """
+    Junta pedidos de item avulsos (de várias threads) em chamadas multiget.
+    get_item() espera até max_wait segundos por outros pedidos (ou até juntar 20 ids) e então
+    uma única chamada /items?ids= atende todo mundo. prefetch() dispara na hora.
+
+        batcher = ItemBatcher(token, account_nickname="loja1", attributes="id,price,status")
+        item = batcher.get_item("MLB123")
+    """
+
+    def __init__(self, access_token, account_nickname=None, attributes=None, max_wait: float = 0.05):
+        self.access_token = access_token
+        self.account_nickname = account_nickname
+        self.attributes = attributes
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._pending = {}  # item_id -> Future
+        self._timer = None
+
+    def _take_pending(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        return batch
+
+    def _run(self, batch):
+        if not batch:
+            return
+        try:
+            results = get_items_multiget(list(batch), self.access_token, self.attributes, self.account_nickname)
+            for item_id, future in batch.items():
+                future.set_result(results.get(item_id))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+
+    def flush(self):
+        self._run(self._take_pending())
+
+    def get_item_future(self, item_id) -> Future:
+        batch = None
+        with self._lock:
+            future = self._pending.get(item_id)
+            if future is None:
+                future = self._pending[item_id] = Future()
+                if len(self._pending) >= ML_MULTIGET_MAX_IDS:
+                    batch, self._pending = self._pending, {}
+                    if self._timer is not None:
+                        self._timer.cancel()
+                        self._timer = None
+                elif self._timer is None:
+                    self._timer = threading.Timer(self.max_wait, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            self._run(batch)
+        return future
+
+    def get_item(self, item_id, timeout=None):
+        """Dados do item (como /items/{id}); levanta exceção se o multiget falhar."""
+        result = self.get_item_future(item_id).result(timeout)
+        if isinstance(result, dict) and result.get("error"):
+            raise RuntimeError(f"Item {item_id}: {result['error']}")
+        return result
+
+    def prefetch(self, item_ids) -> dict:
+        """Busca já (sem esperar o max_wait) e devolve {item_id: body ou {"error": ...}}."""
+        futures = {item_id: self.get_item_future(item_id) for item_id in dict.fromkeys(i for i in item_ids if i)}
+        self.flush()
+        results = {}
+        for item_id, future in futures.items():
+            try:
+                results[item_id] = future.result()
+            except Exception as e:
+                results[item_id] = {"error": str(e), "code": None}
+        return results
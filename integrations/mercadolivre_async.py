@@ -0,0 +1,160 @@
+"""
+Cliente assíncrono da API do Mercado Livre para leituras com muito fan-out
+(milhares de itens, árvore de categorias).
+
+Mesma superfície de integrations.mercadolivre_api (make_ml_api_request, get_site_categories,
+get_category_details, get_category_dump) + get_item e gather_items. gather_items usa o multiget
+(/items?ids=, 20 por chamada, como get_items_multiget) e dispara os blocos em paralelo. Todas as
+chamadas passam pelo core.rate_limiter (bucket da conta) e a concorrência é limitada por um semáforo.
+
+Usa aiohttp se estiver instalado; senão roda as chamadas nas sessões pooled de
+core.http_session dentro de um ThreadPoolExecutor (mesmo comportamento, sem dependência nova).
+
+Em threads (workers) use gather_items_sync(), que roda o loop com asyncio.run().
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from core.http_session import get_session, DEFAULT_TIMEOUT
+from core.rate_limiter import get_rate_limiter, resolve_account_key
+from integrations.mercadolivre_api import ML_API_BASE_URL, APP_USER_AGENT, ML_MULTIGET_MAX_IDS, parse_multiget_entries
+
+DEFAULT_CONCURRENCY = 16
+MAX_RETRIES = 3
+
+
+class AsyncMLClient:
+    """
+    async with AsyncMLClient(access_token, account_nickname="loja1") as client:
+        items = await client.gather_items(["MLB1", "MLB2", ...])
+    """
+
+    def __init__(self, access_token, account_nickname=None, concurrency: int = DEFAULT_CONCURRENCY, user_agent=None):
+        self.access_token = access_token
+        self.account = resolve_account_key(account_nickname, access_token)
+        self.concurrency = max(1, int(concurrency))
+        self.headers = {
+            "Authorization": f"Bearer {access_token}",
+            "User-Agent": user_agent or APP_USER_AGENT
+        }
+        self.limiter = get_rate_limiter()
+        self._semaphore = None
+        self._session = None     # aiohttp.ClientSession
+        self._executor = None    # fallback sem aiohttp
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        if aiohttp is not None:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT),
+                connector=aiohttp.TCPConnector(limit_per_host=self.concurrency),
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="ml-async")
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _get_once(self, url, params):
+        """Uma tentativa. Retorna (status_code, retry_after, json_or_None)."""
+        if self._session is not None:
+            async with self._session.get(url, params=params) as resp:
+                if resp.status == 429:
+                    return resp.status, resp.headers.get("Retry-After"), None
+                resp.raise_for_status()
+                return resp.status, None, await resp.json(content_type=None)
+
+        def _sync_get():
+            resp = get_session(url).get(url, headers=self.headers, params=params)
+            if resp.status_code == 429:
+                return resp.status_code, resp.headers.get("Retry-After"), None
+            resp.raise_for_status()
+            return resp.status_code, None, resp.json()
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _sync_get)
+
+    async def make_ml_api_request(self, url, params=None):
+        async with self._semaphore:
+            for attempt in range(MAX_RETRIES):
+                wait_s = self.limiter.reserve(url, self.account)
+                if wait_s > 0:
+                    await asyncio.sleep(wait_s)
+                status_code, retry_after, data = await self._get_once(url, params)
+                self.limiter.report(url, self.account, status_code, retry_after)
+                if status_code != 429:
+                    return data
+            raise RuntimeError(f"Rate limit (429) persistente após {MAX_RETRIES} tentativas: {url}")
+
+    async def get_site_categories(self, site_id):
+        return await self.make_ml_api_request(f"{ML_API_BASE_URL}/sites/{site_id}/categories")
+
+    async def get_category_details(self, cat_id):
+        return await self.make_ml_api_request(f"{ML_API_BASE_URL}/categories/{cat_id}")
+
+    async def get_category_dump(self, site_id):
+        return await self.make_ml_api_request(f"{ML_API_BASE_URL}/sites/{site_id}/categories/all")
+
+    async def get_item(self, item_id, params=None):
+        return await self.make_ml_api_request(f"{ML_API_BASE_URL}/items/{item_id}", params=params)
+
+    async def gather_items(self, item_ids, attributes=None) -> dict:
+        """
+        Busca vários itens via multiget: blocos de 20 ids, em paralelo (limitado por concurrency e
+        pelo rate limiter). 'attributes' projeta os campos, como em get_items_multiget.
+        Retorna {item_id: dados}; itens que falharam vêm como {"error": "..."}.
+        """
+        unique_ids = list(dict.fromkeys(i for i in item_ids if i))
+        if isinstance(attributes, (list, tuple, set)):
+            attributes = ",".join(attributes)
+        chunks = [unique_ids[start:start + ML_MULTIGET_MAX_IDS] for start in range(0, len(unique_ids), ML_MULTIGET_MAX_IDS)]
+
+        async def _chunk(chunk):
+            params = {"ids": ",".join(chunk)}
+            if attributes:
+                params["attributes"] = attributes
+            try:
+                return parse_multiget_entries(chunk, await self.make_ml_api_request(f"{ML_API_BASE_URL}/items", params=params))
+            except Exception as e:
+                return {item_id: {"error": str(e)} for item_id in chunk}
+
+        results = {}
+        for partial in await asyncio.gather(*(_chunk(c) for c in chunks)):
+            results.update(partial)
+        return results
+
+
+# --- Funções com a mesma superfície do módulo síncrono ---
+
+async def make_ml_api_request(url, access_token, params=None, user_agent=None, account_nickname=None):
+    async with AsyncMLClient(access_token, account_nickname, concurrency=1, user_agent=user_agent) as client:
+        return await client.make_ml_api_request(url, params=params)
+
+async def get_site_categories(site_id, access_token):
+    return await make_ml_api_request(f"{ML_API_BASE_URL}/sites/{site_id}/categories", access_token)
+
+async def get_category_details(cat_id, access_token):
+    return await make_ml_api_request(f"{ML_API_BASE_URL}/categories/{cat_id}", access_token)
+
+async def get_category_dump(site_id, access_token):
+    return await make_ml_api_request(f"{ML_API_BASE_URL}/sites/{site_id}/categories/all", access_token)
+
+async def gather_items(item_ids, access_token, account_nickname=None, concurrency=DEFAULT_CONCURRENCY, attributes=None):
+    async with AsyncMLClient(access_token, account_nickname, concurrency=concurrency) as client:
+        return await client.gather_items(item_ids, attributes=attributes)
+
+def gather_items_sync(item_ids, access_token, account_nickname=None, concurrency=DEFAULT_CONCURRENCY, attributes=None):
+    """Para código síncrono (threads dos workers): roda gather_items num loop próprio."""
+    return asyncio.run(gather_items(item_ids, access_token, account_nickname, concurrency, attributes))
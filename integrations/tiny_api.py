@@ -1,7 +1,12 @@
 import requests
 import xml.etree.ElementTree as ET
 
+from core.rate_limiter import get_rate_limiter
+from core.http_session import get_session
+
 TINY_BASE_URL = "https://api.tiny.com.br/api2"
+TINY_V3_API_BASE_URL = "https://erp.tiny.com.br/public-api/v3"
+TINY_V2_BUCKET = "tiny_v2"  # uma conta Tiny por instalação, como o bucket "tiny_v3" do App
 
 def build_url(endpoint, token, params=None):
     base = f"{TINY_BASE_URL}/{endpoint}.php"
@@ -10,23 +15,23 @@ def build_url(endpoint, token, params=None):
         query.update(params)
     return base, query
 
-def send_tiny_request(endpoint, token, params=None):
+def send_tiny_request(endpoint, token, params=None, account_nickname=None):
     url, query = build_url(endpoint, token, params)
     try:
-        resp = requests.get(url, params=query, timeout=20)
+        resp = get_rate_limiter().call(url, account_nickname or TINY_V2_BUCKET, lambda: get_session(url).get(url, params=query, timeout=20))
         resp.raise_for_status()
         return resp.json()
     except requests.RequestException as e:
         return {"error": str(e)}
 
-def create_product(token, product_data):
-    return send_tiny_request("produto.incluir", token, product_data)
+def create_product(token, product_data, account_nickname=None):
+    return send_tiny_request("produto.incluir", token, product_data, account_nickname)
 
-def update_product(token, product_data):
-    return send_tiny_request("produto.alterar", token, product_data)
+def update_product(token, product_data, account_nickname=None):
+    return send_tiny_request("produto.alterar", token, product_data, account_nickname)
 
-def get_product(token, sku):
-    return send_tiny_request("produto.consultar", token, {"sku": sku})
+def get_product(token, sku, account_nickname=None):
+    return send_tiny_request("produto.consultar", token, {"sku": sku}, account_nickname)
 
-def list_products(token, page=1):
-    return send_tiny_request("produtos.listar", token, {"pagina": page})
+def list_products(token, page=1, account_nickname=None):
+    return send_tiny_request("produtos.listar", token, {"pagina": page}, account_nickname)
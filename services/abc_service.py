@@ -4,6 +4,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Optional, List, Dict, Any
 
+from core.text_utils import normalize_sku as normalize_sku_key
+
 try:
     import pandas as pd
 except Exception:
@@ -25,10 +27,14 @@ class ABCService:
       - Atualiza vendas_qtd, vendas_valor
       - Atualiza curva_a_posicao (A/B/C) e curva_a_rank
       - Atualiza import_sequence (ordem da planilha)
+
+    Por padrão usa o modo em lote (DatabaseManager.apply_abc_curve_bulk: tabela temporária +
+    UPDATE ... FROM numa transação). bulk=False (ou um db sem esse método) usa o loop linha a linha.
     """
 
-    def __init__(self, normalize_sku: bool = True):
+    def __init__(self, normalize_sku: bool = True, bulk: bool = True):
         self.normalize_sku = normalize_sku
+        self.bulk = bulk
 
     def apply_to_db(self, db_manager, df: "pd.DataFrame") -> ABCApplyReport:
         if pd is None:
@@ -76,6 +82,9 @@ class ABCService:
         # Sequência de import (1..n)
         work["import_sequence"] = work.index + 1
 
+        if self.bulk and hasattr(db_manager, "apply_abc_curve_bulk"):
+            return self._apply_bulk(db_manager, work)
+
         # Aplica no DB
         updated_count = 0
         not_found: List[str] = []
@@ -113,9 +122,9 @@ class ABCService:
                            curva_a_rank = ?, 
                            import_sequence = ?, 
                            atualizado_em = CURRENT_TIMESTAMP
-                     WHERE UPPER(TRIM(sku)) = ?
+                     WHERE sku_key = ?
                     """,
-                    (cls, rank, rank, sku),
+                    (cls, rank, rank, normalize_sku_key(sku)),
                     commit=True
                 )
                 # Verifica se houve match
@@ -132,3 +141,24 @@ class ABCService:
             msg += f" Não encontrados: {len(not_found)}."
 
         return ABCApplyReport(True, msg, updated=updated_count, not_found=not_found, warnings=warnings)
+
+    def _apply_bulk(self, db_manager, work: "pd.DataFrame") -> ABCApplyReport:
+        """Modo set-based: monta as tuplas de forma vetorizada e aplica tudo numa transação."""
+        classes = work["Classe_ABC"].fillna("").astype(str).str.strip().str.upper().str[:1]
+        classes = classes.where(classes != "", "C")
+        rows = list(zip(
+            work["SKU"].tolist(),
+            work["Quantidade"].astype(float).tolist(),
+            work["Valor"].astype(float).tolist(),
+            classes.tolist(),
+            work["import_sequence"].astype(int).tolist(),
+        ))
+        try:
+            updated_count, not_found = db_manager.apply_abc_curve_bulk(rows, match_normalized=self.normalize_sku)
+        except Exception as e:
+            return ABCApplyReport(False, f"Falha ao aplicar a Curva ABC em lote: {e}")
+
+        msg = f"Aplicação da Curva ABC concluída. Atualizados: {updated_count}."
+        if not_found:
+            msg += f" Não encontrados: {len(not_found)}."
+        return ABCApplyReport(True, msg, updated=updated_count, not_found=not_found, warnings=[])
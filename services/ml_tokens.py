@@ -0,0 +1,54 @@
+# services/ml_tokens.py
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from integrations.mercadolivre_api import refresh_access_token
+
+
+class MLTokenProvider:
+    """
+    Access token do Mercado Livre por conta, para os workers (multiget, updates).
+
+    As contas vêm de ml_accounts (DatabaseManager.load_all_ml_accounts). Um token que vence em
+    menos de margin_seconds é renovado pelo refresh_token e gravado de volta (save_ml_account),
+    uma renovação por vez: o ML invalida o refresh_token usado, então duas threads renovando a
+    mesma conta derrubariam uma à outra.
+    """
+
+    def __init__(self, db_manager, accounts: Dict[str, dict] = None, refresh_fn: Callable = refresh_access_token,
+                 margin_seconds: float = 300):
+        self.db = db_manager
+        self.accounts = accounts if accounts is not None else {}
+        self.refresh_fn = refresh_fn
+        self.margin_seconds = margin_seconds
+        self._lock = threading.Lock()
+
+    def get_token(self, nickname: str) -> Optional[str]:
+        """Token válido da conta, renovando se preciso; None se a conta não existe ou a renovação falhou."""
+        with self._lock:
+            account = self.accounts.get(nickname)
+            if account is None:
+                self.accounts.update(self.db.load_all_ml_accounts() or {})
+                account = self.accounts.get(nickname)
+            if not account:
+                print(f"[MLTokens] Conta '{nickname}' não cadastrada.")
+                return None
+            if account.get("access_token") and float(account.get("expires_at") or 0) - self.margin_seconds > time.time():
+                return account["access_token"]
+            if not account.get("refresh_token"):
+                print(f"[MLTokens] Conta '{nickname}' sem refresh_token; é preciso autorizar de novo.")
+                return None
+            try:
+                data = self.refresh_fn(account["refresh_token"])
+            except Exception as e:
+                print(f"[MLTokens] Falha ao renovar o token da conta '{nickname}': {e}")
+                return None
+            account["access_token"] = data["access_token"]
+            account["refresh_token"] = data.get("refresh_token") or account["refresh_token"]
+            account["expires_at"] = int(time.time() + float(data.get("expires_in") or 21600))
+            self.db.save_ml_account(nickname, account)
+            print(f"[MLTokens] Token da conta '{nickname}' renovado.")
+            return account["access_token"]
@@ -0,0 +1,357 @@
+# services/pricing_engine.py
+from __future__ import annotations
+
+import operator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from core.text_utils import normalize_sku
+
+try:
+    import numpy as np
+    import pandas as pd
+except Exception:
+    np = None
+    pd = None
+
+
+@dataclass
+class PricingReport:
+    success: bool
+    message: str
+    priced: int = 0
+    fixed: int = 0
+    errors: int = 0
+    results: "pd.DataFrame" = None
+    logs: List[dict] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+
+# Valores de account_nickname/listing_type nas regras que valem para qualquer conta/tipo
+WILDCARDS = {"", "*", "todas", "todos", "all", "qualquer"}
+# Nomes de tipo de anúncio aceitos nas regras -> listing_type_id do ML
+LISTING_TYPE_ALIASES = {"classico": "gold_special", "clássico": "gold_special", "premium": "gold_pro"}
+COMPARISON_OPERATORS = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+    "=": operator.eq, "==": operator.eq, "!=": operator.ne,
+}
+# base_price_source -> campo extraído de tiny details["precos"] (ver PricingEngine.prices_from_details)
+BASE_PRICE_SOURCES = ("tiny_price", "tiny_cost")
+ITEM_COLUMNS = ["item_id", "account_nickname", "sku", "listing_type_id", "cost", "shipping_cost"]
+
+
+def _norm_text(value) -> str:
+    return str(value or "").strip().lower()
+
+
+def _norm_listing_type(value) -> str:
+    value = _norm_text(value)
+    return LISTING_TYPE_ALIASES.get(value, value)
+
+
+class RuleIndex:
+    """
+    pricing_rules compiladas para a busca por item: agrupadas por (conta, tipo de anúncio) e,
+    em cada grupo, por fonte de preço e operador, com os limites ordenados para bisect
+    (np.searchsorted). Cada regra guarda o rank (posição na ordem de precedência do PricingEngine);
+    entre as candidatas dos grupos (conta+tipo, conta, tipo, curinga) vence o menor rank.
+    """
+
+    def __init__(self, rules: List[dict]):
+        self.size = len(rules)  # rank "sem regra"
+        grouped = {}
+        for rank, rule in enumerate(rules):
+            op = "==" if rule["comparison_operator"] == "=" else rule["comparison_operator"]
+            buckets = grouped.setdefault((rule["_account"], rule["_listing"]), {})
+            buckets.setdefault((rule["base_price_source"], op), []).append((rule["_threshold"], rank))
+        self._groups = {
+            key: [self._compile(source, op, entries) for (source, op), entries in buckets.items()]
+            for key, buckets in grouped.items()
+        }
+
+    @staticmethod
+    def _compile(source, op, entries):
+        if op in (">", ">="):
+            entries.sort(key=lambda e: (e[0], -e[1]))  # entre limites iguais o menor rank fica por último
+        elif op == "!=":
+            entries.sort(key=lambda e: e[1])
+        else:
+            entries.sort()
+        return (source, op, np.array([e[0] for e in entries], dtype=float),
+                np.array([e[1] for e in entries], dtype=np.int64))
+
+    def _bucket_ranks(self, op, thresholds, ranks, base):
+        """Menor rank do bucket que casa com cada base (self.size onde nenhuma casa)."""
+        none, last = self.size, len(thresholds) - 1
+        if op in (">", ">="):
+            pos = np.searchsorted(thresholds, base, side="right" if op == ">=" else "left") - 1
+            return np.where(pos >= 0, ranks[np.maximum(pos, 0)], none)
+        if op in ("<", "<="):
+            pos = np.searchsorted(thresholds, base, side="left" if op == "<=" else "right")
+            return np.where(pos <= last, ranks[np.minimum(pos, last)], none)
+        if op == "==":
+            pos = np.minimum(np.searchsorted(thresholds, base, side="left"), last)
+            return np.where(thresholds[pos] == base, ranks[pos], none)
+        out = np.full(len(base), none, dtype=np.int64)  # "!=": a primeira (por rank) com limite diferente
+        pending = np.ones(len(base), dtype=bool)
+        for threshold, rank in zip(thresholds, ranks):
+            hit = pending & (base != threshold)
+            out[hit] = rank
+            pending &= ~hit
+            if not pending.any():
+                break
+        return out
+
+    def lookup(self, bases: Dict[str, "np.ndarray"], accounts, listings) -> "np.ndarray":
+        """Rank da regra escolhida para cada item (self.size = nenhuma regra casa)."""
+        best = np.full(len(accounts), self.size, dtype=np.int64)
+        if not self._groups or not len(accounts):
+            return best
+        pairs = pd.DataFrame({"account": accounts, "listing": listings})
+        for (account, listing), rows in pairs.groupby(["account", "listing"], sort=False, dropna=False).indices.items():
+            for key in dict.fromkeys(((account, listing), (account, None), (None, listing), (None, None))):
+                for source, op, thresholds, ranks in self._groups.get(key, ()):
+                    base = bases[source][rows]
+                    candidate = np.where(base > 0, self._bucket_ranks(op, thresholds, ranks, base), self.size)
+                    best[rows] = np.minimum(best[rows], candidate)
+        return best
+
+
+class PricingEngine:
+    """
+    Recalcula preços de muitos anúncios numa passada, sobre as regras de pricing_rules.
+
+    load() lê pricing_rules e fixed_prices uma vez; price_items() recebe os itens do lote
+    (item_id, account_nickname, sku, listing_type_id e, opcionais, cost/shipping_cost), busca em
+    paralelo os preços do Tiny que faltam no cache e escolhe a regra de cada item pelo RuleIndex
+    (bisect sobre os limites do grupo conta/tipo de anúncio), com o cálculo em arrays NumPy.
+    O índice é recompilado só quando DatabaseManager.get_pricing_version() muda (save/delete de
+    regra ou preço fixo), então o caminho quente não consulta o SQLite.
+
+    Ordem das regras (a primeira que casar vence): conta específica antes de curinga, tipo de
+    anúncio específico antes de curinga e, entre faixas, a mais apertada primeiro (maior limite
+    para ">"/">=", menor para "<"/"<=").
+
+    Preço final = ((base * (1 + markup%) + valor fixo + frete?) * (1 - desconto%)) - desconto fixo.
+    Preço fixo do SKU (fixed_prices) tem prioridade sobre qualquer regra.
+
+    details_fn(sku) -> dict de detalhes do produto no Tiny (com "precos") ou None; o resultado
+    fica em details_cache (o TTLCache App.tiny_product_details_cache, chaveado pelo SKU normalizado).
+    """
+
+    def __init__(self, db_manager, details_fn: Callable = None, details_cache=None, max_workers: int = 8):
+        self.db = db_manager
+        self.details_fn = details_fn
+        self.details_cache = details_cache if details_cache is not None else {}
+        self.max_workers = max(1, int(max_workers))
+        self.rules: List[dict] = []
+        self.fixed_prices: Dict[str, float] = {}
+        self.index: Optional[RuleIndex] = None
+        self.loaded = False
+        self._version = None
+        self.warnings: List[str] = []
+
+    # ------------------------------------------------------------------
+    def load(self) -> int:
+        """(Re)lê pricing_rules e fixed_prices. Retorna quantas regras válidas foram carregadas."""
+        version = self.db.get_pricing_version()
+        rules, warnings = [], []
+        for rule in self.db.get_all_pricing_rules():
+            op = str(rule.get("comparison_operator") or "").strip()
+            source = _norm_text(rule.get("base_price_source")) or "tiny_price"
+            if op not in COMPARISON_OPERATORS:
+                warnings.append(f"Regra '{rule.get('rule_name')}' ignorada: operador '{op}' desconhecido.")
+                continue
+            if source not in BASE_PRICE_SOURCES:
+                warnings.append(f"Regra '{rule.get('rule_name')}' ignorada: fonte de preço '{source}' desconhecida.")
+                continue
+            account, listing = _norm_text(rule.get("account_nickname")), _norm_listing_type(rule.get("listing_type"))
+            threshold = float(rule.get("price_threshold") or 0.0)
+            rules.append(dict(
+                rule,
+                comparison_operator=op, base_price_source=source,
+                _account=None if account in WILDCARDS else account,
+                _listing=None if listing in WILDCARDS else listing,
+                _threshold=threshold,
+            ))
+        rules.sort(key=lambda r: (
+            r["_account"] is None, r["_listing"] is None,
+            -r["_threshold"] if r["comparison_operator"] in (">", ">=") else r["_threshold"],
+            r.get("rule_id") or 0,
+        ))
+        self.rules = rules
+        self.index = RuleIndex(rules) if np is not None else None
+        self.fixed_prices = {normalize_sku(k): float(v) for k, v in self.db.get_all_fixed_prices().items()
+                             if normalize_sku(k) and v is not None}
+        self.warnings = warnings
+        self.loaded = True
+        self._version = version
+        for w in warnings:
+            print(f"[PricingEngine] {w}")
+        return len(rules)
+
+    def ensure_loaded(self) -> bool:
+        """Recarrega regras/preços fixos se mudaram desde o último load(). Retorna True se recarregou."""
+        if self.loaded and self._version == self.db.get_pricing_version():
+            return False
+        self.load()
+        return True
+
+    @staticmethod
+    def prices_from_details(details) -> dict:
+        """{tiny_price, tiny_cost} a partir dos detalhes v3 (tiny_price = promocional, senão preço de venda)."""
+        precos = (details or {}).get("precos") or {}
+        promo = float(precos.get("precoPromocional", 0.0) or 0.0)
+        return {"tiny_price": promo or float(precos.get("preco", 0.0) or 0.0),
+                "tiny_cost": float(precos.get("precoCusto", 0.0) or 0.0)}
+
+    def fetch_prices(self, skus: Iterable[str]) -> Dict[str, dict]:
+        """{sku_key: {tiny_price, tiny_cost}}; SKUs fora do cache são buscados em paralelo (details_fn)."""
+        wanted = {}
+        for sku in skus:
+            key = normalize_sku(sku)
+            if key and key not in wanted:
+                wanted[key] = sku
+        result, missing = {}, []
+        for key in wanted:
+            details = self.details_cache.get(key)
+            if details:
+                result[key] = self.prices_from_details(details)
+            else:
+                missing.append(key)
+        if missing and self.details_fn is not None:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing)),
+                                    thread_name_prefix="pricing-fetch") as executor:
+                fetched = list(executor.map(self._fetch_details, [wanted[k] for k in missing]))
+            for key, details in zip(missing, fetched):
+                if details:
+                    self.details_cache[key] = details
+                    result[key] = self.prices_from_details(details)
+        return result
+
+    def _fetch_details(self, sku):
+        try:
+            return self.details_fn(sku)
+        except Exception as e:
+            print(f"[PricingEngine] Falha ao buscar detalhes do Tiny para SKU '{sku}': {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    def price_items(self, items: Iterable[dict]) -> PricingReport:
+        """Calcula o preço final de cada item. results tem uma linha por item (na ordem recebida)."""
+        if pd is None:
+            return PricingReport(False, "Pandas não está instalado.")
+        self.ensure_loaded()
+        frame = pd.DataFrame(list(items), columns=ITEM_COLUMNS)
+        n = len(frame)
+        if not n:
+            return PricingReport(True, "Nenhum item para precificar.", results=frame, warnings=list(self.warnings))
+
+        sku_keys = [normalize_sku(s) for s in frame["sku"]]
+        needs_prices = [s for s, cost in zip(frame["sku"], frame["cost"]) if pd.isna(cost)]
+        prices = self.fetch_prices(needs_prices) if needs_prices else {}
+        keys = pd.Series(sku_keys, dtype=object)
+
+        # Custo informado pelo chamador (ex.: recálculo unitário) vale para as duas fontes
+        given = pd.to_numeric(frame["cost"], errors="coerce")
+        bases = {}
+        for source in BASE_PRICE_SOURCES:
+            looked_up = keys.map(lambda k, s=source: (prices.get(k) or {}).get(s)).astype(float)
+            bases[source] = given.fillna(looked_up).fillna(0.0).to_numpy(dtype=float)
+        shipping = pd.to_numeric(frame["shipping_cost"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+        accounts = frame["account_nickname"].map(_norm_text).to_numpy(dtype=object)
+        listings = frame["listing_type_id"].map(_norm_listing_type).to_numpy(dtype=object)
+        fixed = keys.map(self.fixed_prices).astype(float).to_numpy()
+
+        chosen = self.index.lookup(bases, accounts, listings)
+        chosen[chosen >= len(self.rules)] = -1
+        has_rule = chosen >= 0
+        safe = np.where(has_rule, chosen, 0)
+
+        def rule_array(column, default=0.0):
+            values = np.array([float(r.get(column) or default) for r in self.rules] or [default], dtype=float)
+            return values[safe]
+
+        source_idx = np.array([BASE_PRICE_SOURCES.index(r["base_price_source"]) for r in self.rules] or [0])[safe]
+        base = np.choose(source_idx, [bases[s] for s in BASE_PRICE_SOURCES])
+        markup, add = rule_array("percentage_markup"), rule_array("fixed_value_add")
+        pct_discount, fixed_discount = rule_array("percentage_discount"), rule_array("fixed_value_discount")
+        with_shipping = rule_array("include_shipping_cost") > 0
+        final = ((base * (1 + markup / 100.0) + add + np.where(with_shipping, shipping, 0.0))
+                 * (1 - pct_discount / 100.0) - fixed_discount)
+        final = np.round(np.where(has_rule, final, np.nan), 2)
+
+        is_fixed = ~np.isnan(fixed)
+        any_base = (bases["tiny_price"] > 0) | (bases["tiny_cost"] > 0)
+        error = np.full(n, None, dtype=object)
+        error[~is_fixed & ~any_base] = "Custo do produto não encontrado no Tiny."
+        error[~is_fixed & any_base & ~has_rule] = "Nenhuma regra de precificação aplicável."
+        error[~is_fixed & has_rule & ~(final > 0)] = "Preço calculado inválido (<= 0)."
+        final = np.where(is_fixed, fixed, final)
+        final = np.where(pd.isna(error), final, np.nan)
+
+        rule_ids = [self.rules[i].get("rule_id") if i >= 0 else None for i in chosen]
+        rule_names = [self.rules[i].get("rule_name") if i >= 0 else None for i in chosen]
+        details = [
+            self._details(row_fixed, row_base, row_rule, row_shipping, row_final, row_error)
+            for row_fixed, row_base, row_rule, row_shipping, row_final, row_error
+            in zip(fixed, base, chosen, shipping, final, error)
+        ]
+        results = pd.DataFrame({
+            "item_id": frame["item_id"], "account_nickname": frame["account_nickname"], "sku_key": sku_keys,
+            "base_price": np.where(has_rule, base, np.nan), "rule_id": rule_ids, "rule_name": rule_names,
+            "fixed_price": fixed, "final_price": final, "error": error, "calculation_details": details,
+        })
+
+        logs = [
+            {"account": acc, "item_id": item_id,
+             "final_status_summary": "OK" if err is None else f"ERRO: {err}",
+             "calculation_details": det}
+            for acc, item_id, err, det, was_fixed
+            in zip(results["account_nickname"], results["item_id"], error, details, is_fixed)
+            if not was_fixed
+        ]
+        n_errors = int(pd.notna(error).sum())
+        n_fixed = int(is_fixed.sum())
+        return PricingReport(
+            True, f"{n - n_errors} de {n} preço(s) calculado(s) ({n_fixed} fixo(s)).",
+            priced=n - n_errors - n_fixed, fixed=n_fixed, errors=n_errors,
+            results=results, logs=logs, warnings=list(self.warnings),
+        )
+
+    def _details(self, fixed, base, rule_idx, shipping, final, error) -> List[str]:
+        if not np.isnan(fixed):
+            return [f"Preço fixo do SKU: R$ {fixed:.2f}"]
+        if rule_idx < 0:
+            return [error] if error else []
+        rule = self.rules[rule_idx]
+        lines = [
+            f"Regra: {rule.get('rule_name')} ({rule['comparison_operator']} {rule['_threshold']:.2f})",
+            f"Base ({rule['base_price_source']}): R$ {base:.2f}",
+            f"Markup: {float(rule.get('percentage_markup') or 0):.2f}% + R$ {float(rule.get('fixed_value_add') or 0):.2f}",
+        ]
+        if rule.get("include_shipping_cost"):
+            lines.append(f"Frete incluído: R$ {shipping:.2f}")
+        if rule.get("percentage_discount") or rule.get("fixed_value_discount"):
+            lines.append(f"Desconto: {float(rule.get('percentage_discount') or 0):.2f}% + R$ {float(rule.get('fixed_value_discount') or 0):.2f}")
+        lines.append(f"ERRO: {error}" if error else f"Preço final: R$ {final:.2f}")
+        return lines
+
+    def price_one(self, account_nickname, sku, listing_type_id=None, cost=None, item_id=None,
+                  shipping_cost=None) -> dict:
+        """
+        Um item só (mesmo cálculo do lote): {final_price, error, calculation_details}.
+        cost, se informado, substitui as duas bases (tiny_price e tiny_cost); sem ele o motor busca
+        as duas nos detalhes do Tiny, como no lote.
+        """
+        report = self.price_items([{
+            "item_id": item_id, "account_nickname": account_nickname, "sku": sku,
+            "listing_type_id": listing_type_id, "cost": cost, "shipping_cost": shipping_cost,
+        }])
+        if not report.success:
+            return {"final_price": None, "error": report.message, "calculation_details": []}
+        row = report.results.iloc[0]
+        final = row["final_price"]
+        return {"final_price": None if pd.isna(final) else float(final), "error": row["error"],
+                "calculation_details": row["calculation_details"]}
@@ -0,0 +1,100 @@
+# services/queue_retention.py
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from core.database_manager import COMPLETED_TASK_STATUSES, FAILED_TASK_STATUSES
+
+
+@dataclass
+class QueueRetentionReport:
+    success: bool
+    message: str
+    archived: Dict[str, int] = field(default_factory=dict)
+    purged: Dict[str, int] = field(default_factory=dict)
+    warnings: List[str] = field(default_factory=list)
+
+
+class QueueRetentionService:
+    """
+    Retenção da fila unificada: de tempos em tempos move as tarefas finalizadas de
+    unified_task_queue para task_history (DatabaseManager.archive_finished_tasks) e expurga o
+    histórico antigo (purge_task_history). A fila quente fica só com o que ainda está em jogo,
+    então claim_tasks, get_task_count_by_type e a janela de get_all_price_check_statuses não
+    crescem com o histórico.
+
+    Prazos por task_type vêm do app_config (com o valor geral como padrão):
+        queue_archive_after_seconds_<task_type>          DONE/SUPERSEDED (geral: queue_archive_after_seconds, 3600)
+        queue_archive_failed_after_seconds_<task_type>   ERROR/DEAD (geral: queue_archive_failed_after_seconds, 7 dias)
+        task_history_retention_days_<task_type>          (geral: task_history_retention_days, 30)
+    Retenção <= 0 mantém o histórico desse tipo para sempre.
+    """
+
+    DEFAULT_ARCHIVE_AFTER_SECONDS = 3600
+    DEFAULT_ARCHIVE_FAILED_AFTER_SECONDS = 7 * 86400
+    DEFAULT_RETENTION_DAYS = 30
+
+    def __init__(self, db_manager, interval_seconds: float = 900, batch_size: int = 500):
+        self.db = db_manager
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _setting(self, name: str, task_type: str, default: float) -> float:
+        general = self.db.get_app_config_value(name, default)
+        value = self.db.get_app_config_value(f"{name}_{task_type.lower()}", general)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return float(default)
+
+    def run_once(self) -> QueueRetentionReport:
+        """Uma passada completa (arquivar + expurgar) sobre todos os task_types."""
+        report = QueueRetentionReport(True, "")
+        try:
+            for task_type in self.db.get_archivable_task_types():
+                after = self._setting("queue_archive_after_seconds", task_type, self.DEFAULT_ARCHIVE_AFTER_SECONDS)
+                failed_after = self._setting("queue_archive_failed_after_seconds", task_type,
+                                             self.DEFAULT_ARCHIVE_FAILED_AFTER_SECONDS)
+                moved = self.db.archive_finished_tasks(task_type, older_than_seconds=max(after, 0),
+                                                       batch_size=self.batch_size, statuses=COMPLETED_TASK_STATUSES)
+                moved += self.db.archive_finished_tasks(task_type, older_than_seconds=max(failed_after, 0),
+                                                        batch_size=self.batch_size, statuses=FAILED_TASK_STATUSES)
+                if moved:
+                    report.archived[task_type] = moved
+            for task_type in self.db.get_task_history_types():
+                days = self._setting("task_history_retention_days", task_type, self.DEFAULT_RETENTION_DAYS)
+                if days <= 0:
+                    continue
+                purged = self.db.purge_task_history(task_type, older_than_days=days)
+                if purged:
+                    report.purged[task_type] = purged
+        except Exception as e:
+            report.success = False
+            report.warnings.append(str(e))
+            print(f"[QueueRetention] Falha na passada de retenção: {e}")
+        report.message = (f"{sum(report.archived.values())} tarefa(s) arquivada(s), "
+                          f"{sum(report.purged.values())} expurgada(s) do histórico.")
+        return report
+
+    # ------------------------------------------------------------------
+    def start(self):
+        """Roda run_once a cada interval_seconds numa thread daemon. Idempotente."""
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="QueueRetention")
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _loop(self):
+        while True:
+            self.run_once()
+            if self._stop_event.wait(self.interval_seconds):
+                break
@@ -0,0 +1,172 @@
+# services/stock_snapshot.py
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from core.text_utils import normalize_sku
+from core.ttl_cache import TTLCache
+from services.tiny_id_resolver import TinyIdResolver
+
+_AMBIGUOUS = object()  # pai com várias variações: estoque ambíguo (mesma regra de App._get_tiny_available_stock_v3)
+_KEY_LOCK_STRIPES = 64  # locks fixos por hash do SKU: memória constante, qualquer que seja o catálogo
+
+
+class StockSnapshotService:
+    """
+    Foto do estoque do Tiny por SKU, servida da memória para os workers (BULK_EDIT com
+    from_tiny_qty e o orquestrador _dispatch_ml_updates).
+
+    Antes cada item fazia 3 chamadas em sequência (/produtos?codigo=, /produtos/{id}?incluir=variacoes
+    e /estoque/{id}), repetidas para cada conta que anuncia o mesmo SKU. Aqui:
+      - o id do Tiny e o pai/variação vêm de tiny_products (id_produto, id_pai) numa consulta por lote
+        (prefetch); em falta, do TinyIdResolver (que só vai à API se o SKU não estiver no catálogo);
+      - a resolução pai -> variação de estoque fica em cache pela sessão;
+      - o saldo lido (/estoque/{id}) vale por max_age_seconds para todas as contas/tarefas;
+      - no modo saldo físico (sum_reserves=True) o estoque de tiny_products serve direto se ele foi
+        gravado há menos de max_age_seconds (stock_atualizado_em: importação da planilha recente).
+
+    O Tiny v3 não tem consulta de estoque em lote, então um SKU frio ainda custa uma chamada
+    /estoque; o ganho vem de não repetir id/variação e de reaproveitar o saldo entre tarefas.
+    """
+
+    def __init__(self, db_manager, request_fn: Callable, deposito_id_fn: Callable = None,
+                 legacy_stock_fn: Callable = None, max_age_seconds: float = 300, id_resolver: TinyIdResolver = None,
+                 max_skus: int = 50000, catalog_ttl_seconds: float = 600):
+        self.db = db_manager
+        self.request_fn = request_fn                # assinatura de App._tiny_api_v3_request
+        self.deposito_id_fn = deposito_id_fn        # () -> id do depósito padrão (int/str) ou None
+        self.legacy_stock_fn = legacy_stock_fn      # (tiny_id, sum_reserves) -> float | None, sem depósito configurado
+        self.max_age_seconds = max_age_seconds
+        self.id_resolver = id_resolver or TinyIdResolver(db_manager, request_fn)
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(_KEY_LOCK_STRIPES)]  # um fetch por SKU mesmo com várias threads do pool
+        self._stock = TTLCache(max_skus, max_age_seconds, name="tiny_stock")        # sku_key -> (saldo, disponivel, tiny_id)
+        # sku_key -> linha de tiny_products (prefetch); relida após catalog_ttl_seconds para enxergar
+        # importações feitas por outro processo (as deste processo limpam via on_tiny_products_changed)
+        self._catalog = TTLCache(max_skus, catalog_ttl_seconds, name="tiny_stock_catalog")
+        self._targets = TTLCache(max_skus, 6 * 3600, name="tiny_stock_targets")    # tiny id -> id com o estoque | _AMBIGUOUS
+        self.catalog_hits = 0
+        self.api_calls = 0
+
+    # ------------------------------------------------------------------
+    def prefetch(self, skus: Iterable[str]) -> int:
+        """Carrega de tiny_products, numa consulta, o id/pai/estoque dos SKUs do lote. Retorna quantos achou."""
+        keys = {normalize_sku(s) for s in skus if s}
+        keys.discard(None)
+        keys = [k for k in keys if k not in self._catalog]
+        if not keys:
+            return 0
+        rows = self.db.get_tiny_stock_snapshot(keys)
+        now = time.monotonic()
+        for key in keys:
+            row = rows.get(key) or {}  # {} = SKU fora do catálogo local (evita reconsultar o banco)
+            age = row.get("age_seconds")
+            row["fresh_until"] = now + self.max_age_seconds - age if age is not None else 0.0
+            self._catalog.set(key, row)
+        return len(rows)
+
+    def get_available_stock(self, sku: str, sum_reserves: bool = False) -> Optional[float]:
+        """Saldo físico (sum_reserves=True) ou disponível do SKU; None se não encontrado/ambíguo/erro."""
+        key = normalize_sku(sku)
+        if not key:
+            return None
+        with self._key_locks[hash(key) % _KEY_LOCK_STRIPES]:
+            entry = self._stock.get(key)
+            if entry:
+                return entry[0] if sum_reserves else entry[1]
+            row = self._catalog.get(key)
+            if row is None:
+                self.prefetch([key])
+                row = self._catalog.get(key) or {}
+            if sum_reserves and row.get("stock") is not None and time.monotonic() < row["fresh_until"]:
+                self.catalog_hits += 1
+                return float(row["stock"])
+
+            tiny_id = str(row["id_produto"]) if row.get("id_produto") else self.id_resolver.resolve(sku)
+            if not tiny_id:
+                return None
+            deposito_id = self._deposito_id()
+            if deposito_id is None:
+                return self.legacy_stock_fn(tiny_id, sum_reserves) if self.legacy_stock_fn else None
+            target = self._stock_target(tiny_id, row)
+            if target is None:
+                return None
+            saldo, disponivel = self._fetch_stock(target, deposito_id)
+            if saldo is None and disponivel is None:
+                return None
+            self._stock.set(key, (saldo, disponivel, tiny_id))
+            return saldo if sum_reserves else disponivel
+
+    def invalidate(self, sku: str = None):
+        """Descarta o saldo de um SKU (ou de todos); variações continuam em cache."""
+        if sku is None:
+            self._stock.clear()
+        else:
+            self._stock.pop(normalize_sku(sku), None)
+        if sku is None:
+            self._catalog.clear()
+        else:
+            self._catalog.pop(normalize_sku(sku), None)
+
+    def on_tiny_products_changed(self, rows=None):
+        """Listener do DatabaseManager: linhas de tiny_products mudaram, descarta o que foi lido delas."""
+        if rows is None:
+            self._catalog.clear()
+        else:
+            for sku, _id_produto, _id_pai in rows:
+                self._catalog.pop(normalize_sku(sku), None)
+
+    def stats(self) -> Dict[str, int]:
+        stock = self._stock.stats()
+        with self._lock:
+            return {"skus": stock["size"], "hits": stock["hits"], "catalog_hits": self.catalog_hits,
+                    "api_calls": self.api_calls}
+
+    # ------------------------------------------------------------------
+    def _request(self, endpoint, params=None):
+        with self._lock:
+            self.api_calls += 1
+        return self.request_fn("GET", endpoint, params=params)
+
+    def _deposito_id(self):
+        value = self.deposito_id_fn() if self.deposito_id_fn else None
+        value = str(value or "").strip()
+        return int(value) if value.isdigit() else None
+
+    def _stock_target(self, tiny_id, row):
+        """Id que carrega o estoque: a variação única de um pai, o próprio produto, ou None se ambíguo."""
+        if row.get("id_pai"):
+            return tiny_id  # já é uma variação
+        target = self._targets.get(tiny_id)
+        if target is None:
+            details = self._request(f"/produtos/{tiny_id}", params={"incluir": "variacoes"})
+            if not isinstance(details, dict) or not details.get("id"):
+                return None
+            variations = details.get("variacoes") or []
+            if isinstance(variations, list) and len(variations) > 1:
+                target = _AMBIGUOUS
+            elif isinstance(variations, list) and len(variations) == 1:
+                target = str(variations[0].get("id"))
+            else:
+                target = tiny_id
+            self._targets.set(tiny_id, target)
+        if target is _AMBIGUOUS:
+            print(f"[StockSnapshot] Produto {tiny_id}: pai com várias variações. Estoque ambíguo.")
+            return None
+        return target
+
+    def _fetch_stock(self, target_id, deposito_id):
+        resp = self._request(f"/estoque/{target_id}")
+        depositos = resp.get("depositos") if isinstance(resp, dict) else None
+        if not isinstance(depositos, list):
+            print(f"[StockSnapshot] Resposta de estoque inválida para o ID {target_id}.")
+            return None, None
+        deposito = next((d for d in depositos if d.get("id") == deposito_id), None)
+        if not deposito:
+            print(f"[StockSnapshot] Depósito {deposito_id} não encontrado no estoque do ID {target_id}.")
+            return None, None
+        saldo, disponivel = deposito.get("saldo"), deposito.get("disponivel")
+        return (float(saldo) if isinstance(saldo, (int, float)) else None,
+                float(disponivel) if isinstance(disponivel, (int, float)) else None)
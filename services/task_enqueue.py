@@ -14,13 +14,14 @@ class EnqueueItem:
     item_id: Optional[str] = None
     payload: Optional[Dict[str, Any]] = None
     delay_minutes: int = 0
+    priority: int = 0
 
 
 class TaskEnqueueService:
     """
     Serviço genérico para enfileirar tarefas na unified_task_queue.
-    Usa db_manager.add_task_to_queue(task_type, account_nickname, item_id, payload, delay_minutes)
-    que você já tem implementado.
+    Usa db_manager.add_tasks_to_queue_bulk (executemany em transações por bloco) quando
+    disponível; senão, cai em db_manager.add_task_to_queue item a item.
     """
 
     def __init__(self, db_manager):
@@ -37,6 +38,9 @@ class TaskEnqueueService:
         if not items:
             return 0
 
+        if hasattr(self.db, "add_tasks_to_queue_bulk"):
+            return len(self.enqueue_many(task_type, items))
+
         ok = 0
         for it in items:
             payload = it.payload or {}
@@ -47,11 +51,31 @@ class TaskEnqueueService:
                 item_id=it.item_id,
                 payload=payload,
                 delay_minutes=it.delay_minutes,
+                priority=it.priority,
             )
             if success:
                 ok += 1
         return ok
 
+    def enqueue_many(self, task_type: str, items: List[EnqueueItem], chunk_size: int = 1000) -> List[int]:
+        """
+        Enfileira em lote (uma transação por bloco de chunk_size itens).
+        Retorna os task_ids inseridos. Ideal para milhares de itens (ex.: após importar a Curva ABC).
+        """
+        if not items:
+            return []
+        rows = (
+            {
+                "account_nickname": it.account_nickname,
+                "item_id": it.item_id,
+                "payload": it.payload,
+                "delay_minutes": it.delay_minutes,
+                "priority": it.priority,
+            }
+            for it in items
+        )
+        return self.db.add_tasks_to_queue_bulk(task_type, rows, chunk_size=chunk_size)
+
     # -------------------------
     # ATALHOS COMUNS (opcionais)
     # -------------------------
@@ -5,19 +5,27 @@ class TaskQueueService:
     def __init__(self, db):
         self.db = db
 
-    def add_task(self, task_type, account_nickname, item_id=None, payload=None, delay_minutes=0):
+    def add_task(self, task_type, account_nickname, item_id=None, payload=None, delay_minutes=0, priority=0):
         payload_json = json.dumps(payload, ensure_ascii=False) if payload else '{}'
         scheduled_time = datetime.now() + timedelta(minutes=delay_minutes)
 
         query = """
             INSERT INTO unified_task_queue (
-                task_type, account_nickname, item_id, payload_json, scheduled_for
-            ) VALUES (?, ?, ?, ?, ?)
+                task_type, account_nickname, item_id, payload_json, scheduled_for, priority
+            ) VALUES (?, ?, ?, ?, ?, ?)
         """
-        params = (task_type, account_nickname, item_id, payload_json, scheduled_time)
-        return self.db._execute_query(query, params, commit=True)
+        params = (task_type, account_nickname, item_id, payload_json, scheduled_time, priority)
+        cursor = self.db._execute_query(query, params, commit=True)
+        notifier = getattr(self.db, "queue_notifier", None)
+        if notifier is not None:
+            notifier.notify(task_type)
+        return cursor
 
-    def get_pending_tasks(self, task_type=None, status='PENDING', limit=10):
+    def get_pending_tasks(self, task_type=None, status='PENDING', limit=10, only_due=True):
+        """
+        Tarefas na ordem de consumo (priority, scheduled_for).
+        Para PENDING, tarefas agendadas para o futuro são ignoradas (only_due=True).
+        """
         query = "SELECT * FROM unified_task_queue WHERE 1=1"
         params = []
 
@@ -27,15 +35,18 @@ class TaskQueueService:
         if status:
             query += " AND status = ?"
             params.append(status)
+        if only_due and status == 'PENDING':
+            query += " AND (scheduled_for IS NULL OR scheduled_for <= ?)"
+            params.append(datetime.now())
 
-        query += " ORDER BY added_timestamp ASC LIMIT ?"
+        query += " ORDER BY priority DESC, scheduled_for ASC, task_id ASC LIMIT ?"
         params.append(limit)
 
         rows = self.db._execute_query(query, tuple(params), fetch_all=True)
         return [dict(row) for row in rows] if rows else []
 
     def update_task_status(self, task_id, new_status, message=None, increment_retry=True):
-        set_clause = ["status = ?", "last_error_message = ?"]
+        set_clause = ["status = ?", "last_error_message = ?", "updated_timestamp = CURRENT_TIMESTAMP"]
         params = [new_status, message]
 
         if increment_retry:
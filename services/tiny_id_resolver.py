@@ -0,0 +1,105 @@
+# services/tiny_id_resolver.py
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from core.text_utils import normalize_sku
+
+
+class TinyIdResolver:
+    """
+    SKU -> id do produto no Tiny, sem ida à API quando tiny_products já sabe a resposta.
+
+    - load(): monta um dict {sku_key: (id_produto, id_pai)} a partir de tiny_products (uma consulta).
+    - Fica atualizado pelos avisos do DatabaseManager (add_tiny_products_listener): upserts
+      unitários/da API mandam só as linhas alteradas; importações de planilha pedem um reload.
+    - Em falta consulta GET /produtos?codigo= (request_fn = App._tiny_api_v3_request) e guarda
+      o resultado; SKU inexistente no Tiny fica em cache negativo por negative_ttl segundos.
+    """
+
+    def __init__(self, db_manager, request_fn: Callable = None, negative_ttl: float = 600):
+        self.db = db_manager
+        self.request_fn = request_fn
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._ids: Dict[str, tuple] = {}       # sku_key -> (id_produto str, id_pai str | None)
+        self._missing: Dict[str, float] = {}   # sku_key -> time.monotonic() em que o negativo expira
+        self.hits = 0
+        self.misses = 0
+        self.api_calls = 0
+
+    @staticmethod
+    def _entry(id_produto, id_pai):
+        return str(id_produto), (str(id_pai) if id_pai else None)
+
+    def load(self) -> int:
+        """(Re)carrega o índice inteiro de tiny_products. Retorna quantos SKUs têm id."""
+        rows = self.db.get_tiny_product_ids()
+        ids = {key: self._entry(id_produto, id_pai) for key, id_produto, id_pai in rows}
+        with self._lock:
+            self._ids = ids
+            self._missing = {k: exp for k, exp in self._missing.items() if k not in ids}
+        return len(ids)
+
+    def on_tiny_products_changed(self, rows=None):
+        """Listener do DatabaseManager: rows = [(sku, id_produto, id_pai), ...] ou None (recarregar tudo)."""
+        if rows is None:
+            self.load()
+            return
+        with self._lock:
+            for sku, id_produto, id_pai in rows:
+                key = normalize_sku(sku)
+                if not key:
+                    continue
+                if id_produto:
+                    previous = self._ids.get(key)
+                    if not id_pai and previous and previous[0] == str(id_produto):
+                        id_pai = previous[1]  # upserts da API não trazem o pai: mantém o conhecido
+                    self._ids[key] = self._entry(id_produto, id_pai)
+                    self._missing.pop(key, None)
+                else:
+                    self._ids.pop(key, None)
+
+    def resolve(self, sku: str) -> Optional[str]:
+        """Id do Tiny do SKU, ou None se não existir (ou a API falhar)."""
+        key = normalize_sku(sku)
+        if not key:
+            return None
+        with self._lock:
+            entry = self._ids.get(key)
+            if entry:
+                self.hits += 1
+                return entry[0]
+            expires = self._missing.get(key)
+            if expires is not None and time.monotonic() < expires:
+                self.hits += 1
+                return None
+            self.misses += 1
+        if self.request_fn is None:
+            return None
+
+        with self._lock:
+            self.api_calls += 1
+        resp = self.request_fn("GET", "/produtos", params={"codigo": str(sku).strip(), "limit": 1})
+        if not isinstance(resp, dict) or resp.get("error"):
+            return None  # falha de rede/API não vira cache negativo
+        item = (resp.get("itens") or [None])[0]
+        with self._lock:
+            if item and item.get("id"):
+                self._ids[key] = self._entry(item["id"], None)
+                return str(item["id"])
+            self._missing[key] = time.monotonic() + self.negative_ttl
+        return None
+
+    def parent_of(self, sku: str) -> Optional[str]:
+        """Id do produto pai (se o SKU for uma variação conhecida em tiny_products)."""
+        with self._lock:
+            entry = self._ids.get(normalize_sku(sku))
+        return entry[1] if entry else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"skus": len(self._ids), "negative": len(self._missing), "hits": self.hits,
+                    "misses": self.misses, "api_calls": self.api_calls}
@@ -0,0 +1,133 @@
+# services/tiny_sync.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+
+@dataclass
+class TinySyncReport:
+    success: bool
+    message: str
+    fetched: int = 0
+    inserted: int = 0
+    updated: int = 0
+    pages: int = 0
+    watermark: Optional[str] = None
+    warnings: List[str] = field(default_factory=list)
+
+
+class TinyCatalogSync:
+    """
+    Sincronização incremental do catálogo (tiny_products) pela API v3 do Tiny.
+
+    Pagina GET /produtos?dataAlteracao=<marca d'água> (só o que mudou desde a última execução),
+    grava em lotes com DatabaseManager.upsert_tiny_products_from_api e, no fim, salva a maior
+    dataAlteracao vista em app_config['tiny_sync_watermark']. Sem marca d'água (primeira vez ou
+    full=True) percorre o catálogo inteiro.
+
+    A API v2 (integrations.tiny_api.list_products) não filtra por data de alteração, por isso
+    a sincronização usa a v3. request_fn tem a assinatura de App._tiny_api_v3_request
+    (method, endpoint, params=...) e devolve o JSON ou None/{"error": ...}.
+
+    A consulta volta overlap_seconds antes da marca d'água: produtos alterados no mesmo segundo
+    (ou com relógio do servidor levemente atrasado) não se perdem; o upsert é idempotente.
+    A marca d'água só avança se todas as páginas foram gravadas. Falhas (resposta inválida ou
+    exceção da API/do banco) voltam no relatório com success=False; run() não levanta.
+    """
+
+    WATERMARK_KEY = "tiny_sync_watermark"
+    DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+    def __init__(self, db_manager, request_fn: Callable, page_size: int = 100,
+                 batch_size: int = 500, overlap_seconds: int = 120):
+        self.db = db_manager
+        self.request_fn = request_fn
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.overlap = timedelta(seconds=overlap_seconds)
+
+    @classmethod
+    def _parse_date(cls, value) -> Optional[datetime]:
+        if not value:
+            return None
+        text = str(value).strip()
+        for fmt in (cls.DATE_FORMAT, "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d", "%d/%m/%Y %H:%M:%S"):
+            try:
+                return datetime.strptime(text[:19], fmt)
+            except ValueError:
+                continue
+        return None
+
+    @staticmethod
+    def _to_row(item: dict) -> dict:
+        return {
+            "id_produto": item.get("id"),
+            "sku": item.get("sku") or item.get("codigo"),
+            "descricao": item.get("descricao"),
+            "status": "A" if str(item.get("situacao", "A")).upper() == "A" else "I",
+        }
+
+    def run(self, full: bool = False) -> TinySyncReport:
+        stored = None if full else self._parse_date(self.db.get_app_config_value(self.WATERMARK_KEY))
+        params = {"limit": self.page_size, "orderBy": "asc"}
+        if stored:
+            params["dataAlteracao"] = (stored - self.overlap).strftime(self.DATE_FORMAT)
+
+        report = TinySyncReport(True, "")
+        try:
+            newest = self._sync_pages(params, stored, report)
+        except Exception as e:
+            report.success = False
+            report.message = f"Falha na sincronização do Tiny: {e}. Marca d'água mantida."
+        if report.success:
+            if newest is not None and newest != stored:
+                report.watermark = newest.strftime(self.DATE_FORMAT)
+                self.db.set_app_config_value(self.WATERMARK_KEY, report.watermark)
+            report.message = (f"Sincronização Tiny concluída: {report.fetched} alterados desde "
+                              f"{params.get('dataAlteracao', 'o início')}, {report.inserted} novos, {report.updated} atualizados.")
+        print(f"[TinyCatalogSync] {report.message}")
+        return report
+
+    def _sync_pages(self, params, stored, report: TinySyncReport):
+        """Pagina e grava; devolve a maior dataAlteracao vista (marca d'água candidata)."""
+        newest = stored
+        batch = []
+        offset = 0
+        while True:
+            resp = self.request_fn("GET", "/produtos", params=dict(params, offset=offset))
+            if not isinstance(resp, dict) or resp.get("error"):
+                detail = (resp.get("details") or resp.get("error")) if isinstance(resp, dict) else "sem resposta"
+                report.success = False
+                report.message = f"Falha ao listar produtos do Tiny (offset {offset}): {detail}. Marca d'água mantida."
+                break
+            items = resp.get("itens") or []
+            report.pages += 1
+            report.fetched += len(items)
+            for item in items:
+                row = self._to_row(item)
+                if not row["sku"]:
+                    report.warnings.append(f"Produto {item.get('id')} sem SKU ignorado.")
+                    continue
+                batch.append(row)
+                changed_at = self._parse_date(item.get("dataAlteracao"))
+                if changed_at and (newest is None or changed_at > newest):
+                    newest = changed_at
+            if len(batch) >= self.batch_size:
+                self._flush(batch, report)
+                batch = []
+
+            total = (resp.get("paginacao") or {}).get("total")
+            offset += len(items)
+            if len(items) < self.page_size or (total is not None and offset >= int(total)):
+                break
+
+        if batch:
+            self._flush(batch, report)
+        return newest
+
+    def _flush(self, batch, report: TinySyncReport):
+        updated, inserted = self.db.upsert_tiny_products_from_api(batch)
+        report.updated += updated
+        report.inserted += inserted
@@ -1,6 +1,6 @@
 import json
 from services.task_queue import TaskQueueService
-from integrations.mercadolivre_api import make_ml_api_request
+from integrations.mercadolivre_api import make_ml_api_request, get_items_multiget
 
 class AutoPromoWorker:
     def __init__(self, db):
@@ -8,6 +8,7 @@ class AutoPromoWorker:
 
     def run(self):
         tasks = self.queue.get_pending_tasks(task_type="auto_promo", limit=10)
+        prefetched = self._prefetch_items(tasks)
         for task in tasks:
             try:
                 payload = json.loads(task["payload_json"])
@@ -17,8 +18,10 @@ class AutoPromoWorker:
                 adjustment = float(payload.get("adjustment", -1.0))  # desconto automático de R$1 por padrão
 
                 # Obtem dados do anúncio atual
-                url = f"https://api.mercadolibre.com/items/{item_id}"
-                item_data = make_ml_api_request(url, access_token)
+                item_data = prefetched.get(item_id)
+                if not item_data or item_data.get("error"):
+                    url = f"https://api.mercadolibre.com/items/{item_id}"
+                    item_data = make_ml_api_request(url, access_token, account_nickname=task.get("account_nickname"))
 
                 current_price = float(item_data["price"])
                 new_price = max(1.0, competitor_price + adjustment)
@@ -26,7 +29,8 @@ class AutoPromoWorker:
                 if new_price < current_price:
                     # Aplica novo preço via API
                     update_url = f"https://api.mercadolibre.com/items/{item_id}"
-                    resp = make_ml_api_request(update_url, access_token, params={"price": new_price})
+                    resp = make_ml_api_request(update_url, access_token, params={"price": new_price},
+                                               account_nickname=task.get("account_nickname"))
 
                     print(f"[{item_id}] Preço alterado: de {current_price} → {new_price}")
                     self.queue.update_task_status(task["task_id"], "COMPLETED", message="Preço ajustado", increment_retry=False)
@@ -37,3 +41,20 @@ class AutoPromoWorker:
             except Exception as e:
                 print(f"Erro ao processar tarefa {task['task_id']}: {e}")
                 self.queue.update_task_status(task["task_id"], "FAILED", message=str(e))
+
+    def _prefetch_items(self, tasks):
+        """Lê os anúncios do lote via multiget (um /items?ids= por conta, 20 ids por chamada)."""
+        ids_by_account = {}
+        for task in tasks:
+            try:
+                payload = json.loads(task["payload_json"])
+                ids_by_account.setdefault((task.get("account_nickname"), payload["access_token"]), []).append(payload["item_id"])
+            except (KeyError, TypeError, json.JSONDecodeError):
+                continue
+        prefetched = {}
+        for (nickname, access_token), item_ids in ids_by_account.items():
+            try:
+                prefetched.update(get_items_multiget(item_ids, access_token, attributes="id,price", account_nickname=nickname))
+            except Exception as e:
+                print(f"Multiget falhou ({len(item_ids)} itens), buscando um a um: {e}")
+        return prefetched
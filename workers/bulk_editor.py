@@ -1,6 +1,8 @@
 import json
 from services.task_queue import TaskQueueService
 from integrations.mercadolivre_api import make_ml_api_request
+from core.rate_limiter import get_rate_limiter, resolve_account_key
+from core.http_session import get_session
 
 class BulkEditorWorker:
     def __init__(self, db):
@@ -18,8 +20,10 @@ class BulkEditorWorker:
                 update_url = f"https://api.mercadolibre.com/items/{item_id}"
                 headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
 
-                import requests
-                response = requests.put(update_url, headers=headers, json=updates)
+                response = get_rate_limiter().call(
+                    update_url, resolve_account_key(task.get("account_nickname"), access_token),
+                    lambda: get_session(update_url).put(update_url, headers=headers, json=updates)
+                )
                 response.raise_for_status()
 
                 print(f"[{item_id}] Atualizado com sucesso.")
@@ -1,9 +1,13 @@
 import json
 import threading
 import traceback
-import time
 from tkinter import messagebox
 
+from core.text_utils import normalize_sku
+from core.retry_policy import TaskError, status_code_from_text
+from workers.outcome_buffer import TaskOutcomeBuffer
+from workers.worker_pool import WorkerPool, make_worker_id
+
 
 class BulkWorker(threading.Thread):
     """
@@ -19,6 +23,14 @@ class BulkWorker(threading.Thread):
         self.db_manager = app.db_manager
         self._stop_event = threading.Event()
         self._is_running = False
+        self.worker_id = make_worker_id(self)
+        # N itens em paralelo (app_config worker_pool_size_bulk_edit); o ritmo por conta fica com o core.rate_limiter
+        self.pool = WorkerPool.from_config(self.db, "BULK_EDIT", default_size=4)
+        # resultados gravados em lote; o que deu certo sai da fila (delete), como antes
+        self.outcomes = TaskOutcomeBuffer.from_config(self.db, "BULK_EDIT", worker_id=self.worker_id, delete_completed=True)
+        # (conta, item_id) -> (preço final | None, erro) calculados pelo PricingEngine para o lote
+        self._precomputed_prices = {}
+        self._precomputed_lock = threading.Lock()
 
     # ============================
     # MÉTODOS DO SEU CÓDIGO REAL
@@ -38,56 +50,25 @@ class BulkWorker(threading.Thread):
 
         # 1) Preço fixo por SKU (se houver)
         sku_for_price = self._get_sku_from_item_data(original_item_data_from_ui)
-        fixed_price_for_sku = self.app.fixed_prices.get(sku_for_price.upper()) if sku_for_price else None
+        fixed_price_for_sku = self.app.fixed_prices.get(normalize_sku(sku_for_price)) if sku_for_price else None
 
         if fixed_price_for_sku is not None:
             print(f"    -> PREÇO FIXO ENCONTRADO para SKU '{sku_for_price}': R$ {fixed_price_for_sku:.2f}. Sobrescrevendo qualquer ação de preço.")
             actions["price"] = {"source": "manual", "value": float(fixed_price_for_sku)}
+        elif "price" in actions and actions["price"].get("source") == "recalculate_new":
+            with self._precomputed_lock:
+                precomputed = self._precomputed_prices.pop((account_nickname, item_id), None)
+            if precomputed is not None:
+                final_price, error = precomputed
+                if error:
+                    del actions["price"]
+                    print(f"    ERRO no recálculo de preço de {item_id} ({error}). Ação de preço removida.")
+                else:
+                    actions["price"] = {"source": "manual", "value": final_price}
 
-        # 2) Quantidade: busca no Tiny **da variação correta** (via consulta pelo código/SKU)
+        # 2) Quantidade: estoque do Tiny **da variação correta**, servido pela foto de estoque do App
         if "available_quantity" in actions and actions["available_quantity"].get("source") == "from_tiny_qty":
-            print(f"    Buscando estoque do Tiny para {item_id} antes da execução...")
-            sku_for_stock = self._get_sku_from_item_data(original_item_data_from_ui)
-
-            if sku_for_stock:
-                # <<<<<<<<<<<<<<<<<<<< INÍCIO DA CORREÇÃO PRINCIPAL >>>>>>>>>>>>>>>>>>>>
-                tiny_id_for_stock = None
-                params_find_id = {'codigo': sku_for_stock.strip(), 'limit': 1}
-                response_find_id = self.app._tiny_api_v3_request('GET', '/produtos', params=params_find_id)
-                if response_find_id and response_find_id.get("itens"):
-                    tiny_id_for_stock = str(response_find_id["itens"][0].get("id"))
-                # <<<<<<<<<<<<<<<<<<<<< FIM DA CORREÇÃO PRINCIPAL >>>>>>>>>>>>>>>>>>>>>>
-
-                if tiny_id_for_stock:
-                    # pode ser tk.BooleanVar ou bool; tratamos os dois casos
-                    sum_reserves_flag = False
-                    if hasattr(self.app, 'update_qty_sync_tiny_var'):
-                        var = self.app.update_qty_sync_tiny_var
-                        sum_reserves_flag = var.get() if hasattr(var, 'get') else bool(var)
-
-                    stock_from_tiny = self.app._get_tiny_available_stock_v3(
-                        tiny_id_for_stock,
-                        sum_reserves_if_true=sum_reserves_flag
-                    )
-
-                    if stock_from_tiny is not None:
-                        stock_to_send = int(stock_from_tiny)
-                        if stock_to_send < 0:
-                            print(f"    AVISO: Estoque do Tiny para SKU '{sku_for_stock}' (ID: {tiny_id_for_stock}) é negativo ({stock_to_send}). Ajustando para 0.")
-                            stock_to_send = 0
-                        
-                        # IMPORTANTÍSSIMO: coloca a qty como 'manual' já resolvida aqui
-                        actions["available_quantity"] = {"source": "manual", "value": stock_to_send}
-                        print(f"    Estoque Tiny (ID: {tiny_id_for_stock}) encontrado e ajustado: {stock_to_send}. Ação de quantidade atualizada para 'manual'.")
-                    else:
-                        print(f"    ERRO ao buscar estoque do Tiny para SKU '{sku_for_stock}' (ID: {tiny_id_for_stock}). Ação de quantidade removida.")
-                        del actions["available_quantity"]
-                else:
-                    print(f"    ERRO: SKU '{sku_for_stock}' não encontrado no Tiny. Ação de quantidade removida.")
-                    del actions["available_quantity"]
-            else:
-                print(f"    ERRO: SKU não encontrado no anúncio {item_id}. Ação de quantidade removida.")
-                del actions["available_quantity"]
+            self.app._resolve_tiny_qty_action(actions, self._get_sku_from_item_data(original_item_data_from_ui), item_id)
 
         # 3) Despacha para o orquestrador que MONTA o payload final e envia ao ML
         success, summary_list = self.app._dispatch_ml_updates(
@@ -112,36 +93,101 @@ class BulkWorker(threading.Thread):
 
             processed_in_this_batch = False
             while True:  # Loop interno para processar todas as tarefas pendentes
-                tasks = self.db_manager.get_tasks_from_queue(task_type='BULK_EDIT', status='PENDING', limit=10)
+                # Reivindica o lote de forma atômica (já marcado como PROCESSING, com lease)
+                tasks = self.db_manager.claim_tasks('BULK_EDIT', self.worker_id, limit=self.pool.batch_size)
                 if not tasks:
                     break  # Fila vazia, sai do loop interno
+                self.outcomes.hold(tasks)
                 
                 processed_in_this_batch = True
-                for task in tasks:
-                    task_id, item_id, nickname = task['task_id'], task['item_id'], task['account_nickname']
-                    self.db_manager.update_task_status(task_id, 'PROCESSING')
-                    try:
-                        payload = json.loads(task['payload_json'])
-                        actions = payload['actions_to_perform']
-                        original_data = payload['original_item_data']
-                        
-                        success, error_message = self._execute_bulk_item_actions(
-                            nickname, item_id, {"actions_to_perform": actions}, original_data
-                        )
-                        
-                        if success:
-                            self.db_manager.delete_tasks_from_queue([task_id])
-                            self.app.root.after(0, self.app._update_bulk_status_for_item, item_id, "OK", None)
-                        else:
-                            raise Exception(error_message)
-                    except Exception as e:
-                        self.db_manager.update_task_status(task_id, 'ERROR', str(e))
-                        self.app.root.after(0, self.app._update_bulk_status_for_item, item_id, f"ERRO: {str(e)[:30]}", None)
-                    time.sleep(0.5)
+                self._prefetch_stock(tasks)
+                self._precompute_prices(tasks)
+                self.pool.run_batch(tasks, self._handle_bulk_task)
+                self.outcomes.flush()
             
             if processed_in_this_batch:
                 self.app.root.after(0, self.app._finalize_bulk_edit_processing)
 
+    def _prefetch_stock(self, tasks):
+        """Carrega de uma vez (tiny_products) id/pai/estoque dos SKUs do lote que usam from_tiny_qty."""
+        skus = []
+        for task in tasks:
+            try:
+                payload = json.loads(task['payload_json'])
+                qty_action = payload['actions_to_perform'].get("available_quantity") or {}
+                if qty_action.get("source") == "from_tiny_qty":
+                    skus.append(self._get_sku_from_item_data(payload['original_item_data']))
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue  # payload inválido: o handler registra o erro na tarefa
+        if skus:
+            try:
+                self.app.stock_snapshot.prefetch(skus)
+            except Exception as e:
+                print(f"[BULK WORKER] Falha no prefetch de estoque (segue item a item): {e}")
+
+    def _precompute_prices(self, tasks):
+        """
+        Recalcula de uma vez (PricingEngine) o preço dos itens do lote com price=recalculate_new.
+        Os handlers só aplicam o resultado; quem ficar de fora cai no recálculo unitário do orquestrador.
+        """
+        items = []
+        for task in tasks:
+            try:
+                payload = json.loads(task['payload_json'])
+                price_action = payload['actions_to_perform'].get("price") or {}
+                if price_action.get("source") != "recalculate_new":
+                    continue
+                original = payload['original_item_data']
+                items.append({
+                    "item_id": task['item_id'], "account_nickname": task['account_nickname'],
+                    "sku": self._get_sku_from_item_data(original),
+                    "listing_type_id": original.get("listing_type_id"),
+                })
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue  # payload inválido: o handler registra o erro na tarefa
+        if not items:
+            return
+        try:
+            report = self.app.pricing_engine.price_items(items)  # recompila as regras só se mudaram
+        except Exception as e:
+            print(f"[BULK WORKER] Falha no recálculo de preços em lote (segue item a item): {e}")
+            return
+        if not report.success:
+            print(f"[BULK WORKER] Recálculo de preços em lote indisponível: {report.message}")
+            return
+        results = report.results
+        with self._precomputed_lock:
+            for account, item_id, final_price, error in zip(
+                results["account_nickname"], results["item_id"], results["final_price"], results["error"]
+            ):
+                self._precomputed_prices[(account, item_id)] = (None if error else float(final_price), error)
+        self.app.bulk_price_recalc_logs.extend(report.logs)
+        print(f"[BULK WORKER] Preços: {report.message}")
+
+    def _handle_bulk_task(self, task):
+        """Processa UM item da fila BULK_EDIT (executado pelas threads do WorkerPool)."""
+        task_id, item_id, nickname = task['task_id'], task['item_id'], task['account_nickname']
+        try:
+            payload = json.loads(task['payload_json'])
+            actions = payload['actions_to_perform']
+            original_data = payload['original_item_data']
+            
+            success, error_message = self._execute_bulk_item_actions(
+                nickname, item_id, {"actions_to_perform": actions}, original_data
+            )
+            
+            if success:
+                self.outcomes.complete(task_id)
+                self.app.root.after(0, self.app._update_bulk_status_for_item, item_id, "OK", None)
+            else:
+                # o orquestrador devolve só o resumo em texto: o status HTTP citado nele decide o retry
+                raise TaskError(error_message, status_code=status_code_from_text(error_message))
+        except Exception as e:
+            status = self.outcomes.fail(task, e)
+            label = "REAGENDADO" if status == "PENDING" else "ERRO"
+            self.app.root.after(0, self.app._update_bulk_status_for_item, item_id, f"{label}: {str(e)[:30]}", None)
+            return False  # o WorkerPool conta como erro
+
     def _get_sku_from_item_data(self, item_data_dict):
         """
         Extrai o SKU de um dicionário de dados do item, com logging detalhado.
@@ -231,5 +277,7 @@ class BulkWorker(threading.Thread):
             except Exception:
                 pass
         finally:
+            self.pool.shutdown()
+            self.outcomes.close()
             self._is_running = False
             print("[BulkWorker] Finalizado.")
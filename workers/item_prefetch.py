@@ -0,0 +1,37 @@
+from collections import defaultdict
+
+from integrations.mercadolivre_api import ItemBatcher
+
+# Campos lidos pelos workers de preço/estoque (projeção do multiget via attributes=)
+PRICE_CHECK_ITEM_ATTRIBUTES = "id,title,price,original_price,available_quantity,status,seller_custom_field,variations,attributes"
+STOCK_ITEM_ATTRIBUTES = "id,available_quantity,status,seller_custom_field,variations,attributes"
+
+
+def attach_item_data(app, tasks, attributes=None):
+    """
+    Agrupa as tarefas reivindicadas por conta e lê todos os anúncios do lote via multiget
+    (ItemBatcher.prefetch: /items?ids=, 20 por chamada) em vez de um GET por tarefa. O resultado
+    fica em task['_item_data'] (o body do item, ou {"error": ...}); tarefas de uma conta sem token
+    ficam sem a chave e o hook do worker faz a busca individual.
+    O token vem de app._get_current_ml_access_token_for_account (obrigatório).
+    Retorna quantas tarefas receberam dados.
+    """
+    get_token = app._get_current_ml_access_token_for_account
+
+    by_account = defaultdict(list)
+    for task in tasks:
+        if task.get("item_id") and task.get("account_nickname"):
+            by_account[task["account_nickname"]].append(task)
+
+    attached = 0
+    for nickname, group in by_account.items():
+        token = get_token(nickname)
+        if not token:
+            print(f"[Prefetch] Conta '{nickname}' sem token do ML: {len(group)} tarefa(s) sem leitura em lote.")
+            continue
+        batcher = ItemBatcher(token, account_nickname=nickname, attributes=attributes)
+        items = batcher.prefetch([t["item_id"] for t in group])
+        for task in group:
+            task["_item_data"] = items.get(task["item_id"])
+            attached += 1
+    return attached
@@ -0,0 +1,184 @@
+import threading
+import time
+
+from core.retry_policy import RetryPolicy
+
+
+class TaskOutcomeBuffer:
+    """
+    Junta os resultados das tarefas de um worker e grava em lote na fila
+    (DatabaseManager.complete_tasks / fail_tasks: um commit por flush, não um por tarefa).
+
+    Os handlers do WorkerPool chamam complete()/fail() de várias threads; o flush acontece
+    quando o buffer chega a max_items, quando o resultado mais antigo passa de max_delay
+    segundos (uma thread do buffer vigia o prazo, mesmo que nenhum resultado novo chegue), ou
+    quando o worker chama flush()/close() ao fim do lote. Enquanto não é gravada, a tarefa
+    segue PROCESSING com o lease do worker, então nada é reentregue a outro.
+
+    Com worker_id, o flush só grava nas tarefas que ainda são do worker: se o lease venceu e outro
+    worker reivindicou a tarefa, o resultado atrasado é descartado (e reportado) em vez de
+    sobrescrever o novo dono.
+
+    Lease: o worker entrega o lote reivindicado com hold(tasks) e a mesma thread renova o lease
+    (extend_task_leases) a cada lease_seconds/3 enquanto houver tarefa do lote sem resultado
+    gravado. Um lote lento (rate limiter, 429) não vence no meio e não é reentregue a outro
+    worker enquanto este ainda manda as alterações ao ML.
+
+    Falhas passam pela RetryPolicy do task_type: transitórias voltam para PENDING com backoff
+    (retry_tasks), esgotadas viram DEAD e fatais ERROR (fail_tasks).
+
+    Configuração (app_config): queue_outcome_flush_size e queue_outcome_flush_seconds.
+    """
+
+    def __init__(self, db, max_items: int = 50, max_delay: float = 2.0, delete_completed: bool = False,
+                 retry_policy: RetryPolicy = None, worker_id: str = None, lease_seconds: int = 300):
+        self.db = db
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds  # o mesmo passado a claim_tasks
+        self.max_items = max(1, int(max_items))
+        self.max_delay = max_delay
+        self.delete_completed = delete_completed  # BULK_EDIT remove da fila o que deu certo
+        self.retry_policy = retry_policy          # None: toda falha vira ERROR (sem reagendamento)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._completed = []
+        self._retries = []
+        self._failed = {}   # status final (ERROR/DEAD) -> [(task_id, mensagem)]
+        self._oldest = None
+        self._leased = set()        # task_ids do lote atual ainda sem resultado gravado
+        self._next_renewal = None   # time.monotonic() da próxima renovação do lease
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._timer_thread = None
+
+    @classmethod
+    def from_config(cls, db, task_type: str, worker_id: str = None, delete_completed: bool = False):
+        max_items, max_delay = 50, 2.0
+        get_config = getattr(db, "get_app_config_value", None)
+        if get_config:
+            try:
+                max_items = int(get_config("queue_outcome_flush_size", max_items) or max_items)
+                max_delay = float(get_config("queue_outcome_flush_seconds", max_delay) or max_delay)
+            except (TypeError, ValueError) as e:
+                print(f"[TaskOutcomeBuffer] Configuração inválida, usando padrão: {e}")
+        return cls(db, max_items=max_items, max_delay=max_delay, delete_completed=delete_completed,
+                   retry_policy=RetryPolicy.from_config(db, task_type), worker_id=worker_id)
+
+    def hold(self, tasks):
+        """
+        Lote recém-reivindicado (um por vez, como nos loops dos workers): o lease dessas tarefas é
+        renovado até o resultado delas ser gravado. Tarefas de um lote anterior que ficaram sem
+        resultado deixam de ser renovadas e voltam à fila quando o lease vencer.
+        """
+        ids = {t.get("task_id") for t in tasks}
+        ids.discard(None)
+        if not self.worker_id:
+            return
+        with self._lock:
+            self._leased = ids
+            self._next_renewal = time.monotonic() + self.lease_seconds / 3 if ids else None
+        if ids:
+            self._start_timer()
+            self._wakeup.set()
+
+    def complete(self, task_id, message=None):
+        with self._lock:
+            self._completed.append((task_id, message))
+        self._after_add()
+
+    def fail(self, task, error) -> str:
+        """
+        Registra a falha da tarefa (dict reivindicado, com task_id e retry_count) e devolve o
+        status decidido: 'PENDING' (reagendada), 'DEAD' ou 'ERROR'.
+        """
+        task_id = task.get("task_id")
+        if self.retry_policy is None:
+            status, when, message = "ERROR", None, str(error)
+        else:
+            status, when, message = self.retry_policy.decide(task.get("retry_count"), error)
+        with self._lock:
+            if status == "PENDING":
+                self._retries.append((task_id, message, when))
+            else:
+                self._failed.setdefault(status, []).append((task_id, message))
+        self._after_add()
+        return status
+
+    def _after_add(self):
+        with self._lock:
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                self._start_timer()
+                self._wakeup.set()
+            due = self._count() >= self.max_items or time.monotonic() - self._oldest >= self.max_delay
+        if due:
+            self.flush()
+
+    def _start_timer(self):
+        # uma thread por buffer (e não um Timer por flush): cada thread abre a sua conexão SQLite
+        if self._closed or (self._timer_thread is not None and self._timer_thread.is_alive()):
+            return
+        self._timer_thread = threading.Thread(target=self._timer_loop, daemon=True, name="OutcomeBufferFlush")
+        self._timer_thread.start()
+
+    def _timer_loop(self):
+        while not self._closed:
+            self._wakeup.clear()
+            with self._lock:
+                flush_at = self._oldest + self.max_delay if self._oldest is not None else None
+                renew_at = self._next_renewal if self._leased else None
+            deadlines = [d for d in (flush_at, renew_at) if d is not None]
+            if not deadlines:
+                self._wakeup.wait()
+                continue
+            remaining = min(deadlines) - time.monotonic()
+            if remaining > 0:
+                self._wakeup.wait(remaining)
+                continue
+            try:
+                if renew_at is not None and renew_at <= time.monotonic():
+                    self._renew_leases()
+                if flush_at is not None and flush_at <= time.monotonic():
+                    self.flush()
+            except Exception as e:
+                print(f"[TaskOutcomeBuffer] Falha no flush/renovação por tempo: {e}")
+
+    def _renew_leases(self) -> int:
+        with self._lock:
+            ids = sorted(self._leased)
+            self._next_renewal = time.monotonic() + self.lease_seconds / 3
+        if not ids:
+            return 0
+        return self.db.extend_task_leases(ids, self.worker_id, self.lease_seconds)
+
+    def close(self) -> int:
+        """Para a thread de flush/renovação e grava o que restou no buffer."""
+        self._closed = True
+        self._wakeup.set()
+        return self.flush()
+
+    def _count(self) -> int:
+        return len(self._completed) + len(self._retries) + sum(len(v) for v in self._failed.values())
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._count()
+
+    def flush(self) -> int:
+        """Grava tudo o que está no buffer. Retorna quantos resultados foram enviados ao banco."""
+        with self._flush_lock:  # mantém a ordem entre flushes concorrentes
+            with self._lock:
+                completed, self._completed = self._completed, []
+                retries, self._retries = self._retries, []
+                failed, self._failed = self._failed, {}
+                self._oldest = None
+                self._leased.difference_update(task_id for task_id, *_ in completed + retries)
+                for errors in failed.values():
+                    self._leased.difference_update(task_id for task_id, _ in errors)
+            if completed:
+                self.db.complete_tasks(completed, delete=self.delete_completed, worker_id=self.worker_id)
+            if retries:
+                self.db.retry_tasks(retries, worker_id=self.worker_id)
+            for status, errors in failed.items():
+                self.db.fail_tasks(errors, status=status, worker_id=self.worker_id)
+        return len(completed) + len(retries) + sum(len(v) for v in failed.values())
@@ -1,8 +1,11 @@
 import threading
-import time
 import json
 import traceback
 
+from workers.outcome_buffer import TaskOutcomeBuffer
+from workers.worker_pool import WorkerPool, make_worker_id
+from workers.item_prefetch import attach_item_data, PRICE_CHECK_ITEM_ATTRIBUTES
+
 
 class PriceCheckWorker(threading.Thread):
     """
@@ -17,6 +20,11 @@ class PriceCheckWorker(threading.Thread):
         self.db = app.db_manager
         self.db_manager = app.db_manager
         self._stop_event = threading.Event()
+        self.worker_id = make_worker_id(self)
+        # N tarefas em paralelo (app_config worker_pool_size_price_check); o ritmo por conta fica com o core.rate_limiter
+        self.pool = WorkerPool.from_config(self.db, "PRICE_CHECK", default_size=4)
+        # resultados gravados em lote (um commit por flush)
+        self.outcomes = TaskOutcomeBuffer.from_config(self.db, "PRICE_CHECK", worker_id=self.worker_id)
 
     def run(self):
         """Loop principal adaptado de _process_price_check_queue_worker."""
@@ -32,31 +40,38 @@ class PriceCheckWorker(threading.Thread):
                 self.app.price_check_worker_event.wait(timeout=60)
                 self.app.price_check_worker_event.clear()
 
-                tasks = self.db.get_tasks_from_queue(
-                    task_type="PRICE_CHECK", status="PENDING", limit=10
-                )
-                if not tasks:
-                    print("[PriceCheckWorker] Fila vazia.")
-                    continue
-
-                for task in tasks:
-                    try:
-                        task_id = task["task_id"]
-                        item_id = task["item_id"]
-                        account_nick = task["account_nickname"]
+                while not self._stop_event.is_set():
+                    # reivindica o lote de forma atômica (já marcado como PROCESSING)
+                    tasks = self.db.claim_tasks("PRICE_CHECK", self.worker_id, limit=self.pool.batch_size)
+                    if not tasks:
+                        break
+                    self.outcomes.hold(tasks)
 
-                        self.db.update_task_status(task_id, "PROCESSING", "Verificando...")
-                        self._process_single_price_check(task)  # <- cole a lógica real aqui
-                        self.db.update_task_status(task_id, "DONE", "Concluído.")
-                    except Exception as e:
-                        print(f"[PriceCheckWorker] Erro no item {task.get('item_id')}: {e}")
-                        traceback.print_exc()
-                        self.db.update_task_status(task.get("task_id"), "ERROR", str(e))
-                    time.sleep(0.5)
+                    # um multiget por conta para o lote todo (task['_item_data'])
+                    attach_item_data(self.app, tasks, PRICE_CHECK_ITEM_ATTRIBUTES)
+                    self.pool.run_batch(tasks, self._handle_task)
+                    self.outcomes.flush()
         finally:
+            self.pool.shutdown()
+            self.outcomes.close()
             self.app.is_price_check_worker_active = False
             print("[PriceCheckWorker] Finalizado.")
 
+    def _handle_task(self, task):
+        """Processa UMA tarefa reivindicada (executado pelas threads do WorkerPool)."""
+        try:
+            task_id = task["task_id"]
+            item_id = task["item_id"]
+            account_nick = task["account_nickname"]
+
+            self._process_single_price_check(task)  # <- cole a lógica real aqui
+            self.outcomes.complete(task_id, "Concluído.")
+        except Exception as e:
+            print(f"[PriceCheckWorker] Erro no item {task.get('item_id')}: {e}")
+            traceback.print_exc()
+            self.outcomes.fail(task, e)
+            return False  # o WorkerPool conta como erro
+
     def stop(self):
         """Solicita parada do loop."""
         self._stop_event.set()
@@ -66,5 +81,6 @@ class PriceCheckWorker(threading.Thread):
         Lógica individual de verificação — cole aqui o conteúdo do seu
         '_bulk_price_check_worker' (ou o trecho que calcula/verifica preço
         para um item) adaptado para receber 'task' como dict.
+        task['_item_data'] já traz o anúncio lido em lote (multiget), quando disponível.
         """
         pass
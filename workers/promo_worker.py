@@ -1,8 +1,10 @@
 import threading
-import time
 import json
 import traceback
 
+from workers.outcome_buffer import TaskOutcomeBuffer
+from workers.worker_pool import WorkerPool, make_worker_id
+
 
 class PromoWorker(threading.Thread):
     """
@@ -16,6 +18,11 @@ class PromoWorker(threading.Thread):
         self.db = app.db_manager
         self.db_manager = app.db_manager
         self._stop_event = threading.Event()
+        self.worker_id = make_worker_id(self)
+        # N tarefas em paralelo (app_config worker_pool_size_auto_promo); o ritmo por conta fica com o core.rate_limiter
+        self.pool = WorkerPool.from_config(self.db, "AUTO_PROMO", default_size=2)
+        # resultados gravados em lote (um commit por flush)
+        self.outcomes = TaskOutcomeBuffer.from_config(self.db, "AUTO_PROMO", worker_id=self.worker_id)
 
     def run(self):
         """Loop principal, adaptado de _process_auto_promo_queue_worker."""
@@ -31,32 +38,38 @@ class PromoWorker(threading.Thread):
                 self.app.auto_promo_worker_event.wait(timeout=30)
                 self.app.auto_promo_worker_event.clear()
 
-                tasks = self.db.get_tasks_from_queue(
-                    task_type="AUTO_PROMO", status="PENDING", limit=5
-                )
-                if not tasks:
-                    continue
-
-                for task in tasks:
-                    try:
-                        task_id = task["task_id"]
-                        item_id = task["item_id"]
-                        account_nick = task["account_nickname"]
-                        self.db.update_task_status(task_id, "PROCESSING", "Ativando promoção...")
+                while not self._stop_event.is_set():
+                    # reivindica o lote de forma atômica (já marcado como PROCESSING)
+                    tasks = self.db.claim_tasks("AUTO_PROMO", self.worker_id, limit=self.pool.batch_size)
+                    if not tasks:
+                        break
+                    self.outcomes.hold(tasks)
 
-                        # Aqui você vai colar o conteúdo real de _process_auto_promo_queue_worker()
-                        self._process_promo_task(task)
-
-                        self.db.update_task_status(task_id, "DONE", "Concluído.")
-                    except Exception as e:
-                        print(f"[PromoWorker] Erro no item {task.get('item_id')}: {e}")
-                        traceback.print_exc()
-                        self.db.update_task_status(task.get("task_id"), "ERROR", str(e))
-                    time.sleep(1)
+                    self.pool.run_batch(tasks, self._handle_task)
+                    self.outcomes.flush()
         finally:
+            self.pool.shutdown()
+            self.outcomes.close()
             self.app.is_promo_worker_active = False
             print("[PromoWorker] Finalizado.")
 
+    def _handle_task(self, task):
+        """Processa UMA tarefa reivindicada (executado pelas threads do WorkerPool)."""
+        try:
+            task_id = task["task_id"]
+            item_id = task["item_id"]
+            account_nick = task["account_nickname"]
+
+            # Aqui você vai colar o conteúdo real de _process_auto_promo_queue_worker()
+            self._process_promo_task(task)
+
+            self.outcomes.complete(task_id, "Concluído.")
+        except Exception as e:
+            print(f"[PromoWorker] Erro no item {task.get('item_id')}: {e}")
+            traceback.print_exc()
+            self.outcomes.fail(task, e)
+            return False  # o WorkerPool conta como erro
+
     def stop(self):
         """Solicita parada do loop."""
         self._stop_event.set()
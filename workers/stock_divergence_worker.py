@@ -1,7 +1,10 @@
 import threading
-import time
 import traceback
 
+from workers.outcome_buffer import TaskOutcomeBuffer
+from workers.worker_pool import WorkerPool, make_worker_id
+from workers.item_prefetch import attach_item_data, STOCK_ITEM_ATTRIBUTES
+
 
 class StockDivergenceWorker(threading.Thread):
     """
@@ -15,6 +18,11 @@ class StockDivergenceWorker(threading.Thread):
         self.db = app.db_manager
         self.db_manager = app.db_manager
         self._stop_event = threading.Event()
+        self.worker_id = make_worker_id(self)
+        # N tarefas em paralelo (app_config worker_pool_size_stock_divergence); o ritmo por conta fica com o core.rate_limiter
+        self.pool = WorkerPool.from_config(self.db, "STOCK_DIVERGENCE", default_size=4)
+        # resultados gravados em lote (um commit por flush)
+        self.outcomes = TaskOutcomeBuffer.from_config(self.db, "STOCK_DIVERGENCE", worker_id=self.worker_id)
 
     def run(self):
         """Loop principal adaptado de _process_stock_divergence_worker."""
@@ -30,37 +38,47 @@ class StockDivergenceWorker(threading.Thread):
                 self.app.stock_divergence_worker_event.wait(timeout=30)
                 self.app.stock_divergence_worker_event.clear()
 
-                tasks = self.db.get_tasks_from_queue(
-                    task_type="STOCK_DIVERGENCE", status="PENDING", limit=10
-                )
-                if not tasks:
-                    print("[StockDivergenceWorker] Fila vazia.")
-                    continue
-
-                for task in tasks:
-                    try:
-                        task_id = task["task_id"]
-                        item_id = task["item_id"]
-                        account_nick = task["account_nickname"]
-                        self.db.update_task_status(task_id, "PROCESSING", "Verificando estoque...")
+                while not self._stop_event.is_set():
+                    # reivindica o lote de forma atômica (já marcado como PROCESSING)
+                    tasks = self.db.claim_tasks("STOCK_DIVERGENCE", self.worker_id, limit=self.pool.batch_size)
+                    if not tasks:
+                        break
+                    self.outcomes.hold(tasks)
 
-                        # Cole aqui a lógica real de verificação individual
-                        self._process_stock_check(task)
-
-                        self.db.update_task_status(task_id, "DONE", "Verificação concluída.")
-                    except Exception as e:
-                        print(f"[StockDivergenceWorker] Erro no item {task.get('item_id')}: {e}")
-                        traceback.print_exc()
-                        self.db.update_task_status(task.get("task_id"), "ERROR", str(e))
-                    time.sleep(0.5)
+                    # um multiget por conta para o lote todo (task['_item_data'])
+                    attach_item_data(self.app, tasks, STOCK_ITEM_ATTRIBUTES)
+                    self.pool.run_batch(tasks, self._handle_task)
+                    self.outcomes.flush()
         finally:
+            self.pool.shutdown()
+            self.outcomes.close()
             self.app.is_stock_divergence_active = False
             print("[StockDivergenceWorker] Finalizado.")
 
+    def _handle_task(self, task):
+        """Processa UMA tarefa reivindicada (executado pelas threads do WorkerPool)."""
+        try:
+            task_id = task["task_id"]
+            item_id = task["item_id"]
+            account_nick = task["account_nickname"]
+
+            # Cole aqui a lógica real de verificação individual
+            self._process_stock_check(task)
+
+            self.outcomes.complete(task_id, "Verificação concluída.")
+        except Exception as e:
+            print(f"[StockDivergenceWorker] Erro no item {task.get('item_id')}: {e}")
+            traceback.print_exc()
+            self.outcomes.fail(task, e)
+            return False  # o WorkerPool conta como erro
+
     def stop(self):
         """Solicita parada do loop."""
         self._stop_event.set()
 
     def _process_stock_check(self, task):
-        """Lógica individual (cole aqui o conteúdo de _get_stock_diff_for_item ou equivalente)."""
+        """
+        Lógica individual (cole aqui o conteúdo de _get_stock_diff_for_item ou equivalente).
+        task['_item_data'] já traz o anúncio lido em lote (multiget), quando disponível.
+        """
         pass
@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+def make_worker_id(worker) -> str:
+    """
+    Identificador do dono das tarefas reivindicadas (claim_tasks grava em worker_id, com o lease).
+    Classe do worker + pid + sufixo aleatório: único entre threads do mesmo processo e entre
+    processos que compartilham o banco, então um worker nunca confunde as tarefas de outro.
+    """
+    return f"{type(worker).__name__}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class AccountPacer:
+    """
+    Espaçamento mínimo opcional entre tarefas da MESMA conta. O limite real de requisições
+    é aplicado pelo core.rate_limiter em cada chamada HTTP; isto só serve para frear um
+    task_type específico via app_config (padrão: desligado).
+    """
+
+    def __init__(self, min_interval: float = 0.0):
+        self.min_interval = max(0.0, float(min_interval or 0.0))
+        self._lock = threading.Lock()
+        self._next_slot = {}  # account -> time.monotonic() a partir do qual pode chamar
+
+    def acquire(self, account):
+        if self.min_interval <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(account, now))
+            self._next_slot[account] = slot + self.min_interval
+        wait_s = slot - now
+        if wait_s > 0:
+            time.sleep(wait_s)
+        return wait_s
+
+
+class WorkerPool:
+    """
+    Executa as tarefas reivindicadas de um task_type em N threads concorrentes.
+    O worker continua dono do loop (claim_tasks -> run_batch); o handler recebe uma
+    tarefa (dict) e é o mesmo código que antes rodava no for sequencial. Os handlers registram
+    a falha na fila eles mesmos e devolvem False; isso (ou uma exceção que escape) entra em
+    stats()["errors"].
+
+    Tamanho e espaçamento por conta vêm do app_config:
+        worker_pool_size_<task_type>         (ex.: worker_pool_size_bulk_edit = 4)
+        worker_account_interval_<task_type>  (segundos entre chamadas da mesma conta)
+    """
+
+    def __init__(self, task_type: str, max_workers: int = 1, pacer=None, throughput_window: float = 60.0):
+        self.task_type = task_type
+        self.max_workers = max(1, int(max_workers or 1))
+        self.pacer = pacer or AccountPacer(0.0)
+        self.throughput_window = throughput_window
+        self._executor = None
+        self._lock = threading.Lock()
+        self._finished = deque()  # time.monotonic() de cada tarefa concluída, para a janela deslizante
+        self._active = 0
+        self._done = 0
+        self._errors = 0
+
+    @classmethod
+    def from_config(cls, db, task_type: str, default_size: int = 1, default_account_interval: float = 0.0):
+        key = task_type.lower()
+        size, interval = default_size, default_account_interval
+        get_config = getattr(db, "get_app_config_value", None)
+        if get_config:
+            try:
+                size = int(get_config(f"worker_pool_size_{key}", default_size) or default_size)
+                interval = float(get_config(f"worker_account_interval_{key}", default_account_interval) or 0.0)
+            except (TypeError, ValueError) as e:
+                print(f"[WorkerPool {task_type}] Configuração inválida, usando padrão: {e}")
+                size, interval = default_size, default_account_interval
+        return cls(task_type, max_workers=size, pacer=AccountPacer(interval))
+
+    @property
+    def batch_size(self) -> int:
+        """Quantas tarefas reivindicar por vez: o suficiente para manter todas as threads ocupadas."""
+        return max(10, self.max_workers * 2)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"pool-{self.task_type}")
+            return self._executor
+
+    def _run_one(self, handler, task):
+        with self._lock:
+            self._active += 1
+        ok = False
+        try:
+            self.pacer.acquire(task.get("account_nickname"))
+            ok = handler(task) is not False
+        except Exception as e:
+            # os handlers já gravam ERROR na fila; aqui só evitamos derrubar o pool
+            print(f"[WorkerPool {self.task_type}] Erro não tratado na tarefa {task.get('task_id')}: {e}")
+            traceback.print_exc()
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._finished.append(time.monotonic())
+                if ok:
+                    self._done += 1
+                else:
+                    self._errors += 1
+
+    def run_batch(self, tasks, handler):
+        """Processa o lote em paralelo e só retorna quando todas as tarefas terminaram."""
+        if not tasks:
+            return 0
+        if self.max_workers == 1:
+            for task in tasks:
+                self._run_one(handler, task)
+            return len(tasks)
+        executor = self._get_executor()
+        wait([executor.submit(self._run_one, handler, task) for task in tasks])
+        return len(tasks)
+
+    def stats(self) -> dict:
+        """Vazão ao vivo (janela deslizante de throughput_window segundos) e contadores."""
+        with self._lock:
+            cutoff = time.monotonic() - self.throughput_window
+            while self._finished and self._finished[0] < cutoff:
+                self._finished.popleft()
+            recent = len(self._finished)
+            return {
+                "task_type": self.task_type,
+                "workers": self.max_workers,
+                "active": self._active,
+                "done": self._done,
+                "errors": self._errors,
+                "per_second": recent / self.throughput_window if self.throughput_window else 0.0,
+            }
+
+    def shutdown(self, wait_for_tasks: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait_for_tasks)